@@ -0,0 +1,206 @@
+"""
+Point-in-time check: GET /players?as_of= and GET /king?as_of= must answer
+exactly what a replay of the history truncated at as_of gives.
+
+Fills a throwaway SQLite stand-in with a synthetic league, edits and deletes
+a match in it, and adds a second league through a back-dated import, so the
+stored rating_after history has been rewritten by checkpointed replays.
+Then, for a seeded sample of as_of points (before the first match, on and
+between matches, after the last one) in both leagues, it replays Elo and the
+crown rules over the matches played up to as_of and compares:
+
+    /players?as_of   every rating and crowns_collected
+    /king?as_of      King/Queen, rating, since, crowns; no reign ends after as_of
+
+It also checks that a timezone-aware as_of means the same instant as naive
+UTC, and that an as_of past the last match matches the live ratings.
+Exits 1 on any difference, so it can gate CI like a test.
+
+Usage (from backend/):
+    python benchmarks/as_of_check.py
+    python benchmarks/as_of_check.py --scale 40x4000 --points 100 --seed 3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix="pickle_elo_as_of_")
+os.environ["SUPABASE_DB_URL"] = f"sqlite:///{os.path.join(_db_dir, 'as_of.sqlite')}"
+os.environ["DERIVED_JOBS_SYNC"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+import main  # noqa: E402
+from elo import apply_match  # noqa: E402
+from history import FORMATS, MatchHistory  # noqa: E402
+from leaderboard import Leaderboard  # noqa: E402
+from models import Match, Player  # noqa: E402
+from synthetic_league import LeagueSpec, populate  # noqa: E402
+
+
+def _check(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+    return response.json()
+
+
+def build_leagues(client: TestClient, spec: LeagueSpec) -> List[Tuple[int, str]]:
+    """The synthetic default league plus an imported second one; returns (league id, URL prefix)."""
+    populate(spec)
+    with Session(main.engine) as session:
+        matches = session.exec(select(Match).order_by(Match.played_at, Match.id)).all()
+        edited, deleted = matches[len(matches) // 2], matches[len(matches) // 4]
+        edited_id, deleted_id = edited.id, deleted.id
+        played = [m.played_at for m in matches]
+    _check(client.patch(f"/matches/{edited_id}", json={"scoreA": 0, "scoreB": 11}))
+    _check(client.delete(f"/matches/{deleted_id}"))
+
+    league_id = _check(client.post("/leagues", params={"name": "as_of check"}))["id"]
+    prefix = f"/leagues/{league_id}"
+    player_ids = [_check(client.post(f"{prefix}/players", params={"name": f"Second {i}"}))["id"] for i in range(6)]
+    step = max(len(played) // 60, 1)
+    lines = [
+        json.dumps({
+            # Interleaved with the default league's matches
+            "played_at": (played[i * step] + timedelta(minutes=1)).isoformat(),
+            "format": "singles",
+            "scoreA": 11,
+            "scoreB": i % 10,
+            "players": [
+                {"player_id": player_ids[i % 6], "team_side": "A", "winners": 0, "errors": 0},
+                {"player_id": player_ids[(i + 1) % 6], "team_side": "B", "winners": 0, "errors": 0},
+            ],
+        })
+        for i in range(min(50, len(played)))
+    ]
+    _check(client.post(f"{prefix}/matches/import", files={"file": ("second.jsonl", "\n".join(lines))}))
+    return [(main.DEFAULT_LEAGUE_ID, ""), (league_id, prefix)]
+
+
+class TruncatedReplay:
+    """Ratings, King/Queen and crowns after replaying the matches up to as_of."""
+
+    def __init__(self, session: Session, league_id: int, as_of: datetime):
+        player_ids = session.exec(select(Player.id).where(Player.league_id == league_id)).all()
+        history = MatchHistory.load(session, league_id)
+        ratings = {pid: float(main.BASE_RATING) for pid in player_ids}
+        board = Leaderboard(ratings)
+
+        self.king: Optional[int] = None
+        self.since: Optional[datetime] = None
+        self.crowns: Dict[int, int] = {}
+        for i in range(len(history)):
+            played_at = history.played_at(i)
+            if played_at > as_of:
+                break
+            stats = main._replay_stats(history, i, ratings)
+            if stats is None:
+                continue
+            result = apply_match(
+                match_format=FORMATS[history.format[i]],
+                scoreA=history.score_a[i],
+                scoreB=history.score_b[i],
+                players=stats,
+            )
+            for ps in stats:
+                ratings[ps.player_id] = result[ps.player_id]["after"]
+                board.update(ps.player_id, ratings[ps.player_id])
+            top = board.top()
+            if self.king is None:
+                self.king, self.since = top, played_at
+            elif top != self.king:
+                self._close(played_at)
+                self.king, self.since = top, played_at
+        if self.king is not None:
+            self._close(as_of)
+        self.ratings = {pid: int(r) for pid, r in ratings.items()}
+
+    def _close(self, end: datetime) -> None:
+        if main._reign_days(self.since, end) >= main.CROWN_MIN_DAYS:
+            self.crowns[self.king] = self.crowns.get(self.king, 0) + 1
+
+
+def check_point(client: TestClient, league_id: int, prefix: str, as_of: datetime) -> List[str]:
+    with Session(main.engine) as session:
+        expected = TruncatedReplay(session, league_id, as_of)
+    errors = []
+
+    players = {p["id"]: p for p in _check(client.get(f"{prefix}/players", params={"as_of": as_of.isoformat()}))}
+    if {pid: p["rating"] for pid, p in players.items()} != expected.ratings:
+        errors.append("/players ratings differ")
+    if {pid: p["crowns_collected"] for pid, p in players.items() if p["crowns_collected"]} != expected.crowns:
+        errors.append("/players crowns differ")
+
+    king = _check(client.get(f"{prefix}/king", params={"as_of": as_of.isoformat()}))
+    if expected.king is None:
+        if king != {"king": None}:
+            errors.append(f"/king should be empty, got {king.get('id')}")
+    else:
+        got = (king.get("id"), king.get("rating"), king.get("since"), king.get("crowns_collected"))
+        want = (
+            expected.king,
+            expected.ratings[expected.king],
+            expected.since.isoformat(),
+            expected.crowns.get(expected.king, 0),
+        )
+        if got != want:
+            errors.append(f"/king {got} != {want}")
+        if any(r["end"] > as_of.isoformat() for r in king.get("reigns", [])):
+            errors.append("/king timeline runs past as_of")
+    return [f"[league {league_id}, as_of {as_of.isoformat()}] {e}" for e in errors]
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="25x2500", help="players x matches for the synthetic league")
+    parser.add_argument("--points", type=int, default=50, help="sampled as_of points per league")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    players, matches = (int(x) for x in args.scale.lower().split("x"))
+    client = TestClient(main.app)
+    leagues = build_leagues(client, LeagueSpec(players=players, matches=matches, seed=args.seed))
+
+    with Session(main.engine) as session:
+        played = session.exec(select(Match.played_at).order_by(Match.played_at)).all()
+    rng = random.Random(args.seed)
+    points = [played[0] - timedelta(days=1), played[0], played[-1], played[-1] + timedelta(days=30)]
+    points += rng.sample(played, args.points // 2)
+    points += [t + timedelta(seconds=30) for t in rng.sample(played, args.points - args.points // 2)]
+
+    failures: List[str] = []
+    for league_id, prefix in leagues:
+        for as_of in points:
+            failures += check_point(client, league_id, prefix, as_of)
+
+    # A timezone-aware as_of is the same instant in naive UTC
+    as_of = played[len(played) // 2]
+    shifted = as_of.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=-5)))
+    if client.get("/players", params={"as_of": shifted.isoformat()}).json() != \
+            client.get("/players", params={"as_of": as_of.isoformat()}).json():
+        failures.append("timezone-aware as_of differs from naive UTC")
+
+    # Past the last match, as_of is the live board
+    live = {p["id"]: p["rating"] for p in _check(client.get("/players"))}
+    late = {p["id"]: p["rating"] for p in _check(
+        client.get("/players", params={"as_of": (played[-1] + timedelta(days=1)).isoformat()})
+    )}
+    if live != late:
+        failures.append("as_of after the last match differs from the live ratings")
+
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+    print(f"{len(points) * len(leagues)} as_of points match the truncated replay")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,121 @@
+"""
+Differential check: elo_batch.replay vs elo.apply_match, bit for bit.
+
+Generates seeded synthetic singles/doubles histories (ties, 0-0 games and
+untracked winners/errors included) for several pool sizes, replays each one
+through elo.apply_match match by match and through elo_batch.replay with
+both of its paths forced (wave-batched and per-match), and compares every
+per-slot before/after rating and the final ratings. Runs under the default
+EloConfig and a non-default one. No timing; see bench_batch_elo.py.
+
+Exits 1 on any difference, so it can gate CI like a test.
+
+Usage (from backend/):
+    python benchmarks/batch_elo_check.py
+    python benchmarks/batch_elo_check.py --matches 20000 --players 4,8,40,200
+"""
+import argparse
+import os
+import random
+import sys
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+from elo import DEFAULT_CONFIG, EloConfig, PlayerStat, apply_match  # noqa: E402
+from elo_batch import build_match_arrays, replay  # noqa: E402
+
+CONFIGS = {
+    "default": DEFAULT_CONFIG,
+    "tuned": EloConfig(base_k_singles=27.5, base_k_doubles=13.0, min_mov_mult=0.6, max_mov_mult=1.8, epsilon=0.5),
+}
+
+
+def synthetic_matches(n_matches: int, n_players: int, doubles_share: float, rng: random.Random):
+    formats, scores_a, scores_b, slots = [], [], [], []
+    for _ in range(n_matches):
+        fmt = "doubles" if rng.random() < doubles_share else "singles"
+        size = 4 if fmt == "doubles" else 2
+        picked = rng.sample(range(n_players), size)
+        # Include ties and 0-0 games so the edge cases get exercised too
+        a, b = rng.randint(0, 11), rng.randint(0, 11)
+        formats.append(fmt)
+        scores_a.append(a)
+        scores_b.append(b)
+        slots.append([(p, rng.randint(0, 8), rng.randint(0, 8)) for p in picked])
+    return formats, scores_a, scores_b, slots
+
+
+def reference_replay(formats, scores_a, scores_b, slots, n_players, config=DEFAULT_CONFIG):
+    rating_map = {p: 1000.0 for p in range(n_players)}
+    before = np.zeros((len(formats), 4), dtype=np.int64)
+    after = np.zeros((len(formats), 4), dtype=np.int64)
+
+    for m, fmt in enumerate(formats):
+        half = len(slots[m]) // 2
+        cols = (0, 1, 2, 3) if fmt == "doubles" else (0, 2)
+        stats = [
+            PlayerStat(
+                player_id=pidx,
+                team_side="A" if i < half else "B",
+                winners=w,
+                errors=e,
+                rating_before=rating_map[pidx],
+            )
+            for i, (pidx, w, e) in enumerate(slots[m])
+        ]
+        result = apply_match(fmt, scores_a[m], scores_b[m], stats, config)
+        for col, (pidx, _, _) in zip(cols, slots[m]):
+            before[m, col] = result[pidx]["before"]
+            after[m, col] = result[pidx]["after"]
+            rating_map[pidx] = result[pidx]["after"]
+
+    ratings = np.array([rating_map[p] for p in range(n_players)], dtype=np.float64)
+    return before, after, ratings
+
+
+def check(n_matches: int, n_players: int, doubles_share: float, seed: int) -> List[str]:
+    """Differences between the engines for one synthetic history."""
+    formats, scores_a, scores_b, slots = synthetic_matches(
+        n_matches, n_players, doubles_share, random.Random(seed)
+    )
+    arrays = build_match_arrays(formats, scores_a, scores_b, slots)
+
+    errors = []
+    for config_name, config in CONFIGS.items():
+        ref_before, ref_after, ref_ratings = reference_replay(
+            formats, scores_a, scores_b, slots, n_players, config
+        )
+        for vectorize in (True, False):
+            result = replay(arrays, n_players, config=config, vectorize=vectorize)
+            mismatches = int(np.sum(ref_before != result.before) + np.sum(ref_after != result.after))
+            mismatches += int(np.sum(ref_ratings != result.ratings))
+            if mismatches:
+                path = "batched" if vectorize else "per-match"
+                errors.append(f"{n_players} players, {config_name} config, {path}: {mismatches} values differ")
+    return errors
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=5000)
+    parser.add_argument("--players", default="4,8,16,40,200", help="comma-separated pool sizes")
+    parser.add_argument("--doubles-share", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    pools = [int(p) for p in args.players.split(",")]
+    failures = []
+    for n_players in pools:
+        failures += check(args.matches, n_players, args.doubles_share, args.seed + n_players)
+
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+    print(f"{args.matches} matches x {len(pools)} pools x {len(CONFIGS)} configs: identical to apply_match")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,61 @@
+"""
+Benchmark: elo_batch.replay vs elo.apply_match.
+
+Generates a synthetic singles/doubles history and times the per-match
+engine, building the arrays, and elo_batch.replay on each of its paths
+(wave-batched, per-match, and the automatic pick). Correctness is checked
+separately by batch_elo_check.py.
+
+Usage (from backend/):
+    python benchmarks/bench_batch_elo.py --matches 100000 --players 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from batch_elo_check import reference_replay, synthetic_matches  # noqa: E402
+from elo_batch import build_match_arrays, replay, schedule_waves  # noqa: E402
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, default=100_000)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--doubles-share", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    formats, scores_a, scores_b, slots = synthetic_matches(
+        args.matches, args.players, args.doubles_share, rng
+    )
+
+    t0 = time.perf_counter()
+    reference_replay(formats, scores_a, scores_b, slots, args.players)
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    arrays = build_match_arrays(formats, scores_a, scores_b, slots)
+    t_build = time.perf_counter() - t0
+
+    timings = {}
+    for label, vectorize in (("batched", True), ("per-match", False), ("auto", None)):
+        t0 = time.perf_counter()
+        replay(arrays, args.players, vectorize=vectorize)
+        timings[label] = time.perf_counter() - t0
+
+    waves = len(schedule_waves(arrays.players, args.players))
+    print(f"{args.matches} matches, {args.players} players, {args.matches / waves:.2f} matches per wave")
+    print(f"  apply_match loop           {t_ref:8.3f}s")
+    print(f"  build arrays               {t_build:8.3f}s")
+    for label, seconds in timings.items():
+        print(f"  elo_batch.replay {label:9s} {seconds:8.3f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
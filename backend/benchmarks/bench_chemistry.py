@@ -0,0 +1,94 @@
+"""
+Benchmark the chemistry pipeline phases on a synthetic doubles history.
+
+Times index-array construction, X_alpha / X_full construction, the two
+Ridge fits and the per-player / per-pair aggregation, all in memory (no DB).
+
+Usage (from backend/):
+    python benchmarks/bench_chemistry.py --matches 50000 --players 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+from sklearn.linear_model import Ridge  # noqa: E402
+from chemistry_service import (  # noqa: E402
+    _doubles_table,
+    _team_arrays,
+    _index_rows,
+    _build_design,
+    _aggregate_pairs,
+)
+
+
+def synthetic_rows(n_matches: int, n_players: int, rng: random.Random):
+    rows = []
+    for m in range(n_matches):
+        i, j, k, l = rng.sample(range(1, n_players + 1), 4)
+        loser = rng.randint(0, 9)
+        a_wins = rng.random() < 0.5
+        rows.append(
+            {
+                "match_id": m + 1,
+                "team_a": [i, j],
+                "team_b": [k, l],
+                "score_a": 11 if a_wins else loser,
+                "score_b": loser if a_wins else 11,
+            }
+        )
+    return rows
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, default=50_000)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.matches, args.players, random.Random(args.seed))
+    timings = {}
+
+    t0 = time.perf_counter()
+    table = _doubles_table(rows)
+    teams, pair_lo, pair_hi, _ = _team_arrays(table)
+    player_ids = [int(p) for p in np.unique(teams)]
+    pair_ids = [
+        (int(a), int(b))
+        for a, b in np.unique(np.stack([pair_lo.ravel(), pair_hi.ravel()], axis=1), axis=0)
+    ]
+    arrays = _index_rows(table, player_ids, pair_ids)
+    timings["index arrays"] = time.perf_counter() - t0
+
+    P, Q = len(player_ids), len(pair_ids)
+
+    t0 = time.perf_counter()
+    X_alpha, X_full = _build_design(arrays, P, Q)
+    timings["design matrices"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    model_alpha = Ridge(alpha=1.0).fit(X_alpha, arrays.y, sample_weight=arrays.w)
+    p_hat_base = model_alpha.predict(X_alpha)
+    timings["ridge (alpha)"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    Ridge(alpha=1.0).fit(X_full, arrays.y, sample_weight=arrays.w)
+    timings["ridge (full)"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    _aggregate_pairs(arrays, p_hat_base, player_ids, pair_ids)
+    timings["residual aggregation"] = time.perf_counter() - t0
+
+    print(f"{args.matches} doubles matches, {P} players, {Q} pairs")
+    for label, seconds in timings.items():
+        print(f"  {label:<22} {seconds:8.3f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,104 @@
+"""
+Benchmark the pair standard errors (refresh_pair_uncertainty) at thousands
+of pairs, and check them against exact column solves.
+
+Times the LDLᵀ factorization of the full Ridge normal matrix, the selected
+inverse that gives diag(A⁻¹), and the whole uncertainty pass (Ridge solve,
+two more factorizations and selected inverses, residual variance), all in
+memory (no DB). Then solves for --check random pair columns of A⁻¹
+outright and compares diag(A⁻¹) and the sandwich diag(A⁻¹ - λ A⁻²) with
+the fast path; exits 1 if either is off by more than --rtol.
+
+Usage (from backend/):
+    python benchmarks/bench_chemistry_se.py
+    python benchmarks/bench_chemistry_se.py --matches 50000 --players 300 --check 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+from bench_chemistry import synthetic_rows  # noqa: E402
+from chemistry_service import (  # noqa: E402
+    CHEMISTRY_SE_STEP,
+    _build_design,
+    _doubles_table,
+    _factor_ridge,
+    _feature_ids,
+    _index_rows,
+    _pair_uncertainty,
+    _solve_ridge,
+    _state_from_design,
+)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, default=20_000)
+    parser.add_argument("--players", type=int, default=150)
+    parser.add_argument("--check", type=int, default=200, help="pair columns solved exactly")
+    parser.add_argument("--rtol", type=float, default=1e-6)
+    parser.add_argument("--lam", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    table = _doubles_table(synthetic_rows(args.matches, args.players, random.Random(args.seed)))
+    player_ids, pair_ids = _feature_ids(table)
+    P, Q = len(player_ids), len(pair_ids)
+    arrays = _index_rows(table, player_ids, pair_ids)
+    _, X_full = _build_design(arrays, P, Q)
+    stats = _state_from_design(X_full, arrays.y, arrays.w, player_ids, pair_ids)
+    cols = np.arange(P + Q)
+    timings = {}
+
+    t0 = time.perf_counter()
+    factor = _factor_ridge(stats, cols, args.lam)
+    timings["LDLᵀ factorization"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    inv_diag = factor.inverse_diagonal()
+    timings["selected inverse"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    theta, intercept = _solve_ridge(stats, cols, args.lam)
+    factor_lo = _factor_ridge(stats, cols, args.lam * (1.0 - CHEMISTRY_SE_STEP))
+    factor_hi = _factor_ridge(stats, cols, args.lam * (1.0 + CHEMISTRY_SE_STEP))
+    _pair_uncertainty(factor_lo, factor_hi, X_full, arrays.y, arrays.w, theta, intercept, P, args.lam)
+    timings["uncertainty pass"] = time.perf_counter() - t0
+
+    # The same central differences as _pair_uncertainty
+    inv_lo, inv_hi = factor_lo.inverse_diagonal(), factor_hi.inverse_diagonal()
+    sandwich = (inv_lo + inv_hi) / 2.0 - (inv_lo - inv_hi) / (2.0 * CHEMISTRY_SE_STEP)
+
+    rng = np.random.default_rng(args.seed)
+    check = np.sort(rng.choice(np.arange(P, P + Q), size=min(args.check, Q), replace=False))
+    t0 = time.perf_counter()
+    E = np.zeros((len(cols), len(check)))
+    E[check, np.arange(len(check))] = 1.0
+    Z = factor.solve(E)
+    exact_seconds = time.perf_counter() - t0
+    exact_diag = Z[check, np.arange(len(check))]
+    exact_sandwich = exact_diag - args.lam * np.einsum("ij,ij->j", Z, Z)
+
+    diag_err = float(np.max(np.abs(inv_diag[check] / exact_diag - 1.0)))
+    sandwich_err = float(np.max(np.abs(sandwich[check] / exact_sandwich - 1.0)))
+
+    print(f"{args.matches} doubles matches, {P} players, {Q} pairs (D = {P + Q})")
+    for label, seconds in timings.items():
+        print(f"  {label:<22} {seconds:8.3f}s")
+    print(f"  exact columns, all {Q} pairs ~{exact_seconds * Q / len(check):.1f}s "
+          f"(extrapolated from {len(check)})")
+    print(f"  max relative error vs exact: diag(A⁻¹) {diag_err:.2e}, sandwich {sandwich_err:.2e}")
+    if max(diag_err, sandwich_err) > args.rtol:
+        print(f"relative error above --rtol {args.rtol:g}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
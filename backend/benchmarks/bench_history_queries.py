@@ -0,0 +1,150 @@
+"""
+Count SQL round-trips made by the Elo / crown replays, and the memory the
+loaded history takes per match.
+
+Compares the old per-match MatchPlayer lookup with MatchHistory.load()
+on a throwaway SQLite stand-in, then counts the queries each replay makes.
+Memory is traced (tracemalloc) while each loader's result is alive: ORM
+objects from the old lookup against the MatchHistory arrays that the
+replays, chemistry and GET /players/{id} share.
+
+Usage (from backend/):
+    python benchmarks/bench_history_queries.py --players 40 --matches 3000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix="pickle_elo_bench_")
+os.environ["DERIVED_JOBS_SYNC"] = "1"
+os.environ["SUPABASE_DB_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.sqlite')}"
+
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+import main  # noqa: E402
+from models import Player, Match, MatchPlayer  # noqa: E402
+from history import MatchHistory  # noqa: E402
+
+
+def seed(n_players: int, n_matches: int, rng: random.Random) -> None:
+    with Session(main.engine) as session:
+        players = [Player(name=f"Player {i}") for i in range(n_players)]
+        session.add_all(players)
+        session.commit()
+        ids = [p.id for p in players]
+
+        start = datetime(2024, 1, 1)
+        for n in range(n_matches):
+            fmt = "doubles" if rng.random() < 0.6 else "singles"
+            size = 4 if fmt == "doubles" else 2
+            picked = rng.sample(ids, size)
+            winner = rng.choice(["A", "B"])
+            loser_pts = rng.randint(0, 9)
+            m = Match(
+                format=fmt,
+                scoreA=11 if winner == "A" else loser_pts,
+                scoreB=11 if winner == "B" else loser_pts,
+                played_at=start + timedelta(hours=n),
+            )
+            session.add(m)
+            session.flush()
+            for i, pid in enumerate(picked):
+                session.add(
+                    MatchPlayer(
+                        match_id=m.id,
+                        player_id=pid,
+                        team_side="A" if i < size // 2 else "B",
+                        winners=rng.randint(0, 6),
+                        errors=rng.randint(0, 6),
+                        rating_before=1000,
+                        rating_after=1000,
+                        played_at=m.played_at,
+                    )
+                )
+        session.commit()
+
+
+def legacy_per_match_load(session: Session):
+    """The pre-history.py access pattern: one MatchPlayer query per match."""
+    matches = session.exec(select(Match).order_by(Match.played_at, Match.id)).all()
+    return [
+        (m, session.exec(select(MatchPlayer).where(MatchPlayer.match_id == m.id)).all())
+        for m in matches
+    ]
+
+
+def measure(label: str, fn) -> dict:
+    counter = {"n": 0}
+
+    def count(*_args, **_kwargs):
+        counter["n"] += 1
+
+    event.listen(main.engine, "before_cursor_execute", count)
+    try:
+        with Session(main.engine) as session:
+            t0 = time.perf_counter()
+            fn(session)
+            elapsed = time.perf_counter() - t0
+            session.rollback()
+    finally:
+        event.remove(main.engine, "before_cursor_execute", count)
+
+    return {"label": label, "queries": counter["n"], "seconds": elapsed}
+
+
+def measure_memory(label: str, fn, n_matches: int) -> dict:
+    """Bytes still allocated per match while fn's result is alive."""
+    with Session(main.engine) as session:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            loaded = fn(session)
+            held = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        del loaded
+    return {"label": label, "bytes_per_match": held / max(n_matches, 1)}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=40)
+    parser.add_argument("--matches", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    seed(args.players, args.matches, random.Random(args.seed))
+
+    results = [
+        measure("legacy per-match load", legacy_per_match_load),
+        measure("MatchHistory.load", MatchHistory.load),
+        measure("recompute_crowns_and_king", main.recompute_crowns_and_king),
+        measure("recompute_all_ratings", main.recompute_all_ratings),
+    ]
+
+    memory = [
+        measure_memory("legacy per-match load (ORM)", legacy_per_match_load, args.matches),
+        measure_memory("MatchHistory", MatchHistory.load, args.matches),
+    ]
+    with Session(main.engine) as session:
+        nbytes = MatchHistory.load(session).nbytes
+
+    print(f"{args.players} players, {args.matches} matches")
+    for r in results:
+        print(f"  {r['label']:<28} {r['queries']:>7} queries  {r['seconds']:8.3f}s")
+    print("memory per match")
+    for r in memory:
+        print(f"  {r['label']:<28} {r['bytes_per_match']:9.0f} B")
+    print(f"  {'MatchHistory.nbytes':<28} {nbytes / max(args.matches, 1):9.0f} B")
+
+
+if __name__ == "__main__":
+    main_cli()
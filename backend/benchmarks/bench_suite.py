@@ -0,0 +1,235 @@
+"""
+Benchmark suite for the backend hot paths at several league sizes.
+
+For each scale, fills a throwaway SQLite stand-in with a synthetic league
+(see synthetic_league.py) and times:
+
+    create_match               POST /matches (a fresh singles/doubles game)
+    recompute_all_ratings      full Elo replay + rating sync
+    recompute_crowns_and_king  full reign rebuild
+    recompute_chemistry        full chemistry refit
+    get_player                 GET /players/{id}
+    list_matches               GET /matches (first page, then one filtered)
+    get_chemistry_network      GET /chemistry
+
+Background recomputes are drained between samples, outside the timings.
+Results are written as JSON; --compare prints the change against an
+earlier results file and flags slowdowns.
+
+Usage (from backend/):
+    python benchmarks/bench_suite.py --scales 30x1000,100x10000 --repeats 5
+    python benchmarks/bench_suite.py --compare benchmarks/results/bench-20240101-120000.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix="pickle_elo_suite_")
+os.environ["SUPABASE_DB_URL"] = f"sqlite:///{os.path.join(_db_dir, 'suite.sqlite')}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+import main  # noqa: E402
+from synthetic_league import LeagueSpec, populate  # noqa: E402
+
+DEFAULT_SCALES = "20x500,60x5000,150x20000"
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Flag an operation in --compare when its fastest sample grew by more than
+# this (min is less noisy than the median on a busy machine)
+REGRESSION_THRESHOLD = 0.20
+
+
+def _drain() -> None:
+    main.derived_jobs.wait_until_caught_up(timeout=600)
+
+
+def time_op(fn, repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        _drain()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    _drain()
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "repeats": repeats,
+    }
+
+
+def _random_match_body(rng: random.Random, player_ids) -> dict:
+    doubles = rng.random() < 0.6
+    per_side = 2 if doubles else 1
+    picked = rng.sample(player_ids, 2 * per_side)
+    loser = rng.randint(0, 9)
+    a_wins = rng.random() < 0.5
+    return {
+        "format": "doubles" if doubles else "singles",
+        "scoreA": 11 if a_wins else loser,
+        "scoreB": loser if a_wins else 11,
+        "players": [
+            {"player_id": pid, "team_side": "A" if i < per_side else "B", "winners": 0, "errors": 0}
+            for i, pid in enumerate(picked)
+        ],
+    }
+
+
+def _check(response) -> None:
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+
+
+def run_scale(spec: LeagueSpec, repeats: int) -> dict:
+    t0 = time.perf_counter()
+    player_ids = populate(spec)
+    seed_seconds = time.perf_counter() - t0
+
+    client = TestClient(main.app)
+    rng = random.Random(spec.seed + 1)
+
+    def in_session(fn):
+        def run():
+            with Session(main.engine) as session:
+                fn(session)
+                session.commit()
+        return run
+
+    results = {
+        "create_match": time_op(
+            lambda: _check(client.post("/matches", json=_random_match_body(rng, player_ids))),
+            repeats,
+        ),
+        "recompute_all_ratings": time_op(in_session(main.recompute_all_ratings), repeats),
+        "recompute_crowns_and_king": time_op(in_session(main.recompute_crowns_and_king), repeats),
+        "recompute_chemistry": time_op(in_session(main.recompute_chemistry), repeats),
+        "get_player": time_op(
+            lambda: _check(client.get(f"/players/{rng.choice(player_ids)}")),
+            repeats,
+        ),
+        "list_matches": time_op(
+            lambda: _check(client.get("/matches", params={"limit": 50})),
+            repeats,
+        ),
+        "list_matches_by_player": time_op(
+            lambda: _check(
+                client.get("/matches", params={"limit": 50, "player_id": rng.choice(player_ids)})
+            ),
+            repeats,
+        ),
+        "get_chemistry_network": time_op(lambda: _check(client.get("/chemistry")), repeats),
+    }
+
+    return {
+        "players": spec.players,
+        "matches": spec.matches,
+        "doubles_share": spec.doubles_share,
+        "skill": spec.skill,
+        "seed": spec.seed,
+        "seed_seconds": seed_seconds,
+        "results": results,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, previous: dict) -> int:
+    """Print per-op deltas against a previous run; returns the regression count."""
+    previous_scales = {(s["players"], s["matches"]): s for s in previous["scales"]}
+    regressions = 0
+    for scale in current["scales"]:
+        before = previous_scales.get((scale["players"], scale["matches"]))
+        if before is None:
+            continue
+        print(f"\n{scale['players']} players x {scale['matches']} matches "
+              f"vs {previous.get('git_commit') or previous['created_at']}")
+        for op, result in scale["results"].items():
+            old = before["results"].get(op)
+            if not old:
+                continue
+            change = result["min_s"] / old["min_s"] - 1.0 if old["min_s"] else 0.0
+            flag = "  REGRESSION" if change > REGRESSION_THRESHOLD else ""
+            if flag:
+                regressions += 1
+            print(f"  {op:<27} min {old['min_s'] * 1000:9.2f}ms -> "
+                  f"{result['min_s'] * 1000:9.2f}ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated PLAYERSxMATCHES")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--doubles-share", type=float, default=LeagueSpec.doubles_share)
+    parser.add_argument("--skill", default=LeagueSpec.skill)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="results file (default: benchmarks/results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    created_at = datetime.now()
+    report = {
+        "created_at": created_at.isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": [],
+    }
+
+    for scale in args.scales.split(","):
+        players, matches = (int(v) for v in scale.lower().split("x"))
+        spec = LeagueSpec(
+            players=players,
+            matches=matches,
+            doubles_share=args.doubles_share,
+            skill=args.skill,
+            seed=args.seed,
+        )
+        result = run_scale(spec, args.repeats)
+        report["scales"].append(result)
+
+        print(f"\n{players} players x {matches} matches (seeded in {result['seed_seconds']:.2f}s)")
+        for op, r in result["results"].items():
+            print(f"  {op:<27} median {r['median_s'] * 1000:9.2f}ms  "
+                  f"min {r['min_s'] * 1000:9.2f}ms  max {r['max_s'] * 1000:9.2f}ms")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{created_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f))
+        if regressions:
+            raise SystemExit(f"{regressions} operation(s) slowed down by more than "
+                             f"{REGRESSION_THRESHOLD:.0%}")
+
+
+if __name__ == "__main__":
+    main_cli()
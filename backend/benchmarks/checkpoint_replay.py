@@ -0,0 +1,181 @@
+"""
+Checkpointed-replay check: edits that resume the Elo replay from a rating
+checkpoint must leave exactly the ratings a full replay does.
+
+Fills a throwaway SQLite stand-in with a synthetic league, then applies a
+seeded mix of PATCH /matches, DELETE /matches, POST /matches and back-dated
+imports through the real endpoints. After each edit the incremental state
+is compared with a from-scratch recompute_all_ratings:
+
+    match_player   rating_before / rating_after of every row
+    player         Player.rating
+    checkpoints    each checkpoint holds the ratings right after its match
+    shared history the in-memory history published by the replay equals a
+                   fresh MatchHistory.load
+
+Exits 1 on any difference, so it can gate CI like a test.
+
+Usage (from backend/):
+    python benchmarks/checkpoint_replay.py
+    python benchmarks/checkpoint_replay.py --scale 40x3000 --edits 60 --seed 3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix="pickle_elo_replay_")
+os.environ["SUPABASE_DB_URL"] = f"sqlite:///{os.path.join(_db_dir, 'replay.sqlite')}"
+os.environ["DERIVED_JOBS_SYNC"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+import main  # noqa: E402
+from history import MatchHistory, history_store  # noqa: E402
+from models import Match, MatchPlayer, Player, RatingCheckpoint  # noqa: E402
+from synthetic_league import LeagueSpec, populate  # noqa: E402
+
+
+def _check(response) -> None:
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+
+
+def _lineup(rng: random.Random, player_ids: List[int], match_format: str) -> List[dict]:
+    per_side = 2 if match_format == "doubles" else 1
+    picked = rng.sample(player_ids, 2 * per_side)
+    return [
+        {"player_id": p, "team_side": "A" if i < per_side else "B", "winners": 0, "errors": 0}
+        for i, p in enumerate(picked)
+    ]
+
+
+def _score(rng: random.Random) -> Dict[str, int]:
+    loser = rng.randint(0, 9)
+    return {"scoreA": 11, "scoreB": loser} if rng.random() < 0.5 else {"scoreA": loser, "scoreB": 11}
+
+
+def apply_edit(client: TestClient, rng: random.Random, player_ids: List[int]) -> str:
+    """One random edit through the API; returns its label."""
+    with Session(main.engine) as session:
+        matches = session.exec(select(Match.id, Match.played_at).order_by(Match.played_at, Match.id)).all()
+    kind = rng.choice(("patch", "patch", "delete", "post", "import"))
+    match_id, played_at = rng.choice(matches)
+
+    if kind == "patch":
+        _check(client.patch(f"/matches/{match_id}", json=_score(rng)))
+    elif kind == "delete":
+        _check(client.delete(f"/matches/{match_id}"))
+    elif kind == "post":
+        match_format = rng.choice(("singles", "doubles"))
+        _check(client.post("/matches", json={
+            "format": match_format, **_score(rng), "players": _lineup(rng, player_ids, match_format),
+        }))
+    else:
+        lines = []
+        for j in range(rng.randint(1, 5)):
+            match_format = rng.choice(("singles", "doubles"))
+            lines.append(json.dumps({
+                "played_at": (played_at + timedelta(minutes=j + 1)).isoformat(),
+                "format": match_format,
+                **_score(rng),
+                "players": _lineup(rng, player_ids, match_format),
+            }))
+        _check(client.post("/matches/import", files={"file": ("edit.jsonl", "\n".join(lines))}))
+    return kind
+
+
+def snapshot(session: Session) -> dict:
+    return {
+        "match_player": {
+            mp_id: (before, after)
+            for mp_id, before, after in session.exec(
+                select(MatchPlayer.id, MatchPlayer.rating_before, MatchPlayer.rating_after)
+            )
+        },
+        "player": dict(session.exec(select(Player.id, Player.rating)).all()),
+    }
+
+
+def checkpoint_errors(session: Session) -> List[str]:
+    """Checkpoints whose ratings differ from the history right after their match."""
+    checkpoints: Dict[int, Dict[int, int]] = defaultdict(dict)
+    for cp in session.exec(select(RatingCheckpoint)):
+        checkpoints[cp.match_id][cp.player_id] = cp.rating
+
+    history = MatchHistory.load(session)
+    ratings = {pid: main.BASE_RATING for pid in session.exec(select(Player.id))}
+    errors = []
+    for i in range(len(history)):
+        for k in history.participants(i):
+            ratings[history.player_id[k]] = history.rating_after[k]
+        expected = checkpoints.pop(history.match_id[i], None)
+        if expected is not None and expected != {pid: int(r) for pid, r in ratings.items()}:
+            errors.append(f"checkpoint at match {history.match_id[i]} is stale")
+    errors += [f"checkpoint at missing match {match_id}" for match_id in checkpoints]
+    return errors
+
+
+def _arrays(history: MatchHistory) -> dict:
+    return {name: a.tolist() for name, a in vars(history).items()}
+
+
+def check_edit(label: str) -> List[str]:
+    """Compare the incremental state with a full replay; returns the differences."""
+    errors = []
+    with Session(main.engine) as session:
+        incremental = snapshot(session)
+        errors += checkpoint_errors(session)
+        shared = history_store.current(session)
+        if shared is None:
+            errors.append("shared history not published")
+        elif _arrays(shared) != _arrays(MatchHistory.load(session)):
+            errors.append("shared history differs from the database")
+
+        main.recompute_all_ratings(session)
+        full = snapshot(session)
+
+    for table in ("match_player", "player"):
+        diff = [k for k in full[table] if incremental[table].get(k) != full[table][k]]
+        if diff:
+            errors.append(f"{len(diff)} {table} rating(s) differ, e.g. id {diff[0]}: "
+                          f"{incremental[table].get(diff[0])} != {full[table][diff[0]]}")
+    return [f"[{label}] {e}" for e in errors]
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="30x1500", help="players x matches for the synthetic league")
+    parser.add_argument("--edits", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    players, matches = (int(x) for x in args.scale.lower().split("x"))
+    player_ids = populate(LeagueSpec(players=players, matches=matches, seed=args.seed))
+    client = TestClient(main.app)
+    rng = random.Random(args.seed)
+
+    counts: Dict[str, int] = defaultdict(int)
+    failures: List[str] = []
+    for n in range(args.edits):
+        kind = apply_edit(client, rng, player_ids)
+        counts[kind] += 1
+        failures += check_edit(f"edit {n + 1}: {kind}")
+
+    print(", ".join(f"{n} {kind}" for kind, n in sorted(counts.items())))
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+    print("checkpointed replays match full replays")
+
+
+if __name__ == "__main__":
+    main_cli()
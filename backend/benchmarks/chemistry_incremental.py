@@ -0,0 +1,246 @@
+"""
+Incremental-chemistry check: pair_chemistry kept up to date through
+update_chemistry's rank-one updates must match a full Ridge refit.
+
+Fills a throwaway SQLite stand-in with a synthetic league, then applies a
+seeded mix of doubles edits through the real endpoints (PATCH, DELETE, POST
+and back-dated imports), each folded into the cached normal equations by
+update_chemistry. After each edit every pair_chemistry fit column is
+compared with what recompute_chemistry (sklearn Ridge over all doubles
+matches) writes for the same data, within --rtol / --atol.
+
+Also changes a score behind the statistics' back, the way a write that never
+reached the chemistry job would, and checks that the next update notices
+(the cached row digest no longer matches) and refits instead of drifting.
+
+Finally refreshes the standard errors (refresh_pair_uncertainty) from the
+incrementally maintained statistics and from freshly rebuilt ones, and
+compares those too.
+
+Also times every update_chemistry call against the recompute_chemistry refit
+of the same data, and fails unless the median update takes at most
+--max-update-ratio of the median refit.
+
+Exits 1 on any difference, so it can gate CI like a test.
+
+Usage (from backend/):
+    python benchmarks/chemistry_incremental.py
+    python benchmarks/chemistry_incremental.py --scale 40x3000 --edits 60 --seed 3
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix="pickle_elo_chemistry_")
+os.environ["SUPABASE_DB_URL"] = f"sqlite:///{os.path.join(_db_dir, 'chemistry.sqlite')}"
+# update_chemistry runs inside each request
+os.environ["DERIVED_JOBS_SYNC"] = "1"
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+import main  # noqa: E402
+from chemistry_service import (  # noqa: E402
+    _FIT_COLUMNS,
+    recompute_chemistry,
+    refresh_pair_uncertainty,
+    update_chemistry,
+)
+from data_version import bump_data_version  # noqa: E402
+from models import Match, PairChemistry  # noqa: E402
+from synthetic_league import LeagueSpec, populate  # noqa: E402
+
+
+# Seconds per update_chemistry call (through the derived-data job) and per
+# recompute_chemistry refit in check_edit
+update_seconds: List[float] = []
+refit_seconds: List[float] = []
+
+
+def timed_update_chemistry(*args, **kwargs):
+    t0 = time.perf_counter()
+    try:
+        return update_chemistry(*args, **kwargs)
+    finally:
+        update_seconds.append(time.perf_counter() - t0)
+
+
+# main._run_derived looks the name up at call time
+main.update_chemistry = timed_update_chemistry
+
+
+def _check(response) -> None:
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+
+
+def _score(rng: random.Random) -> Dict[str, int]:
+    loser = rng.randint(0, 9)
+    return {"scoreA": 11, "scoreB": loser} if rng.random() < 0.5 else {"scoreA": loser, "scoreB": 11}
+
+
+def _lineup(rng: random.Random, player_ids: List[int]) -> List[dict]:
+    return [
+        {"player_id": p, "team_side": "AABB"[i], "winners": 0, "errors": 0}
+        for i, p in enumerate(rng.sample(player_ids, 4))
+    ]
+
+
+def apply_edit(client: TestClient, rng: random.Random, player_ids: List[int]) -> str:
+    """One random doubles edit through the API; returns its label."""
+    with Session(main.engine) as session:
+        doubles = session.exec(
+            select(Match.id, Match.played_at).where(Match.format == "doubles").order_by(Match.played_at, Match.id)
+        ).all()
+    kind = rng.choice(("patch", "patch", "delete", "post", "import"))
+    match_id, played_at = rng.choice(doubles)
+
+    if kind == "patch":
+        _check(client.patch(f"/matches/{match_id}", json=_score(rng)))
+    elif kind == "delete":
+        _check(client.delete(f"/matches/{match_id}"))
+    elif kind == "post":
+        _check(client.post("/matches", json={"format": "doubles", **_score(rng), "players": _lineup(rng, player_ids)}))
+    else:
+        lines = [
+            json.dumps({
+                "played_at": (played_at + timedelta(minutes=j + 1)).isoformat(),
+                "format": "doubles",
+                **_score(rng),
+                "players": _lineup(rng, player_ids),
+            })
+            for j in range(rng.randint(1, 4))
+        ]
+        _check(client.post("/matches/import", files={"file": ("edit.jsonl", "\n".join(lines))}))
+    return kind
+
+
+def corrupt_score(rng: random.Random) -> str:
+    """Change a doubles score without telling the chemistry statistics."""
+    with Session(main.engine) as session:
+        doubles = session.exec(select(Match).where(Match.format == "doubles")).all()
+        match = rng.choice(doubles)
+        match.scoreA, match.scoreB = match.scoreB, match.scoreA
+        bump_data_version(session, match.league_id, history_changed=True)
+        session.commit()
+    return "missed edit"
+
+
+def pair_table(session: Session) -> Dict[Tuple[int, int], np.ndarray]:
+    return {
+        (pc.player_id_a, pc.player_id_b): np.array(
+            [np.nan if getattr(pc, c) is None else getattr(pc, c) for c in _FIT_COLUMNS], dtype=float
+        )
+        for pc in session.exec(select(PairChemistry))
+    }
+
+
+def check_edit(label: str, rtol: float, atol: float) -> List[str]:
+    """Compare the incremental pair_chemistry with a full refit; returns the differences."""
+    with Session(main.engine) as session:
+        incremental = pair_table(session)
+        t0 = time.perf_counter()
+        recompute_chemistry(session)
+        session.flush()
+        refit_seconds.append(time.perf_counter() - t0)
+        full = pair_table(session)
+        # Keep the incremental state for the next edit
+        session.rollback()
+    return compare_tables(label, incremental, full, rtol, atol)
+
+
+def check_refresh(rtol: float, atol: float) -> List[str]:
+    """Standard errors refreshed from the incremental statistics vs rebuilt ones."""
+    with Session(main.engine) as session:
+        refresh_pair_uncertainty(session)
+        session.flush()
+        incremental = pair_table(session)
+        recompute_chemistry(session)
+        refresh_pair_uncertainty(session)
+        session.flush()
+        full = pair_table(session)
+        session.rollback()
+
+    errors = compare_tables("uncertainty refresh", incremental, full, rtol, atol)
+    se = _FIT_COLUMNS.index("beta_se")
+    if any(np.isnan(row[se]) for row in incremental.values()):
+        errors.append("[uncertainty refresh] pairs left without beta_se")
+    return errors
+
+
+def compare_tables(
+    label: str,
+    incremental: Dict[Tuple[int, int], np.ndarray],
+    full: Dict[Tuple[int, int], np.ndarray],
+    rtol: float,
+    atol: float,
+) -> List[str]:
+    errors = []
+    if incremental.keys() != full.keys():
+        errors.append(f"pairs differ: {len(incremental.keys() ^ full.keys())} only on one side")
+    worst = defaultdict(float)
+    for pair in incremental.keys() & full.keys():
+        a, b = incremental[pair], full[pair]
+        for column, x, y in zip(_FIT_COLUMNS, a, b):
+            if not np.isclose(x, y, rtol=rtol, atol=atol, equal_nan=True):
+                worst[column] = max(worst[column], abs(x - y))
+    errors += [f"{column} off by up to {err:.3g}" for column, err in worst.items()]
+    return [f"[{label}] {e}" for e in errors]
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="24x1500", help="players x matches for the synthetic league")
+    parser.add_argument("--edits", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rtol", type=float, default=1e-5)
+    parser.add_argument("--atol", type=float, default=1e-6)
+    parser.add_argument("--max-update-ratio", type=float, default=1.0)
+    args = parser.parse_args()
+
+    players, matches = (int(x) for x in args.scale.lower().split("x"))
+    player_ids = populate(LeagueSpec(players=players, matches=matches, doubles_share=0.8, seed=args.seed))
+    client = TestClient(main.app)
+    rng = random.Random(args.seed)
+
+    counts: Dict[str, int] = defaultdict(int)
+    failures: List[str] = []
+    for n in range(args.edits):
+        if n == args.edits // 2:
+            # The edit after this one has to notice and refit
+            counts[corrupt_score(rng)] += 1
+        kind = apply_edit(client, rng, player_ids)
+        counts[kind] += 1
+        failures += check_edit(f"edit {n + 1}: {kind}", args.rtol, args.atol)
+    failures += check_refresh(args.rtol, args.atol)
+
+    update_median = statistics.median(update_seconds)
+    refit_median = statistics.median(refit_seconds)
+    if update_median > args.max_update_ratio * refit_median:
+        failures.append(
+            f"median update_chemistry {update_median * 1000:.1f}ms is over "
+            f"{args.max_update_ratio:g} x the median refit ({refit_median * 1000:.1f}ms)"
+        )
+
+    print(", ".join(f"{n} {kind}" for kind, n in sorted(counts.items())))
+    print(f"median update_chemistry {update_median * 1000:.1f}ms ({len(update_seconds)} calls), "
+          f"recompute_chemistry {refit_median * 1000:.1f}ms")
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+    print("incremental chemistry and its standard errors match the full Ridge fit")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,114 @@
+"""
+Concurrent HTTP load test for the read endpoints.
+
+Drives a running API with --concurrency clients for --duration seconds,
+each cycling through GET /players, /matches?limit=50, /players/{id} and
+/chemistry, then reports throughput and latency percentiles per endpoint.
+
+Usage (from backend/):
+    uvicorn main:app --port 8000 --workers 1 &
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 32 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+
+def _percentile(sorted_samples, q: float) -> float:
+    if not sorted_samples:
+        return float("nan")
+    idx = min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))
+    return sorted_samples[idx]
+
+
+async def _client_loop(client, paths, deadline, latencies, errors, rng):
+    while time.perf_counter() < deadline:
+        label, path = rng.choice(paths)
+        if callable(path):
+            path = path(rng)
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        elapsed = time.perf_counter() - started
+        if ok:
+            latencies[label].append(elapsed)
+        else:
+            errors[label] += 1
+
+
+async def run(url: str, concurrency: int, duration: float, seed: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        players = (await client.get("/players")).json()
+        player_ids = [p["id"] for p in players] or [1]
+
+        paths = [
+            ("GET /players", "/players"),
+            ("GET /matches", "/matches?limit=50"),
+            ("GET /players/{id}", lambda rng: f"/players/{rng.choice(player_ids)}"),
+            ("GET /chemistry", "/chemistry"),
+        ]
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(
+                _client_loop(client, paths, deadline, latencies, errors, random.Random(seed + i))
+                for i in range(concurrency)
+            )
+        )
+        wall = time.perf_counter() - started
+
+    report = {"url": url, "concurrency": concurrency, "duration_s": wall, "endpoints": {}}
+    total = 0
+    for label, _ in paths:
+        samples = sorted(latencies[label])
+        total += len(samples)
+        report["endpoints"][label] = {
+            "requests": len(samples),
+            "errors": errors[label],
+            "rps": len(samples) / wall,
+            "mean_ms": statistics.mean(samples) * 1000 if samples else float("nan"),
+            "p50_ms": _percentile(samples, 0.50) * 1000,
+            "p95_ms": _percentile(samples, 0.95) * 1000,
+            "p99_ms": _percentile(samples, 0.99) * 1000,
+        }
+    report["total_rps"] = total / wall
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.url, args.concurrency, args.duration, args.seed))
+
+    print(f"{args.concurrency} clients for {report['duration_s']:.1f}s against {args.url}: "
+          f"{report['total_rps']:.1f} req/s")
+    for label, r in report["endpoints"].items():
+        print(f"  {label:<18} {r['rps']:7.1f} req/s  p50 {r['p50_ms']:8.1f}ms  "
+              f"p95 {r['p95_ms']:8.1f}ms  p99 {r['p99_ms']:8.1f}ms  errors {r['errors']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
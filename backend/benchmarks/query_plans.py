@@ -0,0 +1,193 @@
+"""
+Query-plan check for the match / match_player / rating_checkpoint hot paths.
+
+Fills a throwaway SQLite stand-in with a synthetic league (schema built by
+main.init_db, so through the migrations), then drives each hot path through
+the real code: the read endpoints, POST /matches with its inline derived
+jobs, PATCH /matches, the full replays and the exports. Every SELECT they
+send is captured and re-run under EXPLAIN QUERY PLAN, and the check fails
+when one of them reads a watched table without an index:
+
+    SCAN match                          full table scan          -> fail
+    SCAN match USING INDEX ix_...       walks an index in order  -> ok
+    SEARCH match_player USING ...       index lookup             -> ok
+
+Queries that need the whole history (the replays, the exports) can only
+walk an index; everything else should show SEARCH. --verbose prints every
+plan. Exits 1 on a full scan, so it can gate CI like a test.
+
+Usage (from backend/):
+    python benchmarks/query_plans.py
+    python benchmarks/query_plans.py --scale 60x5000 --verbose
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix="pickle_elo_plans_")
+os.environ["SUPABASE_DB_URL"] = f"sqlite:///{os.path.join(_db_dir, 'plans.sqlite')}"
+# Derived jobs run inside the request, so their queries are captured too
+os.environ["DERIVED_JOBS_SYNC"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+import main  # noqa: E402
+from history import MatchHistory  # noqa: E402
+from models import Match, MatchPlayer, RatingCheckpoint  # noqa: E402
+from synthetic_league import LeagueSpec, populate  # noqa: E402
+
+WATCHED_TABLES = (Match.__tablename__, MatchPlayer.__tablename__, RatingCheckpoint.__tablename__)
+
+# "SCAN pickle_elo.match" with no USING clause; SQLite names attached
+# tables with their schema
+_FULL_SCAN = re.compile(r"^SCAN (?:\w+\.)?(\w+)$")
+
+_captured: Dict[str, List[Tuple[str, tuple]]] = defaultdict(list)
+_label = None
+
+
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if _label is not None and not executemany and statement.lstrip().upper().startswith("SELECT"):
+        _captured[_label].append((statement, tuple(parameters or ())))
+
+
+@contextmanager
+def hot_path(label: str):
+    global _label
+    _label = label
+    try:
+        yield
+    finally:
+        _label = None
+
+
+def _check(response) -> None:
+    if response.status_code not in (200, 304):
+        raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+
+
+def drive_hot_paths(player_ids: List[int]) -> None:
+    client = TestClient(main.app)
+    pid = player_ids[len(player_ids) // 2]
+
+    with hot_path("GET /players/{id}"):
+        _check(client.get(f"/players/{pid}"))
+    with hot_path("GET /players"):
+        _check(client.get("/players"))
+    with hot_path("GET /leaderboard"):
+        _check(client.get("/leaderboard", params={"limit": 20}))
+    with hot_path("GET /matches"):
+        first = client.get("/matches", params={"limit": 50, "count": True})
+        _check(first)
+        _check(client.get("/matches", params={"limit": 50, "cursor": first.headers["X-Next-Cursor"]}))
+    with hot_path("GET /matches?player_id"):
+        _check(client.get("/matches", params={"limit": 50, "player_id": pid}))
+    with hot_path("GET /matches?format"):
+        _check(client.get("/matches", params={"limit": 50, "format": "doubles"}))
+    with hot_path("GET /king"):
+        _check(client.get("/king"))
+    with hot_path("GET /chemistry"):
+        _check(client.get("/chemistry"))
+
+    with hot_path("POST /matches"):
+        _check(client.post("/matches", json={
+            "format": "doubles",
+            "scoreA": 11,
+            "scoreB": 7,
+            "players": [
+                {"player_id": p, "team_side": "A" if i < 2 else "B", "winners": 0, "errors": 0}
+                for i, p in enumerate(player_ids[:4])
+            ],
+        }))
+
+    with Session(main.engine) as session:
+        matches = session.exec(select(Match).order_by(Match.played_at, Match.id)).all()
+        middle = matches[len(matches) // 2]
+        middle_id, middle_position = middle.id, (middle.played_at, middle.id)
+    with hot_path("PATCH /matches/{id}"):
+        _check(client.patch(f"/matches/{middle_id}", json={"scoreA": 11, "scoreB": 9}))
+    with hot_path("GET /players?as_of"):
+        _check(client.get("/players", params={"as_of": middle_position[0].isoformat()}))
+    with hot_path("GET /king?as_of"):
+        _check(client.get("/king", params={"as_of": middle_position[0].isoformat()}))
+
+    with hot_path("MatchHistory.load"), Session(main.engine) as session:
+        MatchHistory.load(session)
+        MatchHistory.load(session, after=middle_position)
+    with hot_path("recompute_all_ratings"), Session(main.engine) as session:
+        main.recompute_all_ratings(session)
+        session.rollback()
+    with hot_path("recompute_chemistry"), Session(main.engine) as session:
+        main.recompute_chemistry(session)
+        session.rollback()
+
+    with hot_path("GET /export/matches"):
+        _check(client.get("/export/matches", params={"since": middle_position[0].isoformat()}))
+    with hot_path("GET /export/match_players"):
+        _check(client.get("/export/match_players"))
+
+
+def explain(statement: str, parameters: tuple) -> List[str]:
+    with main.engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    scanned = (_FULL_SCAN.match(step.strip()) for step in plan)
+    return [m.group(1) for m in scanned if m and m.group(1) in WATCHED_TABLES]
+
+
+def check_plans(verbose: bool = False) -> int:
+    """Print each hot path's plans; returns the number of full scans found."""
+    failures = 0
+    for label, statements in _captured.items():
+        seen = set()
+        for statement, parameters in statements:
+            if statement in seen or not any(t in statement for t in WATCHED_TABLES):
+                continue
+            seen.add(statement)
+            plan = explain(statement, parameters)
+            scans = full_scans(plan)
+            failures += len(scans)
+            if scans or verbose:
+                status = f"FULL SCAN of {', '.join(scans)}" if scans else "ok"
+                print(f"\n[{label}] {status}")
+                print("    " + " ".join(statement.split())[:400])
+                for step in plan:
+                    print("      " + step)
+        if seen and not verbose:
+            print(f"{label:28s} {len(seen):3d} queries")
+    return failures
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="30x1500", help="players x matches for the synthetic league")
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not just failures")
+    args = parser.parse_args()
+
+    players, matches = (int(x) for x in args.scale.lower().split("x"))
+    player_ids = populate(LeagueSpec(players=players, matches=matches))
+    event.listen(main.engine, "before_cursor_execute", _capture)
+    event.listen(main.async_engine.sync_engine, "before_cursor_execute", _capture)
+    drive_hot_paths(player_ids)
+
+    failures = check_plans(args.verbose)
+    if failures:
+        print(f"\n{failures} full scan(s) of {', '.join(WATCHED_TABLES)} on hot paths")
+        sys.exit(1)
+    print("\nno full scans on hot paths")
+
+
+if __name__ == "__main__":
+    main_cli()
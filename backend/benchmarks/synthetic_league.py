@@ -0,0 +1,207 @@
+"""
+Seeded synthetic league generator for the SQLite stand-in.
+
+Players get a hidden skill drawn from a configurable distribution. Each
+match picks random players, then plays it rally by rally: the team with the
+higher average skill wins rallies more often. Every rally is credited as a
+winner for someone on the scoring side or an error for someone on the
+other side. Some matches leave winners/errors untracked (all zeros) the way
+quick entries do, so create_match's auto-fill path is exercised too.
+
+The generated matches go through match_import, so they are validated and
+rated exactly like a real bulk import.
+
+Usage (from backend/):
+    python benchmarks/synthetic_league.py --db sqlite:///league.sqlite \\
+        --players 100 --matches 10000 --doubles-share 0.6 --skill bimodal
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SKILL_DISTRIBUTIONS = ("normal", "uniform", "bimodal")
+
+# Divides the skill gap for single rallies: a 200-point favourite wins
+# ~57% of rallies but most games
+RALLY_SKILL_SCALE = 4.0
+
+
+@dataclass
+class LeagueSpec:
+    players: int = 40
+    matches: int = 2000
+    doubles_share: float = 0.6
+    skill: str = "normal"     # one of SKILL_DISTRIBUTIONS
+    skill_spread: float = 200.0
+    tracked_share: float = 0.7  # matches with winners/errors filled in
+    days: int = 365             # played_at spread
+    seed: int = 0
+
+
+def draw_skills(spec: LeagueSpec, rng: random.Random) -> List[float]:
+    if spec.skill == "normal":
+        return [rng.gauss(1000.0, spec.skill_spread) for _ in range(spec.players)]
+    if spec.skill == "uniform":
+        return [
+            rng.uniform(1000.0 - 1.7 * spec.skill_spread, 1000.0 + 1.7 * spec.skill_spread)
+            for _ in range(spec.players)
+        ]
+    if spec.skill == "bimodal":
+        # Casual majority plus a competitive group
+        return [
+            rng.gauss(1000.0 + (1.5 if rng.random() < 0.3 else -0.5) * spec.skill_spread,
+                      spec.skill_spread / 2)
+            for _ in range(spec.players)
+        ]
+    raise ValueError(f"Unknown skill distribution {spec.skill!r}; use one of {SKILL_DISTRIBUTIONS}")
+
+
+def _play_rallies(
+    rng: random.Random,
+    skill_a: float,
+    skill_b: float,
+    team_a: List[int],
+    team_b: List[int],
+) -> Tuple[int, int, dict]:
+    """Rally-point game to 11, win by 2. Returns (scoreA, scoreB, {pid: [winners, errors]})."""
+    p_rally = 1.0 / (1.0 + 10.0 ** ((skill_b - skill_a) / (400.0 * RALLY_SKILL_SCALE)))
+    score = {"A": 0, "B": 0}
+    credit = {pid: [0, 0] for pid in team_a + team_b}
+
+    while not (max(score.values()) >= 11 and abs(score["A"] - score["B"]) >= 2):
+        a_scores = rng.random() < p_rally
+        score["A" if a_scores else "B"] += 1
+        scorers, conceders = (team_a, team_b) if a_scores else (team_b, team_a)
+        if rng.random() < 0.5:
+            credit[rng.choice(scorers)][0] += 1
+        else:
+            credit[rng.choice(conceders)][1] += 1
+
+    return score["A"], score["B"], credit
+
+
+def generate_matches(spec: LeagueSpec, player_ids: List[int]):
+    """
+    Build MatchImportIn rows for an existing list of player ids, in
+    chronological order. Deterministic for a given spec and player list.
+    """
+    from match_import import MatchImportIn
+
+    rng = random.Random(spec.seed)
+    skills = dict(zip(player_ids, draw_skills(spec, rng)))
+    start = datetime(2024, 1, 1)
+    step = timedelta(days=spec.days) / max(spec.matches, 1)
+
+    matches: List[MatchImportIn] = []
+    for n in range(spec.matches):
+        doubles = rng.random() < spec.doubles_share and len(player_ids) >= 4
+        per_side = 2 if doubles else 1
+        picked = rng.sample(player_ids, 2 * per_side)
+        team_a, team_b = picked[:per_side], picked[per_side:]
+
+        skill_a = sum(skills[p] for p in team_a) / per_side
+        skill_b = sum(skills[p] for p in team_b) / per_side
+        score_a, score_b, credit = _play_rallies(rng, skill_a, skill_b, team_a, team_b)
+        tracked = rng.random() < spec.tracked_share
+
+        matches.append(
+            MatchImportIn(
+                played_at=start + step * n,
+                format="doubles" if doubles else "singles",
+                scoreA=score_a,
+                scoreB=score_b,
+                players=[
+                    {
+                        "player_id": pid,
+                        "team_side": "A" if pid in team_a else "B",
+                        "winners": credit[pid][0] if tracked else 0,
+                        "errors": credit[pid][1] if tracked else 0,
+                    }
+                    for pid in picked
+                ],
+            )
+        )
+    return matches
+
+
+def reset_database(engine) -> None:
+    """Drop and recreate every pickle_elo table."""
+    from sqlmodel import Session, SQLModel
+    from data_version import ensure_data_version
+    from history import history_store
+    from migrations import migrate
+
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    migrate(engine)
+    history_store.invalidate()
+    with Session(engine) as session:
+        ensure_data_version(session)
+
+
+def populate(spec: LeagueSpec, wait: float = 600.0) -> List[int]:
+    """
+    Reset main.engine's database and fill it with a synthetic league, then
+    wait for crowns/chemistry to catch up. Returns the player ids.
+    """
+    import main
+    from sqlmodel import Session
+    from models import Player
+
+    reset_database(main.engine)
+    with Session(main.engine) as session:
+        players = [Player(name=f"Player {i + 1}") for i in range(spec.players)]
+        session.add_all(players)
+        session.commit()
+        player_ids = [p.id for p in players]
+
+        main.import_matches(session, generate_matches(spec, player_ids))
+
+    if not main.derived_jobs.wait_until_caught_up(timeout=wait):
+        raise RuntimeError(f"derived jobs did not catch up: {main.derived_jobs.status()}")
+    return player_ids
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", required=True, help="SQLite URL, e.g. sqlite:///league.sqlite")
+    parser.add_argument("--players", type=int, default=LeagueSpec.players)
+    parser.add_argument("--matches", type=int, default=LeagueSpec.matches)
+    parser.add_argument("--doubles-share", type=float, default=LeagueSpec.doubles_share)
+    parser.add_argument("--skill", choices=SKILL_DISTRIBUTIONS, default=LeagueSpec.skill)
+    parser.add_argument("--skill-spread", type=float, default=LeagueSpec.skill_spread)
+    parser.add_argument("--tracked-share", type=float, default=LeagueSpec.tracked_share)
+    parser.add_argument("--days", type=int, default=LeagueSpec.days)
+    parser.add_argument("--seed", type=int, default=LeagueSpec.seed)
+    args = parser.parse_args()
+
+    if not args.db.startswith("sqlite"):
+        raise SystemExit("Refusing to reset a non-SQLite database")
+    os.environ["SUPABASE_DB_URL"] = args.db
+
+    spec = LeagueSpec(
+        players=args.players,
+        matches=args.matches,
+        doubles_share=args.doubles_share,
+        skill=args.skill,
+        skill_spread=args.skill_spread,
+        tracked_share=args.tracked_share,
+        days=args.days,
+        seed=args.seed,
+    )
+    t0 = time.perf_counter()
+    populate(spec)
+    print(f"{spec.players} players, {spec.matches} matches written to {args.db} "
+          f"in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
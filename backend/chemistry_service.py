@@ -1,17 +1,49 @@
-from sqlmodel import Session, select, delete
-from models import Match, MatchPlayer, PairChemistry
+from sqlmodel import Session, select, delete, update
+from models import DEFAULT_LEAGUE_ID, Match, MatchPlayer, PairChemistry, ChemistryState
+from player_stats import insert_for
+from history import history_store
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+import argparse
+import io
+import os
+import time
 import numpy as np
 from scipy import sparse
+from scipy.linalg import lapack
+from scipy.sparse.linalg import LinearOperator, SuperLU, cg, splu
+from scipy.stats import t as student_t
+from sqlalchemy import tuple_
 from sklearn.linear_model import Ridge
+from instrumentation import traced, span
+
+# Two-sided level of the beta_ci_* / beta_boot_ci_* intervals
+CHEMISTRY_CI_LEVEL = 0.95
+# Columns of the inverse normal matrix solved per block when diag(A⁻¹) can't
+# come from the selected inverse; bounds the working memory at
+# D x CHEMISTRY_SE_BLOCK floats
+CHEMISTRY_SE_BLOCK = 256
+# Relative step in λ of the central difference that gives the λ A⁻² term of
+# beta_se (see _pair_uncertainty); the error is O(step²)
+CHEMISTRY_SE_STEP = 1e-4
+# The derived-data worker refreshes beta_se and the intervals at most this
+# often (seconds); refits in between carry the stored ones over
+CHEMISTRY_SE_REFRESH_SECONDS = 600
+# Stopping tolerance (relative residual) of the conjugate-gradient Ridge
+# solves: sklearn's in the full refit and _solve_ridge's in updates. sklearn's
+# 1e-4 default leaves coefficients ~1e-3 off the exact solution; this keeps
+# the two paths within ~1e-8, so beta_t_stat = beta / se agrees too
+CHEMISTRY_RIDGE_TOL = 1e-10
 
 
 # ---------- 1. Helper: fetch all doubles matches as dicts ----------
 
-def fetch_doubles_matches(session: Session) -> List[dict]:
+def fetch_doubles_matches(session: Session, league_id: int = DEFAULT_LEAGUE_ID) -> List[dict]:
     """
-    Return all valid doubles matches in a simple, regression-friendly shape.
+    Return all valid doubles matches of a league in a simple,
+    regression-friendly shape.
 
     Each row is:
         {
@@ -23,66 +55,124 @@ def fetch_doubles_matches(session: Session) -> List[dict]:
         }
 
     A 'valid' doubles match here means exactly 2 players on side A and B.
+    Read from the shared in-memory history (history.history_store), in
+    chronological order.
     """
-    stmt = (
-        select(Match, MatchPlayer)
-        .where(
-            Match.format == "doubles",
-            MatchPlayer.match_id == Match.id,
-        )
-    )
+    return history_store.get(session, league_id).doubles_rows()
 
-    result = session.exec(stmt).all()
-
-    grouped: Dict[int, Dict[str, object]] = {}
-    for match, mp in result:
-        if match.id not in grouped:
-            grouped[match.id] = {
-                "match": match,
-                "A": [],
-                "B": [],
-            }
-
-        if mp.team_side == "A":
-            grouped[match.id]["A"].append(mp.player_id)
-        elif mp.team_side == "B":
-            grouped[match.id]["B"].append(mp.player_id)
-        else:
-            # ignore weird team_side values
-            continue
 
-    rows: List[dict] = []
-    for match_id, info in grouped.items():
-        match: Match = info["match"]          # type: ignore
-        team_a_players: List[int] = info["A"] # type: ignore
-        team_b_players: List[int] = info["B"] # type: ignore
+@dataclass
+class DoublesTable:
+    """
+    Doubles rows in the fetch_doubles_matches() shape, as parallel arrays.
 
-        # Only accept proper doubles (2 per side)
-        if len(team_a_players) != 2 or len(team_b_players) != 2:
-            continue
+    teams[m] holds the player ids (i, j, k, l): team A then team B.
+    """
+    match_id: np.ndarray  # (M,) int64
+    teams: np.ndarray     # (M, 4) int64
+    scores: np.ndarray    # (M, 2) int64: score_a, score_b
 
-        rows.append(
-            {
-                "match_id": match_id,
-                "team_a": team_a_players,
-                "team_b": team_b_players,
-                "score_a": match.scoreA,
-                "score_b": match.scoreB,
-            }
-        )
+    def __len__(self) -> int:
+        return len(self.match_id)
+
+
+def fetch_doubles_table(session: Session, league_id: int = DEFAULT_LEAGUE_ID) -> DoublesTable:
+    """fetch_doubles_matches() as a DoublesTable, straight from the history arrays."""
+    return DoublesTable(*history_store.get(session, league_id).doubles_arrays())
 
-    return rows
+
+def _doubles_table(rows: List[dict]) -> DoublesTable:
+    return DoublesTable(
+        match_id=np.array([r["match_id"] for r in rows], dtype=np.int64),
+        teams=np.array([r["team_a"] + r["team_b"] for r in rows], dtype=np.int64).reshape(-1, 4),
+        scores=np.array([(r["score_a"], r["score_b"]) for r in rows], dtype=np.int64).reshape(-1, 2),
+    )
 
 
 # ---------- 2. Core job: recompute chemistry ----------
 
+@dataclass
+class DoublesArrays:
+    """
+    Doubles rows as integer index arrays.
+
+    players[m] holds the feature index of (i, j, k, l): team A then team B.
+    pairs[m] holds the pair index of (team A pair, team B pair).
+    y is team A's point share, w the total points (both 0 for 0-0 games).
+    """
+    players: np.ndarray  # (M, 4) int64
+    pairs: np.ndarray    # (M, 2) int64
+    y: np.ndarray        # (M,) float
+    w: np.ndarray        # (M,) float
+
+
+def _team_arrays(table: DoublesTable) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (teams, pair_lo, pair_hi, scores):
+    teams (M, 4) player ids i, j, k, l; pair_lo / pair_hi (M, 2) the sorted
+    player ids of the team A / team B pair; scores (M, 2) score_a, score_b.
+    """
+    teams, scores = table.teams, table.scores
+    first = teams[:, [0, 2]]
+    second = teams[:, [1, 3]]
+    return teams, np.minimum(first, second), np.maximum(first, second), scores
+
+
+def _feature_ids(table: DoublesTable) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """Sorted player ids and (lo, hi) pair ids appearing in table."""
+    teams, pair_lo, pair_hi, _ = _team_arrays(table)
+    player_ids = [int(pid) for pid in np.unique(teams)]
+    pair_ids = [
+        (int(a), int(b))
+        for a, b in np.unique(np.stack([pair_lo.ravel(), pair_hi.ravel()], axis=1), axis=0)
+    ]
+    return player_ids, pair_ids
+
+
+def _lookup(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Position of each value in keys (keys unique, any order; values must exist)."""
+    sorter = np.argsort(keys, kind="stable")
+    return sorter[np.searchsorted(keys, values, sorter=sorter)]
+
+
+def _index_rows(
+    table: DoublesTable,
+    player_ids: List[int],
+    pair_ids: List[Tuple[int, int]],
+) -> DoublesArrays:
+    """
+    Map rows onto feature indices: player_ids[idx] is player feature idx and
+    pair_ids[idx] is pair feature idx (X_full column P + idx).
+    """
+    teams, pair_lo, pair_hi, scores = _team_arrays(table)
+
+    player_keys = np.asarray(player_ids, dtype=np.int64)
+    pair_keys = np.asarray(pair_ids, dtype=np.int64).reshape(-1, 2)
+    base = int(max(player_keys.max(initial=0), teams.max(initial=0))) + 1
+
+    players = _lookup(player_keys, teams)
+    pairs = _lookup(pair_keys[:, 0] * base + pair_keys[:, 1], pair_lo * base + pair_hi)
+
+    total = scores[:, 0] + scores[:, 1]
+    valid = total > 0
+    y = np.zeros(len(table), dtype=float)  # p_m
+    # ignore degenerate matches, leave y[m], w[m] at zero
+    y[valid] = scores[valid, 0] / total[valid]
+    w = np.where(valid, total, 0).astype(float)  # total points
+
+    return DoublesArrays(players=players, pairs=pairs, y=y, w=w)
+
+
+@traced("recompute_chemistry")
 def recompute_chemistry(
     session: Session,
+    league_id: int = DEFAULT_LEAGUE_ID,
     lambda_alpha: float = 1.0,
     lambda_full: float = 1.0,
 ) -> None:
     """
-    Full recompute of doubles chemistry.
+    Full recompute of one league's doubles chemistry; other leagues' pairs
+    and cached statistics are left alone.
 
     Steps:
       1) Load doubles matches
@@ -91,236 +181,1026 @@ def recompute_chemistry(
       4) Fit alpha-only baseline model on point share p
       5) Fit full alpha+beta model
       6) Compute residuals vs baseline and mutual uplift
-      7) Aggregate per pair and write to pair_chemistry
+      7) Aggregate per pair and write to pair_chemistry. Standard errors,
+         t-statistics and intervals are carried over from the stored rows;
+         refresh_pair_uncertainty() recomputes them
+
+    Also caches the weighted normal-equation statistics of X_full so later
+    matches can go through update_chemistry() instead of a full refit.
+    Does not commit; the cache and the table change in one transaction.
     """
-    rows = fetch_doubles_matches(session)
-    if not rows:
+    table = fetch_doubles_table(session, league_id)
+    if not len(table):
         # Nothing to do
         return
 
     # ---------- 2.1 Collect players, pairs, and basic arrays ----------
 
-    M = len(rows)
-    y = np.zeros(M, dtype=float)  # p_m
-    w = np.zeros(M, dtype=float)  # total points
-
-    player_ids_set = set()
-    pair_ids_set: set[Tuple[int, int]] = set()
-
-    for r in rows:
-        i, j = r["team_a"]
-        k, l = r["team_b"]
-        player_ids_set.update([i, j, k, l])
-
-        pair_ids_set.add(tuple(sorted((i, j))))
-        pair_ids_set.add(tuple(sorted((k, l))))
-
-    player_ids = sorted(player_ids_set)
-    pair_ids = sorted(pair_ids_set)
+    player_ids, pair_ids = _feature_ids(table)
 
     P = len(player_ids)
     Q = len(pair_ids)
-    D_alpha = P
-    D_full = P + Q
 
     # If somehow no players or no pairs, bail
     if P == 0 or Q == 0:
         return
 
-    player_index: Dict[int, int] = {pid: idx for idx, pid in enumerate(player_ids)}
-    pair_index: Dict[Tuple[int, int], int] = {
-        pair: idx for idx, pair in enumerate(pair_ids)
-    }
+    arrays = _index_rows(table, player_ids, pair_ids)
 
     # ---------- 2.2 Build X_alpha and X_full (sparse) ----------
 
-    X_alpha = sparse.lil_matrix((M, D_alpha), dtype=float)
-    X_full = sparse.lil_matrix((M, D_full), dtype=float)
-
-    # We'll also store p_hat_base later for each match, but for now just build X & y & w.
-    for m, r in enumerate(rows):
-        i, j = r["team_a"]
-        k, l = r["team_b"]
-        points_a: int = r["score_a"]
-        points_b: int = r["score_b"]
-        total = points_a + points_b
-
-        if total <= 0:
-            # ignore degenerate matches, leave y[m], w[m] at zero
-            continue
-
-        p_m = points_a / total
-        y[m] = p_m
-        w[m] = total
-
-        # Player contributions (alpha-only)
-        X_alpha[m, player_index[i]] += 1.0
-        X_alpha[m, player_index[j]] += 1.0
-        X_alpha[m, player_index[k]] += -1.0
-        X_alpha[m, player_index[l]] += -1.0
-
-        # Player contributions (full)
-        X_full[m, player_index[i]] += 1.0
-        X_full[m, player_index[j]] += 1.0
-        X_full[m, player_index[k]] += -1.0
-        X_full[m, player_index[l]] += -1.0
-
-        # Pair contributions (beta)
-        pairA = pair_index[tuple(sorted((i, j)))]
-        pairB = pair_index[tuple(sorted((k, l)))]
-
-        X_full[m, P + pairA] += 1.0
-        X_full[m, P + pairB] += -1.0
+    X_alpha, X_full = _build_design(arrays, P, Q)
+    y, w = arrays.y, arrays.w
 
     # If every match was degenerate (no points), bail
     if np.all(w <= 0):
         return
 
-    X_alpha = X_alpha.tocsr()
-    X_full = X_full.tocsr()
-
     # ---------- 2.3 Fit alpha-only baseline model ----------
 
-    model_alpha = Ridge(alpha=lambda_alpha, fit_intercept=True)
-    model_alpha.fit(X_alpha, y, sample_weight=w)
+    with span("chemistry_ridge_fit"):
+        model_alpha = Ridge(alpha=lambda_alpha, fit_intercept=True, tol=CHEMISTRY_RIDGE_TOL)
+        model_alpha.fit(X_alpha, y, sample_weight=w)
 
     p_hat_base = model_alpha.predict(X_alpha)
-    p_hat_base = np.clip(p_hat_base, 0.0, 1.0)
-    residuals = y - p_hat_base
 
     # ---------- 2.4 Fit full alpha+beta model ----------
 
-    model_full = Ridge(alpha=lambda_full, fit_intercept=True)
-    model_full.fit(X_full, y, sample_weight=w)
+    with span("chemistry_ridge_fit"):
+        model_full = Ridge(alpha=lambda_full, fit_intercept=True, tol=CHEMISTRY_RIDGE_TOL)
+        model_full.fit(X_full, y, sample_weight=w)
 
     theta_full = model_full.coef_
     beta_full = theta_full[P:P + Q]  # chemistry coefficients per pair index
 
-    # ---------- 2.5 Compute player baseline residuals R_i ----------
+    # Cache sufficient statistics for incremental updates, and both
+    # solutions to warm-start their next solve
+    stats = _state_from_design(X_full, y, w, player_ids, pair_ids, _rows_digest(table))
+    stats.coef_alpha = model_alpha.coef_
+    stats.coef_full = theta_full
+    _save_state(session, league_id, stats)
+
+    agg = _aggregate_pairs(arrays, p_hat_base, player_ids, pair_ids)
+    _write_pair_chemistry(session, league_id, pair_ids, beta_full, agg)
+
+
+def _build_design(
+    arrays: DoublesArrays,
+    P: int,
+    Q: int,
+) -> Tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    """
+    Build X_alpha (players only) and X_full (players + pairs) in one COO
+    step each. X_full columns are laid out as [players..., P + pairs...].
 
-    # player_residual_sum[i], player_residual_count[i] from all matches
-    player_residual_sum: Dict[int, float] = {pid: 0.0 for pid in player_ids}
-    player_residual_count: Dict[int, int] = {pid: 0 for pid in player_ids}
+    Team A players get +1, team B players -1; same for the two pairs.
+    Degenerate (0-0) matches keep an all-zero row.
+    """
+    M = len(arrays.y)
+    rows = np.flatnonzero(arrays.w > 0)
+
+    player_cols = arrays.players[rows]                      # (M', 4)
+    player_vals = np.broadcast_to([1.0, 1.0, -1.0, -1.0], player_cols.shape)
+    pair_cols = P + arrays.pairs[rows]                      # (M', 2)
+    pair_vals = np.broadcast_to([1.0, -1.0], pair_cols.shape)
+
+    X_alpha = sparse.coo_matrix(
+        (player_vals.ravel(), (np.repeat(rows, 4), player_cols.ravel())),
+        shape=(M, P),
+    ).tocsr()
+    X_full = sparse.coo_matrix(
+        (
+            np.concatenate([player_vals, pair_vals], axis=1).ravel(),
+            (np.repeat(rows, 6), np.concatenate([player_cols, pair_cols], axis=1).ravel()),
+        ),
+        shape=(M, P + Q),
+    ).tocsr()
+
+    # Duplicates were summed; drop any that cancelled out
+    X_alpha.eliminate_zeros()
+    X_full.eliminate_zeros()
+    return X_alpha, X_full
+
+
+def _aggregate_pairs(
+    arrays: DoublesArrays,
+    p_hat_base: np.ndarray,
+    player_ids: List[int],
+    pair_ids: List[Tuple[int, int]],
+) -> Dict[str, np.ndarray]:
+    """
+    Steps 2.5 - 2.6: residuals vs the alpha-only baseline, then per-pair
+    games, uplift and point shares (arrays indexed like pair_ids).
 
-    for m, r in enumerate(rows):
-        i, j = r["team_a"]
-        k, l = r["team_b"]
+    p_hat_base is the unclipped baseline prediction per row.
 
-        res_m = residuals[m]
+    Every per-player / per-pair sum is an np.bincount over the (M, 4) / (M, 2)
+    index arrays flattened match-major, so each bin adds its terms in match
+    order exactly like a Python loop over the rows would.
+    """
+    P = len(player_ids)
+    Q = len(pair_ids)
+    y = arrays.y
 
-        # For team A players, residual is as-is
-        for pid in [i, j]:
-            player_residual_sum[pid] += res_m
-            player_residual_count[pid] += 1
+    p_hat_base = np.clip(p_hat_base, 0.0, 1.0)
+    residuals = y - p_hat_base
 
-        # For team B players, sign is flipped
-        for pid in [k, l]:
-            player_residual_sum[pid] -= res_m
-            player_residual_count[pid] += 1
+    # ---------- 2.5 Compute player baseline residuals R_i ----------
+
+    # Team A players take the residual as-is, team B players flipped
+    player_flat = arrays.players.ravel()
+    signed_res = np.stack([residuals, residuals, -residuals, -residuals], axis=1)
+    player_residual_sum = np.bincount(player_flat, weights=signed_res.ravel(), minlength=P)
+    player_residual_count = np.bincount(player_flat, minlength=P)
 
     # R_i: average residual performance baseline per player
-    R_i: Dict[int, float] = {}
-    for pid in player_ids:
-        cnt = player_residual_count[pid]
-        if cnt > 0:
-            R_i[pid] = player_residual_sum[pid] / cnt
-        else:
-            R_i[pid] = 0.0
+    R_i = np.zeros(P)
+    has_games = player_residual_count > 0
+    R_i[has_games] = player_residual_sum[has_games] / player_residual_count[has_games]
 
     # ---------- 2.6 Compute pair-level residuals & uplift ----------
 
-    # We also want:
-    #   games_together[(a,b)]
-    #   sum_residual_a_with_b[(a,b)]
-    #   sum_residual_b_with_a[(a,b)]
-    #   sum_point_share[(a,b)] from pair's POV
-    #   sum_point_share_base[(a,b)] from pair's POV
-
-    games_together: Dict[Tuple[int, int], int] = {pair: 0 for pair in pair_ids}
-    sum_residual_a_with_b: Dict[Tuple[int, int], float] = {pair: 0.0 for pair in pair_ids}
-    sum_residual_b_with_a: Dict[Tuple[int, int], float] = {pair: 0.0 for pair in pair_ids}
-    sum_point_share: Dict[Tuple[int, int], float] = {pair: 0.0 for pair in pair_ids}
-    sum_point_share_base: Dict[Tuple[int, int], float] = {pair: 0.0 for pair in pair_ids}
-
-    for m, r in enumerate(rows):
-        i, j = r["team_a"]
-        k, l = r["team_b"]
-        res_m = residuals[m]
-        p_m = y[m]
-        p_base_m = p_hat_base[m]
-
-        pairA = tuple(sorted((i, j)))
-        pairB = tuple(sorted((k, l)))
-
-        # For pairA on Team A: residual applies as-is, point share is p_m from A's POV
-        games_together[pairA] += 1
-        sum_residual_a_with_b[pairA] += res_m      # for player i with j
-        sum_residual_b_with_a[pairA] += res_m      # for player j with i
-        sum_point_share[pairA] += p_m
-        sum_point_share_base[pairA] += p_base_m
-
-        # For pairB on Team B: residual is flipped (from B's POV),
-        # and the point share from B's POV is (1 - p_m)
-        games_together[pairB] += 1
-        sum_residual_a_with_b[pairB] -= res_m      # for player k with l
-        sum_residual_b_with_a[pairB] -= res_m      # for player l with k
-        sum_point_share[pairB] += (1.0 - p_m)
-        sum_point_share_base[pairB] += (1.0 - p_base_m)
+    # Pair on team A: residual as-is, point share p_m.
+    # Pair on team B: residual flipped, point share (1 - p_m).
+    pair_flat = arrays.pairs.ravel()
+    games_together = np.bincount(pair_flat, minlength=Q)
+    # The residual sum is the same for both players of the pair
+    # (R_a|b and R_b|a only differ by which baseline R_i they subtract).
+    sum_residual_pair = np.bincount(
+        pair_flat, weights=np.stack([residuals, -residuals], axis=1).ravel(), minlength=Q
+    )
+    sum_point_share = np.bincount(
+        pair_flat, weights=np.stack([y, 1.0 - y], axis=1).ravel(), minlength=Q
+    )
+    sum_point_share_base = np.bincount(
+        pair_flat, weights=np.stack([p_hat_base, 1.0 - p_hat_base], axis=1).ravel(), minlength=Q
+    )
 
     # Now compute R_i|j, R_j|i, and U_i|j, U_j|i per pair
-    uplift_a_given_b: Dict[Tuple[int, int], float] = {}
-    uplift_b_given_a: Dict[Tuple[int, int], float] = {}
-    avg_point_share: Dict[Tuple[int, int], float] = {}
-    avg_point_share_base: Dict[Tuple[int, int], float] = {}
-
-    for pair in pair_ids:
-        a, b = pair
-        games = games_together[pair]
-        if games <= 0:
-            uplift_a_given_b[pair] = 0.0
-            uplift_b_given_a[pair] = 0.0
-            avg_point_share[pair] = 0.0
-            avg_point_share_base[pair] = 0.0
-            continue
+    pair_keys = np.asarray(pair_ids, dtype=np.int64).reshape(-1, 2)
+    player_keys = np.asarray(player_ids, dtype=np.int64)
+    a_idx = _lookup(player_keys, pair_keys[:, 0])
+    b_idx = _lookup(player_keys, pair_keys[:, 1])
+
+    played = games_together > 0
+    games = np.where(played, games_together, 1)
+    R_pair = np.where(played, sum_residual_pair / games, 0.0)
+
+    uplift_a_given_b = np.where(played, R_pair - R_i[a_idx], 0.0)
+    uplift_b_given_a = np.where(played, R_pair - R_i[b_idx], 0.0)
+    avg_point_share = np.where(played, sum_point_share / games, 0.0)
+    avg_point_share_base = np.where(played, sum_point_share_base / games, 0.0)
+
+    return {
+        "games_together": games_together,
+        "uplift_a_given_b": uplift_a_given_b,
+        "uplift_b_given_a": uplift_b_given_a,
+        "avg_point_share": avg_point_share,
+        "avg_point_share_base": avg_point_share_base,
+    }
+
+
+# pair_chemistry columns a refit writes; beta_boot_ci_* belong to
+# bootstrap_pair_intervals() and are left alone
+_FIT_COLUMNS = (
+    "games_together",
+    "beta_chemistry",
+    "beta_t_stat",
+    "beta_se",
+    "beta_ci_low",
+    "beta_ci_high",
+    "uplift_a_given_b",
+    "uplift_b_given_a",
+    "avg_point_share",
+    "avg_point_share_base",
+)
+
+
+# Their stored values outlive a refit, see _carried_uncertainty
+_UNCERTAINTY_COLUMNS = ("beta_t_stat", "beta_se", "beta_ci_low", "beta_ci_high")
+
+
+def _uncertainty_columns(beta: float, se: float, half_width: float) -> Dict[str, float]:
+    """The _UNCERTAINTY_COLUMNS of a pair with coefficient beta."""
+    return {
+        "beta_t_stat": beta / se if se > 0 else 0.0,
+        "beta_se": se,
+        "beta_ci_low": beta - half_width,
+        "beta_ci_high": beta + half_width,
+    }
 
-        R_a_given_b = sum_residual_a_with_b[pair] / games
-        R_b_given_a = sum_residual_b_with_a[pair] / games
 
-        U_a_b = R_a_given_b - R_i.get(a, 0.0)
-        U_b_a = R_b_given_a - R_i.get(b, 0.0)
+def _carried_uncertainty(
+    beta: float,
+    old: Optional[Dict[str, Optional[float]]],
+) -> Dict[str, Optional[float]]:
+    """
+    Uncertainty columns of a refit pair: the standard error and interval
+    width of its stored row old (from the last refresh_pair_uncertainty),
+    recentred on the new beta. All None for a pair that has none yet.
+    """
+    if old is None or old["beta_se"] is None:
+        return {name: None for name in _UNCERTAINTY_COLUMNS}
+    half_width = (old["beta_ci_high"] - old["beta_ci_low"]) / 2.0
+    return _uncertainty_columns(beta, old["beta_se"], half_width)
 
-        uplift_a_given_b[pair] = U_a_b
-        uplift_b_given_a[pair] = U_b_a
-        avg_point_share[pair] = sum_point_share[pair] / games
-        avg_point_share_base[pair] = sum_point_share_base[pair] / games
 
-    # ---------- 2.7 Write results into pair_chemistry ----------
+def _write_pair_chemistry(
+    session: Session,
+    league_id: int,
+    pair_ids: List[Tuple[int, int]],
+    beta_full: np.ndarray,
+    agg: Dict[str, np.ndarray],
+) -> None:
+    """
+    Step 2.7: bring the league's pair_chemistry rows in line with a fit.
+    beta_full[idx] and agg[...][idx] belong to pair_ids[idx]; pairs without
+    games get no row.
+
+    Diffs against the stored rows: pairs whose values changed go out as one
+    bulk INSERT ... ON CONFLICT DO UPDATE and rows of pairs that are gone
+    are deleted, all in the caller's transaction, so readers see either the
+    old table or the new one. Bootstrap intervals aren't in the upsert, so
+    existing rows keep theirs; standard errors are carried over (see
+    _carried_uncertainty). Does not commit.
+    """
+    keep = np.flatnonzero(agg["games_together"] > 0)
+    values = {
+        "games_together": agg["games_together"][keep].astype(int).tolist(),
+        "beta_chemistry": beta_full[keep].tolist(),
+        "uplift_a_given_b": agg["uplift_a_given_b"][keep].tolist(),
+        "uplift_b_given_a": agg["uplift_b_given_a"][keep].tolist(),
+        "avg_point_share": agg["avg_point_share"][keep].tolist(),
+        "avg_point_share_base": agg["avg_point_share_base"][keep].tolist(),
+    }
+
+    stored = {
+        (a, b): tuple(rest)
+        for a, b, *rest in session.exec(
+            select(
+                PairChemistry.player_id_a,
+                PairChemistry.player_id_b,
+                *(getattr(PairChemistry, name) for name in _FIT_COLUMNS),
+            ).where(PairChemistry.league_id == league_id)
+        ).all()
+    }
+
+    fitted = {}
+    for k, idx in enumerate(keep):
+        pair = pair_ids[idx]
+        row = {name: column[k] for name, column in values.items()}
+        old = stored.get(pair)
+        row.update(_carried_uncertainty(
+            row["beta_chemistry"], None if old is None else dict(zip(_FIT_COLUMNS, old))
+        ))
+        fitted[pair] = tuple(row[name] for name in _FIT_COLUMNS)
 
     now = datetime.utcnow()
+    changed = [
+        {
+            "player_id_a": a,
+            "player_id_b": b,
+            "league_id": league_id,
+            **dict(zip(_FIT_COLUMNS, row)),
+            "last_updated": now,
+        }
+        for (a, b), row in fitted.items()
+        if stored.get((a, b)) != row
+    ]
+    if changed:
+        insert = insert_for(session)
+        stmt = insert(PairChemistry)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PairChemistry.player_id_a, PairChemistry.player_id_b],
+            set_={name: getattr(stmt.excluded, name) for name in (*_FIT_COLUMNS, "last_updated")},
+        )
+        session.exec(stmt, params=changed)
+
+    gone = sorted(stored.keys() - fitted.keys())
+    if gone:
+        session.exec(
+            delete(PairChemistry).where(
+                tuple_(PairChemistry.player_id_a, PairChemistry.player_id_b).in_(gone)
+            )
+        )
+
+
+# ---------- 3. Incremental updates from cached normal equations ----------
+
+@dataclass
+class NormalEquationStats:
+    """
+    Weighted sufficient statistics of the X_full design matrix.
+
+    Features are laid out [players..., pairs...], so the alpha-only model is
+    the leading player block. With these, a Ridge fit with intercept and
+    sample weights is a sparse solve; adding or removing a match is a
+    rank-one update.
+
+    coef_alpha / coef_full are the last solutions of the two models, the
+    starting point of the next solve (see _solve_ridge).
+    """
+    player_ids: List[int]
+    pair_ids: List[Tuple[int, int]]
+    xtwx: sparse.csr_matrix  # (D, D)  Σ w x xᵀ
+    xtwy: np.ndarray         # (D,)    Σ w y x
+    sx: np.ndarray           # (D,)    Σ w x
+    sw: float                # Σ w
+    swy: float               # Σ w y
+    n_rows: int              # doubles rows folded into the statistics
+    rows_digest: int = 0     # _rows_digest() of exactly those rows
+    coef_alpha: Optional[np.ndarray] = None  # (P,)  None until solved
+    coef_full: Optional[np.ndarray] = None   # (D,)
+
+
+_DIGEST_MOD = 1 << 64
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, elementwise on uint64 (wraps like the C original)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
 
-    # Clear existing table and repopulate
-    session.exec(delete(PairChemistry))
 
-    for idx, pair in enumerate(pair_ids):
-        a, b = pair
-        games = games_together[pair]
-        if games <= 0:
+def _rows_digest(table: DoublesTable) -> int:
+    """
+    Order-independent digest of doubles rows: the sum mod 2⁶⁴ of a hash of
+    each row's match id, teams and scores. Folding a row in or out of the
+    statistics adds or subtracts its hash, so the cached digest says which
+    rows (and which scores) the statistics were built from.
+    """
+    if not len(table):
+        return 0
+    fields = np.column_stack([
+        table.match_id,
+        np.sort(table.teams[:, :2], axis=1),
+        np.sort(table.teams[:, 2:], axis=1),
+        table.scores,
+    ]).view(np.uint64)
+    h = np.zeros(len(table), dtype=np.uint64)
+    for column in fields.T:
+        h = _mix64(h ^ column)
+    return int(h.sum(dtype=np.uint64))
+
+
+def _state_from_design(
+    X_full: sparse.csr_matrix,
+    y: np.ndarray,
+    w: np.ndarray,
+    player_ids: List[int],
+    pair_ids: List[Tuple[int, int]],
+    rows_digest: int = 0,
+) -> NormalEquationStats:
+    Xw = X_full.multiply(w[:, None]).tocsr()
+    return NormalEquationStats(
+        player_ids=list(player_ids),
+        pair_ids=list(pair_ids),
+        xtwx=(X_full.T @ Xw).tocsr(),
+        xtwy=np.asarray(Xw.T @ y).ravel(),
+        sx=np.asarray(Xw.sum(axis=0)).ravel(),
+        sw=float(w.sum()),
+        swy=float(w @ y),
+        n_rows=X_full.shape[0],
+        rows_digest=rows_digest,
+    )
+
+
+def _save_state(session: Session, league_id: int, stats: NormalEquationStats) -> None:
+    coo = stats.xtwx.tocoo()
+    coefs = {
+        name: getattr(stats, name)
+        for name in ("coef_alpha", "coef_full")
+        if getattr(stats, name) is not None
+    }
+    buf = io.BytesIO()
+    np.savez(
+        buf,
+        player_ids=np.asarray(stats.player_ids, dtype=np.int64),
+        pair_ids=np.asarray(stats.pair_ids, dtype=np.int64).reshape(-1, 2),
+        xtwx_row=coo.row,
+        xtwx_col=coo.col,
+        xtwx_data=coo.data,
+        xtwy=stats.xtwy,
+        sx=stats.sx,
+        sums=np.array([stats.sw, stats.swy]),
+        rows_digest=np.array([stats.rows_digest], dtype=np.uint64),
+        **coefs,
+    )
+
+    state = session.get(ChemistryState, league_id)
+    if state is None:
+        state = ChemistryState(id=league_id, n_rows=stats.n_rows, payload=b"")
+        session.add(state)
+    state.n_rows = stats.n_rows
+    state.payload = buf.getvalue()
+    state.last_updated = datetime.utcnow()
+
+
+def _load_state(session: Session, league_id: int) -> Optional[NormalEquationStats]:
+    state = session.get(ChemistryState, league_id)
+    if state is None or not state.payload:
+        return None
+
+    data = np.load(io.BytesIO(state.payload), allow_pickle=False)
+    if "rows_digest" not in data:
+        # Saved before the digest existed: refit once from scratch
+        return None
+    player_ids = [int(p) for p in data["player_ids"]]
+    pair_ids = [(int(a), int(b)) for a, b in data["pair_ids"]]
+    D = len(player_ids) + len(pair_ids)
+    return NormalEquationStats(
+        player_ids=player_ids,
+        pair_ids=pair_ids,
+        xtwx=sparse.coo_matrix(
+            (data["xtwx_data"], (data["xtwx_row"], data["xtwx_col"])), shape=(D, D)
+        ).tocsr(),
+        xtwy=data["xtwy"],
+        sx=data["sx"],
+        sw=float(data["sums"][0]),
+        swy=float(data["sums"][1]),
+        n_rows=state.n_rows,
+        rows_digest=int(data["rows_digest"][0]),
+        # Saved before the coefficients were: the next solve starts cold
+        coef_alpha=data["coef_alpha"] if "coef_alpha" in data else None,
+        coef_full=data["coef_full"] if "coef_full" in data else None,
+    )
+
+
+def _grow_features(stats: NormalEquationStats, table: DoublesTable) -> None:
+    """
+    Append features for players / pairs of table the statistics haven't
+    seen yet. New players go after the existing players, so pair columns
+    (and the cached coefficients) shift right; new features start at 0.
+    """
+    player_ids, pair_ids = _feature_ids(table)
+    known_players = set(stats.player_ids)
+    known_pairs = set(stats.pair_ids)
+    new_players = [pid for pid in player_ids if pid not in known_players]
+    new_pairs = [pair for pair in pair_ids if pair not in known_pairs]
+
+    if not new_players and not new_pairs:
+        return
+
+    P_old = len(stats.player_ids)
+    D_old = P_old + len(stats.pair_ids)
+    # old feature index -> new feature index
+    remap = np.arange(D_old)
+    remap[P_old:] += len(new_players)
+
+    stats.player_ids += new_players
+    stats.pair_ids += new_pairs
+    D_new = len(stats.player_ids) + len(stats.pair_ids)
+
+    coo = stats.xtwx.tocoo()
+    stats.xtwx = sparse.coo_matrix(
+        (coo.data, (remap[coo.row], remap[coo.col])), shape=(D_new, D_new)
+    ).tocsr()
+    for name in ("xtwy", "sx", "coef_full"):
+        if getattr(stats, name) is None:
             continue
+        grown = np.zeros(D_new)
+        grown[remap] = getattr(stats, name)
+        setattr(stats, name, grown)
+    if stats.coef_alpha is not None:
+        stats.coef_alpha = np.concatenate([stats.coef_alpha, np.zeros(len(new_players))])
+
+
+def _apply_rows(stats: NormalEquationStats, table: DoublesTable, sign: float) -> None:
+    """
+    Fold the rows of table into the statistics (sign=+1) or out of them
+    (sign=-1): one low-rank update, the XᵀWX of just those rows.
+    """
+    if not len(table):
+        return
+    stats.rows_digest = (stats.rows_digest + int(sign) * _rows_digest(table)) % _DIGEST_MOD
+
+    # degenerate (0-0) rows get zero weight, so they only count in n_rows
+    arrays = _index_rows(table, stats.player_ids, stats.pair_ids)
+    _, X = _build_design(arrays, len(stats.player_ids), len(stats.pair_ids))
+    delta = _state_from_design(X, arrays.y, arrays.w, [], [])
+
+    stats.xtwx = (stats.xtwx + sign * delta.xtwx).tocsr()
+    stats.xtwy = stats.xtwy + sign * delta.xtwy
+    stats.sx = stats.sx + sign * delta.sx
+    stats.sw += sign * delta.sw
+    stats.swy += sign * delta.swy
+    stats.n_rows += int(sign) * len(table)
+
+
+@dataclass
+class RidgeFactor:
+    """
+    Factorization of the centered Ridge normal matrix  A = B - u uᵀ / Σw,
+    with  B = XᵀWX + λI  (sparse, SPD) and  u = Σ w x.
+
+    B is factored once as LDLᵀ: SuperLU with a symmetric fill-reducing
+    ordering and no pivoting, which for an SPD matrix gives U = D Lᵀ. The
+    dense rank-one centering term is handled with Sherman-Morrison, so A
+    itself is never formed.
+
+    diag_pivot_thresh=0 only asks SuperLU not to pivot; it still swaps rows
+    when a diagonal entry is exactly zero. Then perm_r != perm_c, the factor
+    is no longer LDLᵀ (solves remain exact), and inverse_diagonal() falls
+    back to solving for columns.
+    """
+    lu: SuperLU
+    u: np.ndarray
+    z_u: np.ndarray  # B⁻¹ u
+    denom: float     # Σw - uᵀ B⁻¹ u
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        """A⁻¹ rhs, for a vector or a block of columns."""
+        z = self.lu.solve(rhs)
+        return z + np.multiply.outer(self.z_u, self.u @ z) / self.denom
+
+    @property
+    def symmetric(self) -> bool:
+        """Whether the factor kept the symmetric LDLᵀ shape (see above)."""
+        return np.array_equal(self.lu.perm_r, self.lu.perm_c)
+
+    def inverse_diagonal(self) -> np.ndarray:
+        """diag(A⁻¹), via the selected inverse of B when the factor allows it."""
+        if self.symmetric:
+            return _selected_inverse_diagonal(self.lu) + self.z_u ** 2 / self.denom
+        # Otherwise CHEMISTRY_SE_BLOCK columns of A⁻¹ at a time
+        n = len(self.u)
+        diag = np.empty(n)
+        for start in range(0, n, CHEMISTRY_SE_BLOCK):
+            block = np.arange(start, min(start + CHEMISTRY_SE_BLOCK, n))
+            E = np.zeros((n, len(block)))
+            E[block, block - start] = 1.0
+            diag[block] = self.solve(E)[block, block - start]
+        return diag
+
+
+def _factor_ridge(stats: NormalEquationStats, cols: np.ndarray, lam: float) -> RidgeFactor:
+    B = stats.xtwx[cols][:, cols] + lam * sparse.identity(len(cols), format="csr")
+    lu = splu(
+        B.tocsc(),
+        permc_spec="MMD_AT_PLUS_A",
+        diag_pivot_thresh=0.0,
+        options={"SymmetricMode": True},
+    )
+    u = stats.sx[cols]
+    z_u = lu.solve(u)
+    return RidgeFactor(lu=lu, u=u, z_u=z_u, denom=float(stats.sw - u @ z_u))
+
+
+def _solve_ridge(
+    stats: NormalEquationStats,
+    cols: np.ndarray,
+    lam: float,
+    start: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, float]:
+    """
+    Weighted Ridge with intercept on the feature subset cols, i.e. what
+    sklearn's Ridge(alpha=lam, fit_intercept=True) fits with sample_weight.
+
+    Jacobi-preconditioned conjugate gradients on the centered normal
+    equations A coef = Xcᵀ W y, with A = B - u uᵀ / Σw (see RidgeFactor)
+    applied as a sparse product and never formed or factored. start, the
+    solution before the latest few matches changed, warm-starts the
+    iteration, so an update costs some dozens of sparse products rather
+    than a factorization. Raises RuntimeError if CG doesn't reach
+    CHEMISTRY_RIDGE_TOL.
+    """
+    n = len(cols)
+    B = stats.xtwx[cols][:, cols]
+    u = stats.sx[cols]
+
+    def matvec(v: np.ndarray) -> np.ndarray:
+        return B @ v + lam * v - u * ((u @ v) / stats.sw)
+
+    inv_diag = 1.0 / (B.diagonal() + lam - u ** 2 / stats.sw)
+    coef, info = cg(
+        LinearOperator((n, n), matvec=matvec, dtype=float),
+        stats.xtwy[cols] - u * (stats.swy / stats.sw),
+        x0=start if start is not None and len(start) == n else None,
+        rtol=CHEMISTRY_RIDGE_TOL,
+        atol=0.0,
+        M=LinearOperator((n, n), matvec=lambda v: inv_diag * v, dtype=float),
+    )
+    if info != 0:
+        raise RuntimeError(f"Ridge conjugate gradients did not converge in {info} iterations")
+    intercept = (stats.swy - u @ coef) / stats.sw
+    return coef, float(intercept)
+
+
+# ---------- 4. Coefficient uncertainty ----------
+
+# Fill (share of the lower triangle) from which the trailing block of the
+# LDLᵀ factor is inverted densely in _selected_inverse_diagonal
+_DENSE_TAIL_FILL = 0.5
+
+
+def _selected_inverse_diagonal(lu: SuperLU) -> np.ndarray:
+    """
+    diag(B⁻¹) from the LDLᵀ factor of B without forming B⁻¹ (Takahashi's
+    selected inversion). Entries of Z = B⁻¹ are computed only on the
+    sparsity pattern of L, column by column from the last one:
+
+        Z_Sj = -Z_SS l,   Z_jj = 1/d_j - lᵀ Z_Sj
+
+    where l holds the entries of column j below the diagonal, in rows S.
+    The filled pattern is closed under this recursion, so Z_SS is always
+    available from columns already done.
+
+    The fill-reducing ordering leaves the last columns (players, busy pairs)
+    nearly dense. From the first column whose trailing block of L is at
+    least _DENSE_TAIL_FILL full, Z is the inverse of that block of L D Lᵀ,
+    taken in one LAPACK call (dpotri); the sparse columns before it read
+    their Z_SS from it. Costs about as much as the factorization itself.
+
+    Only valid for a symmetric factor (perm_r == perm_c, see RidgeFactor).
+    """
+    if not np.array_equal(lu.perm_r, lu.perm_c):
+        raise RuntimeError("SuperLU pivoted off the diagonal; the factor is not LDLᵀ")
+    L = lu.L.tocsc()
+    L.sort_indices()
+    n = L.shape[0]
+    ip, ix, lx = L.indptr, L.indices, L.data
+    d = lu.U.diagonal()
+    counts = np.diff(ip)
+    cols = np.repeat(np.arange(n, dtype=np.int64), counts)
+
+    # Dense tail: columns t.. (every trailing block from t on is full enough)
+    size = np.arange(n, 0, -1)
+    tail_nnz = np.cumsum(counts[::-1])[::-1]
+    sparse_tail = np.flatnonzero(tail_nnz < _DENSE_TAIL_FILL * size * (size + 1) / 2)
+    t = int(sparse_tail[-1]) + 1 if len(sparse_tail) else 0
+    in_tail = cols >= t
+    chol = np.zeros((n - t, n - t), order="F")
+    chol[ix[in_tail] - t, cols[in_tail] - t] = lx[in_tail] * np.sqrt(d[cols[in_tail]])
+    Z_tail, info = lapack.dpotri(chol, lower=1, overwrite_c=1)
+    if info != 0:
+        raise RuntimeError(f"dpotri failed on the dense tail of the LDLᵀ factor (info={info})")
+    Z_tail = np.tril(Z_tail) + np.tril(Z_tail, -1).T
+
+    # Sparse columns: Z entries stored on L's pattern, key = col * n + row
+    keys = cols[~in_tail] * n + ix[~in_tail]
+    z = np.zeros(len(keys))
+    z_diag = np.empty(n)
+    z_diag[t:] = np.diag(Z_tail)
+    for j in range(t - 1, -1, -1):
+        start, end = ip[j], ip[j + 1]
+        S = ix[start + 1:end]
+        l = lx[start + 1:end]
+        # rows before the tail (S1) come from z, rows in it (S2) from Z_tail
+        split = np.searchsorted(S, t)
+        S1, S2 = S[:split], S[split:] - t
+        y = np.empty(len(S))
+        y[split:] = Z_tail[np.ix_(S2, S2)] @ l[split:]
+        if split:
+            wanted = np.concatenate([
+                (np.minimum.outer(S1, S1) * n + np.maximum.outer(S1, S1)).ravel(),
+                (S1[:, None] * n + S2[None, :] + t).ravel(),
+            ])
+            pos = np.searchsorted(keys, wanted)
+            if not np.array_equal(keys[np.minimum(pos, len(keys) - 1)], wanted):
+                raise RuntimeError("LDLᵀ pattern is not closed; cannot take the selected inverse")
+            Z_11 = z[pos[:split * split]].reshape(split, split)
+            Z_12 = z[pos[split * split:]].reshape(split, len(S2))
+            y[:split] = Z_11 @ l[:split] + Z_12 @ l[split:]
+            y[split:] += Z_12.T @ l[:split]
+        z[start + 1:end] = -y
+        z[start] = z_diag[j] = 1.0 / d[j] + l @ y
+
+    # Back from the factor's ordering to B's
+    return z_diag[lu.perm_c]
+
+
+def _pair_uncertainty(
+    factor_lo: RidgeFactor,
+    factor_hi: RidgeFactor,
+    X_full: sparse.csr_matrix,
+    y: np.ndarray,
+    w: np.ndarray,
+    theta: np.ndarray,
+    intercept: float,
+    P: int,
+    lam: float,
+    level: float = CHEMISTRY_CI_LEVEL,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Standard errors and interval half-widths of the pair coefficients
+    theta[P:] of the full model at λ = lam (arrays indexed like pair_ids).
+    factor_lo / factor_hi are the Ridge factorizations at
+    lam * (1 ∓ CHEMISTRY_SE_STEP).
+
+    theta = A⁻¹ XcᵀW y is linear in y, so with Var(y_m) = σ²/w_m its
+    covariance is the sandwich σ² A⁻¹ (XcᵀWXc) A⁻¹ (Xc: centered X). The
+    Bayesian σ² A⁻¹ is much wider here, since a pair column is nearly the
+    sum of its two player columns and the prior alone bounds that direction.
+
+    A = XcᵀWXc + λI, so the sandwich is exactly σ² (A⁻¹ - λ A⁻²). Since
+    d/dλ A⁻¹ = -A⁻², both terms come from diag(A⁻¹) on either side of lam
+    by central differences (the mean for diag(A⁻¹), the slope for λ A⁻²):
+    two selected inverses rather than a solve per pair. σ² is the weighted
+    residual variance on the effective degrees of freedom
+    1 + tr(A⁻¹ XᵀWX) = 1 + D - λ tr(A⁻¹). Intervals use Student's t on the
+    residual degrees of freedom.
+    """
+    played = w > 0
+    residuals = y - (X_full @ theta + intercept)
+    rss = float(w[played] @ residuals[played] ** 2)
+    inv_lo = factor_lo.inverse_diagonal()
+    inv_hi = factor_hi.inverse_diagonal()
+    inv_diag = (inv_lo + inv_hi) / 2.0
+    df_model = 1.0 + len(theta) - lam * float(inv_diag.sum())
+    df_resid = max(float(played.sum()) - df_model, 1.0)
+    sigma2 = rss / df_resid
+
+    lam_inv_sq_diag = (inv_lo[P:] - inv_hi[P:]) / (2.0 * CHEMISTRY_SE_STEP)
+    # Positive in exact arithmetic; clip rounding below zero
+    sandwich = np.maximum(inv_diag[P:] - lam_inv_sq_diag, 0.0)
+
+    se = np.sqrt(sigma2 * sandwich)
+    return se, student_t.ppf(0.5 + level / 2.0, df_resid) * se
+
+
+@traced("chemistry_uncertainty")
+def refresh_pair_uncertainty(
+    session: Session,
+    league_id: int = DEFAULT_LEAGUE_ID,
+    lambda_full: float = 1.0,
+    max_age: Optional[float] = None,
+    level: float = CHEMISTRY_CI_LEVEL,
+) -> int:
+    """
+    Recompute beta_se, beta_t_stat and beta_ci_* of a league's pair_chemistry
+    rows from the cached normal equations (see _pair_uncertainty).
+
+    Takes two selected inverses of the full model, seconds at thousands of
+    pairs, so it stays off the per-write path: refits carry the stored
+    values over, and this runs on demand (main_cli --se) or from the
+    derived-data worker once the last refresh is more than max_age seconds
+    old (ChemistryState.se_updated). Does nothing while the cached
+    statistics are missing or don't cover the league's doubles rows; the
+    next refit rebuilds them.
+
+    Returns the number of pairs updated. Does not commit.
+    """
+    state = session.get(ChemistryState, league_id)
+    if (
+        max_age is not None
+        and state is not None
+        and state.se_updated is not None
+        and (datetime.utcnow() - state.se_updated).total_seconds() < max_age
+    ):
+        return 0
+
+    stats = _load_state(session, league_id)
+    table = fetch_doubles_table(session, league_id)
+    if stats is None or stats.sw <= 0 or stats.rows_digest != _rows_digest(table):
+        return 0
+
+    P = len(stats.player_ids)
+    cols = np.arange(P + len(stats.pair_ids))
+    theta, intercept = _solve_ridge(stats, cols, lambda_full, stats.coef_full)
+    factor_lo = _factor_ridge(stats, cols, lambda_full * (1.0 - CHEMISTRY_SE_STEP))
+    factor_hi = _factor_ridge(stats, cols, lambda_full * (1.0 + CHEMISTRY_SE_STEP))
+
+    arrays = _index_rows(table, stats.player_ids, stats.pair_ids)
+    _, X_full = _build_design(arrays, P, len(stats.pair_ids))
+    se, half_width = _pair_uncertainty(
+        factor_lo, factor_hi, X_full, arrays.y, arrays.w, theta, intercept, P, lambda_full, level
+    )
+
+    pair_index = {pair: idx for idx, pair in enumerate(stats.pair_ids)}
+    updates = []
+    for a, b, beta in session.exec(
+        select(PairChemistry.player_id_a, PairChemistry.player_id_b, PairChemistry.beta_chemistry)
+        .where(PairChemistry.league_id == league_id)
+    ).all():
+        idx = pair_index.get((a, b))
+        if idx is None:
+            continue
+        updates.append({
+            "player_id_a": a,
+            "player_id_b": b,
+            **_uncertainty_columns(beta, float(se[idx]), float(half_width[idx])),
+        })
+    if updates:
+        # ORM bulk UPDATE by primary key
+        session.exec(update(PairChemistry), params=updates)
+
+    state.se_updated = datetime.utcnow()
+    return len(updates)
+
+
+def doubles_row(match: Match, mp_rows: List[MatchPlayer]) -> Optional[dict]:
+    """
+    The fetch_doubles_matches() row for one match, or None if it isn't a
+    valid doubles match (exactly 2 players on side A and B).
+    """
+    if match.format != "doubles":
+        return None
+    team_a = [mp.player_id for mp in mp_rows if mp.team_side == "A"]
+    team_b = [mp.player_id for mp in mp_rows if mp.team_side == "B"]
+    if len(team_a) != 2 or len(team_b) != 2:
+        return None
+    return {
+        "match_id": match.id,
+        "team_a": team_a,
+        "team_b": team_b,
+        "score_a": match.scoreA,
+        "score_b": match.scoreB,
+    }
+
+
+@traced("update_chemistry")
+def update_chemistry(
+    session: Session,
+    league_id: int = DEFAULT_LEAGUE_ID,
+    added: List[dict] = (),
+    removed: List[dict] = (),
+    lambda_alpha: float = 1.0,
+    lambda_full: float = 1.0,
+) -> None:
+    """
+    Incremental chemistry recompute after doubles matches of a league were
+    added, edited or deleted.
+
+    added / removed are rows in the fetch_doubles_matches() shape (an edit
+    is the old row in removed and the new one in added). They are applied
+    to the cached normal equations as one low-rank update, and both models
+    are re-solved from the statistics by conjugate gradients started from
+    their previous coefficients (see _solve_ridge) instead of refitting
+    Ridge. The residual aggregation reads the league's doubles rows as
+    arrays from the shared history; no design matrix is built.
+
+    Falls back to recompute_chemistry() when there is no cached state or,
+    once added / removed are folded in, it wouldn't cover exactly the
+    league's doubles rows currently in the DB (compared by _rows_digest, so
+    a missed edit or a row applied twice is caught, not just a count
+    mismatch). Raises RuntimeError if a solve doesn't converge; the derived
+    queue then refits the league from scratch. Does not commit.
+    """
+    stats = _load_state(session, league_id)
+    table = fetch_doubles_table(session, league_id)
+    added_table, removed_table = _doubles_table(list(added)), _doubles_table(list(removed))
+
+    if stats is None or (
+        (stats.rows_digest + _rows_digest(added_table) - _rows_digest(removed_table)) % _DIGEST_MOD
+        != _rows_digest(table)
+    ):
+        recompute_chemistry(session, league_id, lambda_alpha=lambda_alpha, lambda_full=lambda_full)
+        return
+
+    if not added and not removed:
+        # e.g. a singles edit: nothing chemistry depends on changed
+        return
+
+    # Coalesced jobs may remove rows the statistics never saw
+    _grow_features(stats, _doubles_table([*added, *removed]))
+    _apply_rows(stats, removed_table, -1.0)
+    _apply_rows(stats, added_table, 1.0)
+
+    if not len(table) or stats.sw <= 0:
+        _save_state(session, league_id, stats)
+        session.exec(delete(PairChemistry).where(PairChemistry.league_id == league_id))
+        return
+
+    P = len(stats.player_ids)
+    D = P + len(stats.pair_ids)
+
+    with span("chemistry_ridge_solve"):
+        alpha, intercept_alpha = _solve_ridge(stats, np.arange(P), lambda_alpha, stats.coef_alpha)
+        theta_full, _ = _solve_ridge(stats, np.arange(D), lambda_full, stats.coef_full)
+    stats.coef_alpha, stats.coef_full = alpha, theta_full
+    _save_state(session, league_id, stats)
+
+    arrays = _index_rows(table, stats.player_ids, stats.pair_ids)
+    # X_alpha @ alpha without building X_alpha; degenerate rows are all-zero
+    p_hat_base = np.where(
+        arrays.w > 0, (alpha[arrays.players] * [1.0, 1.0, -1.0, -1.0]).sum(axis=1), 0.0
+    ) + intercept_alpha
+
+    agg = _aggregate_pairs(arrays, p_hat_base, stats.player_ids, stats.pair_ids)
+    _write_pair_chemistry(session, league_id, stats.pair_ids, theta_full[P:], agg)
+
+
+# ---------- 5. Bootstrap intervals ----------
+
+def _bootstrap_betas(
+    X_full: sparse.csr_matrix,
+    y: np.ndarray,
+    w: np.ndarray,
+    P: int,
+    lam: float,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """
+    Pair coefficients refit on one resample of the doubles matches. Drawing
+    n rows with replacement is the same as reweighting each row by its
+    multinomial count, so the design matrix is reused as is.
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(len(y), np.full(len(y), 1.0 / len(y)))
+    stats = _state_from_design(X_full, y, w * counts, [], [])
+    coef, _ = _solve_ridge(stats, np.arange(X_full.shape[1]), lam)
+    return coef[P:]
+
+
+_worker_design: Optional[tuple] = None
+
+
+def _init_bootstrap_worker(X_full, y, w, P, lam) -> None:
+    global _worker_design
+    _worker_design = (X_full, y, w, P, lam)
+
+
+def _bootstrap_in_worker(seed: np.random.SeedSequence) -> np.ndarray:
+    return _bootstrap_betas(*_worker_design, seed)
+
+
+@traced("chemistry_bootstrap")
+def bootstrap_pair_intervals(
+    session: Session,
+    league_id: int = DEFAULT_LEAGUE_ID,
+    samples: int = 200,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    lambda_full: float = 1.0,
+    level: float = CHEMISTRY_CI_LEVEL,
+) -> int:
+    """
+    Percentile bootstrap intervals for every pair coefficient of a league,
+    stored in beta_boot_ci_low / beta_boot_ci_high. The refits run on a process pool
+    that receives the design matrix once, through the pool initializer.
+
+    Too slow for every match write, so it runs on demand (see main_cli);
+    later refits keep the stored intervals until the next run. Returns the
+    number of pairs updated. Does not commit.
+    """
+    table = fetch_doubles_table(session, league_id)
+    if not len(table):
+        return 0
+
+    player_ids, pair_ids = _feature_ids(table)
+    P = len(player_ids)
+    arrays = _index_rows(table, player_ids, pair_ids)
+    _, X_full = _build_design(arrays, P, len(pair_ids))
+    if np.all(arrays.w <= 0):
+        return 0
+
+    seeds = np.random.SeedSequence(seed).spawn(samples)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        betas = [_bootstrap_betas(X_full, arrays.y, arrays.w, P, lambda_full, s) for s in seeds]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_bootstrap_worker,
+            initargs=(X_full, arrays.y, arrays.w, P, lambda_full),
+        ) as pool:
+            chunksize = max(1, samples // (workers * 4))
+            betas = list(pool.map(_bootstrap_in_worker, seeds, chunksize=chunksize))
+
+    low, high = np.quantile(np.vstack(betas), [(1.0 - level) / 2.0, (1.0 + level) / 2.0], axis=0)
+
+    pair_index = {pair: idx for idx, pair in enumerate(pair_ids)}
+    updated = 0
+    for pc in session.exec(select(PairChemistry).where(PairChemistry.league_id == league_id)).all():
+        idx = pair_index.get((pc.player_id_a, pc.player_id_b))
+        if idx is None:
+            continue
+        pc.beta_boot_ci_low = float(low[idx])
+        pc.beta_boot_ci_high = float(high[idx])
+        updated += 1
+    return updated
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for pair chemistry.")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--league", type=int, default=DEFAULT_LEAGUE_ID)
+    parser.add_argument(
+        "--se",
+        action="store_true",
+        help="refresh the standard errors and t intervals (refresh_pair_uncertainty) instead",
+    )
+    args = parser.parse_args()
+
+    import main  # noqa: E402  (connects to SUPABASE_DB_URL)
+    from data_version import bump_data_version
+
+    t0 = time.perf_counter()
+    with Session(main.engine) as session:
+        if args.se:
+            updated = refresh_pair_uncertainty(session, args.league)
+        else:
+            updated = bootstrap_pair_intervals(
+                session, args.league, samples=args.samples, workers=args.workers, seed=args.seed
+            )
+        bump_data_version(session, args.league)
+        session.commit()
+    label = "Standard errors" if args.se else f"Bootstrap intervals ({args.samples} samples)"
+    print(f"{label} for {updated} pairs in {time.perf_counter() - t0:.2f}s")
 
-        beta_ij = float(beta_full[idx])
-
-        row = PairChemistry(
-            player_id_a=a,
-            player_id_b=b,
-            games_together=int(games),
-            beta_chemistry=float(beta_ij),
-            beta_t_stat=None,  # optional: compute later
-            uplift_a_given_b=float(uplift_a_given_b[pair]),
-            uplift_b_given_a=float(uplift_b_given_a[pair]),
-            avg_point_share=float(avg_point_share[pair]),
-            avg_point_share_base=float(avg_point_share_base[pair]),
-            last_updated=now,
-        )
-        session.add(row)
 
-    session.commit()
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Session, select, update, and_
+from models import DEFAULT_LEAGUE_ID, DataVersion, Reign
+
+"""
+Per-league data versions for conditional GETs.
+
+Every write that can change a league's API responses bumps that league's
+DataVersion.version in its own transaction, so a GET can tell whether its
+last response is still current from one row instead of re-reading the
+match tables. Writes to one league leave the other leagues' ETags alone.
+
+Writes that change the league's match history (matches added, edited,
+deleted or re-rated) also bump DataVersion.history_version, which tells
+every worker's in-memory history (history.MatchHistoryStore) to reload.
+Derived-data refreshes and player writes leave it alone.
+
+Some responses also move with the clock: live crowns and the open reign's
+day count. The ETag therefore also carries the open reign's whole-day age,
+which is the only clock-driven input that changes what clients render.
+"""
+
+
+def ensure_data_version(session: Session, league_id: int = DEFAULT_LEAGUE_ID) -> None:
+    if session.get(DataVersion, league_id) is None:
+        session.add(DataVersion(id=league_id, version=0))
+        session.commit()
+
+
+def bump_data_version(
+    session: Session, league_id: int = DEFAULT_LEAGUE_ID, history_changed: bool = False
+) -> None:
+    """
+    Increment the league's version (and history_version, if the match
+    history changed) in the caller's transaction (does not commit).
+    """
+    values = {"version": DataVersion.version + 1}
+    if history_changed:
+        values["history_version"] = DataVersion.history_version + 1
+    session.exec(update(DataVersion).where(DataVersion.id == league_id).values(**values))
+
+
+def history_version(session: Session, league_id: int = DEFAULT_LEAGUE_ID) -> int:
+    """The league's history_version as the caller's transaction sees it."""
+    return session.exec(
+        select(DataVersion.history_version).where(DataVersion.id == league_id)
+    ).one()
+
+
+def etag_query(league_id: int = DEFAULT_LEAGUE_ID):
+    """The league's (version, open reign start) in one round trip."""
+    return (
+        select(DataVersion.version, Reign.start)
+        .select_from(DataVersion)
+        .outerjoin(Reign, and_(Reign.league_id == league_id, Reign.end == None))  # noqa: E711
+        .where(DataVersion.id == league_id)
+    )
+
+
+def make_etag(version: int, open_reign_start: Optional[datetime], now: datetime) -> str:
+    reign_days = int((now - open_reign_start).total_seconds() // 86400) if open_reign_start else 0
+    return f'"{version}-{reign_days}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 asks for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
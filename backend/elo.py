@@ -1,6 +1,5 @@
 from dataclasses import dataclass
 from typing import Dict, List
-from math import pow
 
 # --- Config knobs ---
 
@@ -10,6 +9,20 @@ MIN_MOV_MULT = 0.75      # floor for margin-of-victory multiplier
 MAX_MOV_MULT = 2.0       # cap for margin-of-victory multiplier
 EPSILON = 0.5            # to avoid zero weights when splitting team Δ
 
+@dataclass(frozen=True)
+class EloConfig:
+    """
+    The knobs above as one object, so a replay can run with other values
+    (see elo_sweep.py). Defaults are the module constants.
+    """
+    base_k_singles: float = BASE_K_SINGLES
+    base_k_doubles: float = BASE_K_DOUBLES
+    min_mov_mult: float = MIN_MOV_MULT
+    max_mov_mult: float = MAX_MOV_MULT
+    epsilon: float = EPSILON
+
+DEFAULT_CONFIG = EloConfig()
+
 @dataclass
 class PlayerStat:
     """
@@ -27,26 +40,32 @@ class PlayerStat:
 
 # ---------- Helper functions ----------
 
-def mov_multiplier(scoreA: int, scoreB: int) -> float:
+def mov_multiplier(scoreA: int, scoreB: int, config: EloConfig = DEFAULT_CONFIG) -> float:
     """
     Margin-of-victory multiplier based on score difference.
-    Tight games ~1.0, blowouts approach MAX_MOV_MULT.
+    Tight games ~1.0, blowouts approach max_mov_mult.
     """
     diff = abs(scoreA - scoreB)
     max_points = max(scoreA, scoreB) or 1
     margin = diff / max_points      # 0.0 -> 1.0
     raw = 1.0 + margin              # 1.0 -> 2.0 (default range)
-    return max(MIN_MOV_MULT, min(MAX_MOV_MULT, raw))
+    return max(config.min_mov_mult, min(config.max_mov_mult, raw))
 
 def expected(r_self: float, r_opp: float) -> float:
     """
-    Standard Elo expected score formula.
+    Standard Elo expected score formula. Also takes NumPy arrays of ratings
+    (matchmaking scores whole batches of lineups with it).
     """
-    return 1.0 / (1.0 + pow(10.0, (r_opp - r_self) / 400.0))
+    return 1.0 / (1.0 + 10.0 ** ((r_opp - r_self) / 400.0))
 
 # ---------- Singles Elo ----------
 
-def apply_singles(scoreA: int, scoreB: int, players: List[PlayerStat]) -> Dict[int, Dict[str, int]]:
+def apply_singles(
+    scoreA: int,
+    scoreB: int,
+    players: List[PlayerStat],
+    config: EloConfig = DEFAULT_CONFIG,
+) -> Dict[int, Dict[str, int]]:
     """
     Apply Elo update for a singles match.
 
@@ -77,8 +96,8 @@ def apply_singles(scoreA: int, scoreB: int, players: List[PlayerStat]) -> Dict[i
         S_A, S_B = 1.0, 0.0
 
     # Margin-of-victory-scaled K
-    mov = mov_multiplier(scoreA, scoreB)
-    K_eff = BASE_K_SINGLES * mov
+    mov = mov_multiplier(scoreA, scoreB, config)
+    K_eff = config.base_k_singles * mov
 
     Δ_A = K_eff * (S_A - E_A)
     Δ_B = K_eff * (S_B - E_B)
@@ -93,14 +112,16 @@ def apply_singles(scoreA: int, scoreB: int, players: List[PlayerStat]) -> Dict[i
 
 # ---------- Doubles Elo ----------
 
-def _split_team_delta_win(players: List[PlayerStat], delta_team: float) -> Dict[int, float]:
+def _split_team_delta_win(
+    players: List[PlayerStat], delta_team: float, epsilon: float = EPSILON
+) -> Dict[int, float]:
     """
     Split positive team delta among winning teammates based on winners.
     """
     # players: two players on the same team
-    # weight = winners + EPSILON
-    c1 = players[0].winners + EPSILON
-    c2 = players[1].winners + EPSILON
+    # weight = winners + epsilon
+    c1 = players[0].winners + epsilon
+    c2 = players[1].winners + epsilon
     total = c1 + c2
 
     w1 = c1 / total
@@ -111,14 +132,16 @@ def _split_team_delta_win(players: List[PlayerStat], delta_team: float) -> Dict[
         players[1].player_id: w2 * delta_team,
     }
 
-def _split_team_delta_loss(players: List[PlayerStat], delta_team: float) -> Dict[int, float]:
+def _split_team_delta_loss(
+    players: List[PlayerStat], delta_team: float, epsilon: float = EPSILON
+) -> Dict[int, float]:
     """
     Split negative team delta among losing teammates based on errors.
     """
     # players: two players on the same team
-    # weight = errors + EPSILON
-    d1 = players[0].errors + EPSILON
-    d2 = players[1].errors + EPSILON
+    # weight = errors + epsilon
+    d1 = players[0].errors + epsilon
+    d2 = players[1].errors + epsilon
     total = d1 + d2
 
     w1 = d1 / total
@@ -129,7 +152,12 @@ def _split_team_delta_loss(players: List[PlayerStat], delta_team: float) -> Dict
         players[1].player_id: w2 * delta_team,
     }
 
-def apply_doubles(scoreA: int, scoreB: int, players: List[PlayerStat]) -> Dict[int, Dict[str, int]]:
+def apply_doubles(
+    scoreA: int,
+    scoreB: int,
+    players: List[PlayerStat],
+    config: EloConfig = DEFAULT_CONFIG,
+) -> Dict[int, Dict[str, int]]:
     """
     Apply Elo update for a doubles match.
 
@@ -162,8 +190,8 @@ def apply_doubles(scoreA: int, scoreB: int, players: List[PlayerStat]) -> Dict[i
         winning_team = "A"
 
     # Margin-of-victory-scaled K
-    mov = mov_multiplier(scoreA, scoreB)
-    K_eff = BASE_K_DOUBLES * mov
+    mov = mov_multiplier(scoreA, scoreB, config)
+    K_eff = config.base_k_doubles * mov
 
     Δ_teamA = K_eff * (S_teamA - E_teamA)
     Δ_teamB = K_eff * (S_teamB - E_teamB)
@@ -172,11 +200,11 @@ def apply_doubles(scoreA: int, scoreB: int, players: List[PlayerStat]) -> Dict[i
     deltas: Dict[int, float] = {}
 
     if winning_team == "A":
-        deltas.update(_split_team_delta_win(teamA, Δ_teamA))
-        deltas.update(_split_team_delta_loss(teamB, Δ_teamB))
+        deltas.update(_split_team_delta_win(teamA, Δ_teamA, config.epsilon))
+        deltas.update(_split_team_delta_loss(teamB, Δ_teamB, config.epsilon))
     else:
-        deltas.update(_split_team_delta_loss(teamA, Δ_teamA))
-        deltas.update(_split_team_delta_win(teamB, Δ_teamB))
+        deltas.update(_split_team_delta_loss(teamA, Δ_teamA, config.epsilon))
+        deltas.update(_split_team_delta_win(teamB, Δ_teamB, config.epsilon))
 
     # Build final before/after map
     result: Dict[int, Dict[str, int]] = {}
@@ -195,18 +223,20 @@ def apply_match(
     scoreA: int,
     scoreB: int,
     players: List[PlayerStat],
+    config: EloConfig = DEFAULT_CONFIG,
 ) -> Dict[int, Dict[str, int]]:
     """
     High-level entry point.
 
     match_format: "singles" or "doubles"
     players: list of PlayerStat (2 for singles, 4 for doubles)
+    config: knob values; defaults to the module constants
     Returns: {player_id: {"before": x, "after": y}}
     """
     fmt = match_format.lower()
     if fmt == "singles":
-        return apply_singles(scoreA, scoreB, players)
+        return apply_singles(scoreA, scoreB, players, config)
     elif fmt == "doubles":
-        return apply_doubles(scoreA, scoreB, players)
+        return apply_doubles(scoreA, scoreB, players, config)
     else:
         raise ValueError(f"Unknown match format: {match_format}")
\ No newline at end of file
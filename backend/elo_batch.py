@@ -0,0 +1,313 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import elo
+from history import FORMATS, MatchHistory
+
+"""
+Columnar batch Elo engine.
+
+Replays a whole match sequence with array-backed ratings instead of calling
+elo.apply_match() once per match. The arithmetic mirrors elo.py operation
+for operation (same float64 ops, np.rint == Python's round-half-even), so
+results are identical to the per-match engine.
+
+Matches are laid out in 4 player slots:
+    slots 0, 1 -> team A
+    slots 2, 3 -> team B
+Singles use slots 0 and 2; unused slots hold -1.
+
+Elo is sequential, but two matches with no player in common do not depend
+on each other. The replay groups matches into "waves" where every match
+only depends on earlier waves, and updates each wave in one vectorized step.
+Small pools leave little to vectorize (with 8 players a wave averages ~1.2
+matches), so below MIN_BATCH_WAVE_SIZE the replay calls elo.apply_match
+per match instead.
+"""
+
+EMPTY_SLOT = -1
+
+# Average matches per wave below which the per-wave NumPy overhead costs more
+# than it saves (100k matches: 8 players 1.9s batched vs 1.4s per match,
+# break-even around 16-24 players / ~2 a wave, 200 players 0.6s vs 1.3s)
+MIN_BATCH_WAVE_SIZE = 2.0
+# Leading matches scheduled to measure the average wave size
+WAVE_SIZE_SAMPLE = 4096
+
+
+@dataclass
+class MatchArrays:
+    is_doubles: np.ndarray  # (M,) bool
+    score_a: np.ndarray     # (M,) int64
+    score_b: np.ndarray     # (M,) int64
+    players: np.ndarray     # (M, 4) int64 dense player index, EMPTY_SLOT if unused
+    winners: np.ndarray     # (M, 4) int64
+    errors: np.ndarray      # (M, 4) int64
+
+    def __len__(self) -> int:
+        return len(self.score_a)
+
+
+@dataclass
+class BatchResult:
+    before: np.ndarray   # (M, 4) int64 rating before each match, per slot
+    after: np.ndarray    # (M, 4) int64 rating after each match, per slot
+    ratings: np.ndarray  # (P,) float64 final rating per dense player index
+
+
+# ---------- Building the arrays ----------
+
+def build_match_arrays(
+    formats: Sequence[str],
+    scores_a: Sequence[int],
+    scores_b: Sequence[int],
+    slots: Sequence[Sequence[Tuple[int, int, int]]],
+) -> MatchArrays:
+    """
+    Lay out matches in slot order.
+
+    slots[m] is [(player_index, winners, errors), ...] with team A first:
+    2 entries (A, B) for singles, 4 entries (A, A, B, B) for doubles.
+    """
+    M = len(formats)
+    is_doubles = np.array([f == "doubles" for f in formats], dtype=bool)
+    players = np.full((M, 4), EMPTY_SLOT, dtype=np.int64)
+    winners = np.zeros((M, 4), dtype=np.int64)
+    errors = np.zeros((M, 4), dtype=np.int64)
+
+    for m, entries in enumerate(slots):
+        cols = (0, 1, 2, 3) if is_doubles[m] else (0, 2)
+        for col, (pidx, w, e) in zip(cols, entries):
+            players[m, col] = pidx
+            winners[m, col] = w
+            errors[m, col] = e
+
+    return MatchArrays(
+        is_doubles=is_doubles,
+        score_a=np.asarray(scores_a, dtype=np.int64),
+        score_b=np.asarray(scores_b, dtype=np.int64),
+        players=players,
+        winners=winners,
+        errors=errors,
+    )
+
+
+def arrays_from_history(
+    history: MatchHistory,
+    player_index: Dict[int, int],
+) -> Tuple[MatchArrays, List[int]]:
+    """
+    Convert a MatchHistory to MatchArrays.
+
+    Malformed matches (history.valid unset) and matches with players missing
+    from player_index are dropped, the same way the replays in main.py skip
+    them.
+
+    Returns (arrays, match_ids) where match_ids[m] is the Match.id of row m.
+    """
+    formats: List[str] = []
+    scores_a: List[int] = []
+    scores_b: List[int] = []
+    slots: List[List[Tuple[int, int, int]]] = []
+    match_ids: List[int] = []
+
+    for i in range(len(history)):
+        if not history.valid[i]:
+            continue
+        participants = history.participants(i)
+        if any(history.player_id[k] not in player_index for k in participants):
+            continue
+
+        # Team A first, then team B, each in MatchPlayer id order
+        ordered = [k for k in participants if history.side[k] == 0]
+        ordered += [k for k in participants if history.side[k] == 1]
+        formats.append(FORMATS[history.format[i]])
+        scores_a.append(history.score_a[i])
+        scores_b.append(history.score_b[i])
+        slots.append(
+            [(player_index[history.player_id[k]], history.winners[k], history.errors[k]) for k in ordered]
+        )
+        match_ids.append(history.match_id[i])
+
+    return build_match_arrays(formats, scores_a, scores_b, slots), match_ids
+
+
+# ---------- Scheduling ----------
+
+def schedule_waves(players: np.ndarray, n_players: int) -> List[np.ndarray]:
+    """
+    Split match rows into waves of mutually independent matches.
+
+    A match's wave is one past the latest wave any of its players appeared
+    in, so every wave only depends on earlier ones and no player appears
+    twice inside a wave.
+    """
+    M = players.shape[0]
+    last_wave = [-1] * n_players
+    wave_of = np.empty(M, dtype=np.int64)
+
+    for m, slot_players in enumerate(players.tolist()):
+        in_match = [p for p in slot_players if p != EMPTY_SLOT]
+        wave = max(last_wave[p] for p in in_match) + 1
+        wave_of[m] = wave
+        for p in in_match:
+            last_wave[p] = wave
+
+    return _group_by_wave(wave_of)
+
+
+def _group_by_wave(wave_of: np.ndarray) -> List[np.ndarray]:
+    order = np.argsort(wave_of, kind="stable")
+    bounds = np.flatnonzero(np.diff(wave_of[order])) + 1
+    return np.split(order, bounds)
+
+
+# ---------- Replay ----------
+
+def replay(
+    arrays: MatchArrays,
+    n_players: int,
+    initial_ratings: np.ndarray | None = None,
+    config: elo.EloConfig = elo.DEFAULT_CONFIG,
+    vectorize: bool | None = None,
+) -> BatchResult:
+    """
+    Replay every match in order and return per-slot before/after ratings.
+
+    initial_ratings: (n_players,) starting ratings; defaults to 1000.0
+    for everyone (the BASE_RATING the API replays start from).
+    config: Elo knobs, same meaning as in elo.apply_match().
+    vectorize: force the wave-batched (True) or per-match (False) replay;
+    None picks by the average wave size over the first WAVE_SIZE_SAMPLE
+    matches (MIN_BATCH_WAVE_SIZE). Results are identical either way.
+    """
+    if initial_ratings is None:
+        ratings = np.full(n_players, 1000.0, dtype=np.float64)
+    else:
+        ratings = np.array(initial_ratings, dtype=np.float64)
+
+    M = len(arrays)
+    before = np.zeros((M, 4), dtype=np.int64)
+    after = np.zeros((M, 4), dtype=np.int64)
+    if M == 0:
+        return BatchResult(before=before, after=after, ratings=ratings)
+
+    if vectorize is None:
+        sample = arrays.players[:WAVE_SIZE_SAMPLE]
+        vectorize = len(sample) / len(schedule_waves(sample, n_players)) >= MIN_BATCH_WAVE_SIZE
+    if not vectorize:
+        return _replay_matches(arrays, ratings, config)
+
+    # Match-level quantities that don't depend on ratings
+    a_wins = arrays.score_a > arrays.score_b
+    diff = np.abs(arrays.score_a - arrays.score_b)
+    max_points = np.maximum(arrays.score_a, arrays.score_b)
+    max_points = np.where(max_points == 0, 1, max_points)
+    raw = 1.0 + diff / max_points
+    mov = np.maximum(config.min_mov_mult, np.minimum(config.max_mov_mult, raw))
+    base_k = np.where(arrays.is_doubles, float(config.base_k_doubles), float(config.base_k_singles))
+    k_eff = base_k * mov
+
+    # Actual score per side, (M, 2): [S_A, S_B]
+    s = np.stack([np.where(a_wins, 1.0, 0.0), np.where(a_wins, 0.0, 1.0)], axis=1)
+
+    # Doubles split weights: winners for the winning side, errors for the losing one
+    eps = config.epsilon
+    weight_src_a = np.where(a_wins[:, None], arrays.winners[:, 0:2], arrays.errors[:, 0:2])
+    weight_src_b = np.where(a_wins[:, None], arrays.errors[:, 2:4], arrays.winners[:, 2:4])
+    c_a = weight_src_a + eps
+    c_b = weight_src_b + eps
+    share = np.empty((M, 4), dtype=np.float64)
+    share[:, 0:2] = c_a / (c_a[:, 0:1] + c_a[:, 1:2])
+    share[:, 2:4] = c_b / (c_b[:, 0:1] + c_b[:, 1:2])
+    # Singles hand the whole team delta to the player (x * 1.0 is exact)
+    share[~arrays.is_doubles] = 1.0
+
+    # Singles put their one player in both slots of a side: (r + r) / 2.0 == r
+    # exactly, so team ratings and the scatter below need no format branch.
+    used = arrays.players != EMPTY_SLOT
+    slot_players = arrays.players.copy()
+    singles = ~arrays.is_doubles
+    slot_players[singles, 1] = slot_players[singles, 0]
+    slot_players[singles, 3] = slot_players[singles, 2]
+
+    # Reorder rows so every wave is a contiguous slice
+    waves = schedule_waves(arrays.players, n_players)
+    order = np.concatenate(waves)
+    slot_players = slot_players[order]
+    k_eff = k_eff[order]
+    s = s[order]
+    share = share[order].reshape(M, 2, 2)
+    before_sorted = np.empty((M, 4), dtype=np.float64)
+    after_sorted = np.empty((M, 4), dtype=np.float64)
+
+    start = 0
+    for wave in waves:
+        end = start + len(wave)
+        idx = slot_players[start:end]
+        r = ratings[idx]  # (w, 4)
+
+        r_team_a = (r[:, 0] + r[:, 1]) / 2.0
+        r_team_b = (r[:, 2] + r[:, 3]) / 2.0
+
+        e_a = 1.0 / (1.0 + np.power(10.0, (r_team_b - r_team_a) / 400.0))
+        e = np.stack([e_a, 1.0 - e_a], axis=1)
+
+        delta_team = k_eff[start:end, None] * (s[start:end] - e)  # (w, 2)
+        slot_delta = (share[start:end] * delta_team[:, :, None]).reshape(-1, 4)
+
+        new = np.rint(r + slot_delta)
+
+        before_sorted[start:end] = r
+        after_sorted[start:end] = new
+        ratings[idx] = new
+        start = end
+
+    before[order] = before_sorted
+    after[order] = after_sorted
+    before[~used] = 0
+    after[~used] = 0
+
+    return BatchResult(before=before, after=after, ratings=ratings)
+
+
+def _replay_matches(arrays: MatchArrays, ratings: np.ndarray, config: elo.EloConfig) -> BatchResult:
+    """The per-match replay: elo.apply_match on each row in order."""
+    # Python floats, exactly what the API replays hand apply_match
+    current = ratings.tolist()
+    before = [[0] * 4 for _ in range(len(arrays))]
+    after = [[0] * 4 for _ in range(len(arrays))]
+    rows = zip(
+        arrays.is_doubles.tolist(),
+        arrays.score_a.tolist(),
+        arrays.score_b.tolist(),
+        arrays.players.tolist(),
+        arrays.winners.tolist(),
+        arrays.errors.tolist(),
+        before,
+        after,
+    )
+    for is_doubles, score_a, score_b, players, winners, errors, row_before, row_after in rows:
+        cols = (0, 1, 2, 3) if is_doubles else (0, 2)
+        stats = [
+            elo.PlayerStat(
+                player_id=players[col],
+                team_side="A" if col < 2 else "B",
+                winners=winners[col],
+                errors=errors[col],
+                rating_before=current[players[col]],
+            )
+            for col in cols
+        ]
+        result = elo.apply_match("doubles" if is_doubles else "singles", score_a, score_b, stats, config)
+        for col in cols:
+            res = result[players[col]]
+            row_before[col] = res["before"]
+            row_after[col] = res["after"]
+            current[players[col]] = res["after"]
+
+    return BatchResult(
+        before=np.array(before, dtype=np.int64).reshape(-1, 4),
+        after=np.array(after, dtype=np.int64).reshape(-1, 4),
+        ratings=np.array(current, dtype=np.float64),
+    )
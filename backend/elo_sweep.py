@@ -0,0 +1,264 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Sequence
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+import numpy as np
+from elo import EloConfig, DEFAULT_CONFIG, expected
+from elo_batch import MatchArrays, arrays_from_history, replay
+
+"""
+Hyperparameter sweep for the Elo knobs in elo.py.
+
+Replays the stored match history once per candidate EloConfig (with the
+batch engine) and scores how well elo.expected() predicted each match
+before it was played:
+
+    log_loss  mean -log p(actual winner)          lower is better
+    brier     mean (p_A - [A won])^2               lower is better
+    accuracy  share of matches where the favourite won (a 50/50 call
+              counts as half right)                higher is better
+
+The history is loaded from the database once, in the parent process, and
+handed to every pool worker a single time through the pool initializer.
+
+Usage (from backend/):
+    python elo_sweep.py --k-singles 16,24,32 --k-doubles 12,16,24
+    python elo_sweep.py --random 200 --workers 8 --out sweep.json
+"""
+
+# Grid values per knob when none are given on the command line
+DEFAULT_GRID: Dict[str, List[float]] = {
+    "base_k_singles": [16, 24, 32, 40],
+    "base_k_doubles": [12, 16, 24, 32],
+    "min_mov_mult": [0.5, 0.75, 1.0],
+    "max_mov_mult": [1.5, 2.0],
+    "epsilon": [0.5, 1.0],
+}
+
+RANK_KEYS = {"log_loss": False, "brier": False, "accuracy": True}  # key -> descending
+
+# Probabilities are clipped this far from 0/1 before taking logs
+LOG_LOSS_CLIP = 1e-12
+
+
+@dataclass
+class SweepScore:
+    config: EloConfig
+    log_loss: float
+    brier: float
+    accuracy: float
+    scored_matches: int
+
+    def as_row(self) -> dict:
+        return {**asdict(self.config), **{k: v for k, v in asdict(self).items() if k != "config"}}
+
+
+# ---------- Scoring ----------
+
+def score_config(
+    arrays: MatchArrays,
+    n_players: int,
+    config: EloConfig,
+    burn_in: int = 0,
+) -> SweepScore:
+    """
+    Replay the history under config and score the pre-match predictions.
+    The first burn_in matches are replayed but not scored.
+    """
+    result = replay(arrays, n_players, config=config)
+    before = result.before.astype(np.float64)
+
+    # Team ratings exactly as elo.apply_match sees them
+    r_a = np.where(arrays.is_doubles, (before[:, 0] + before[:, 1]) / 2.0, before[:, 0])
+    r_b = np.where(arrays.is_doubles, (before[:, 2] + before[:, 3]) / 2.0, before[:, 2])
+    p_a = expected(r_a, r_b)
+    # The engine scores ties as a loss for A
+    a_won = (arrays.score_a > arrays.score_b).astype(np.float64)
+
+    p_a, a_won = p_a[burn_in:], a_won[burn_in:]
+    n = len(p_a)
+    if n == 0:
+        return SweepScore(config, float("nan"), float("nan"), float("nan"), 0)
+
+    p_actual = np.clip(np.where(a_won == 1.0, p_a, 1.0 - p_a), LOG_LOSS_CLIP, 1.0)
+    correct = np.where(p_a == 0.5, 0.5, (p_a > 0.5) == (a_won == 1.0))
+
+    return SweepScore(
+        config=config,
+        log_loss=float(-np.mean(np.log(p_actual))),
+        brier=float(np.mean((p_a - a_won) ** 2)),
+        accuracy=float(np.mean(correct)),
+        scored_matches=n,
+    )
+
+
+# ---------- Candidates ----------
+
+def grid_configs(grid: Dict[str, Sequence[float]]) -> List[EloConfig]:
+    names = [f.name for f in fields(EloConfig)]
+    values = [grid.get(name, [getattr(DEFAULT_CONFIG, name)]) for name in names]
+    configs = [EloConfig(**dict(zip(names, combo))) for combo in itertools.product(*values)]
+    return [c for c in configs if c.min_mov_mult <= c.max_mov_mult]
+
+
+def random_configs(
+    grid: Dict[str, Sequence[float]],
+    n: int,
+    seed: int = 0,
+) -> List[EloConfig]:
+    """Draw each knob uniformly between the smallest and largest grid value."""
+    rng = random.Random(seed)
+    names = [f.name for f in fields(EloConfig)]
+    configs: List[EloConfig] = []
+    while len(configs) < n:
+        knobs = {}
+        for name in names:
+            options = grid.get(name, [getattr(DEFAULT_CONFIG, name)])
+            knobs[name] = rng.uniform(min(options), max(options))
+        config = EloConfig(**knobs)
+        if config.min_mov_mult <= config.max_mov_mult:
+            configs.append(config)
+    return configs
+
+
+# ---------- Parallel sweep ----------
+
+_worker_history: Optional[tuple] = None
+
+
+def _init_worker(arrays: MatchArrays, n_players: int, burn_in: int) -> None:
+    global _worker_history
+    _worker_history = (arrays, n_players, burn_in)
+
+
+def _score_in_worker(config: EloConfig) -> SweepScore:
+    arrays, n_players, burn_in = _worker_history
+    return score_config(arrays, n_players, config, burn_in)
+
+
+def run_sweep(
+    arrays: MatchArrays,
+    n_players: int,
+    configs: Sequence[EloConfig],
+    rank_by: str = "log_loss",
+    burn_in: int = 0,
+    workers: Optional[int] = None,
+) -> List[SweepScore]:
+    """Score every config on a process pool and return them best first."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        scores = [score_config(arrays, n_players, c, burn_in) for c in configs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(arrays, n_players, burn_in),
+        ) as pool:
+            chunksize = max(1, len(configs) // (workers * 4))
+            scores = list(pool.map(_score_in_worker, configs, chunksize=chunksize))
+
+    descending = RANK_KEYS[rank_by]
+    return sorted(
+        scores,
+        key=lambda s: getattr(s, rank_by) * (-1 if descending else 1),
+    )
+
+
+def load_history_arrays(engine, league_id: Optional[int] = None):
+    """A league's stored match history as MatchArrays, plus its player count."""
+    from sqlmodel import Session, select
+    from models import DEFAULT_LEAGUE_ID, Player
+    from history import MatchHistory
+
+    league_id = DEFAULT_LEAGUE_ID if league_id is None else league_id
+    with Session(engine) as session:
+        player_ids = session.exec(
+            select(Player.id).where(Player.league_id == league_id).order_by(Player.id)
+        ).all()
+        player_index = {pid: i for i, pid in enumerate(player_ids)}
+        arrays, _ = arrays_from_history(MatchHistory.load(session, league_id), player_index)
+    return arrays, len(player_ids)
+
+
+def _float_list(text: str) -> List[float]:
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Sweep Elo knobs against the stored history.")
+    parser.add_argument("--k-singles", type=_float_list)
+    parser.add_argument("--k-doubles", type=_float_list)
+    parser.add_argument("--min-mov", type=_float_list)
+    parser.add_argument("--max-mov", type=_float_list)
+    parser.add_argument("--epsilon", type=_float_list)
+    parser.add_argument("--random", type=int, default=0, help="random search with N draws instead of the grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rank-by", choices=sorted(RANK_KEYS), default="log_loss")
+    parser.add_argument("--burn-in", type=int, default=0, help="matches replayed but not scored")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="write the full ranking as JSON")
+    parser.add_argument("--league", type=int, default=None, help="league to replay (default: the default league)")
+    args = parser.parse_args()
+
+    grid = dict(DEFAULT_GRID)
+    for name, values in (
+        ("base_k_singles", args.k_singles),
+        ("base_k_doubles", args.k_doubles),
+        ("min_mov_mult", args.min_mov),
+        ("max_mov_mult", args.max_mov),
+        ("epsilon", args.epsilon),
+    ):
+        if values:
+            grid[name] = values
+
+    configs = random_configs(grid, args.random, args.seed) if args.random else grid_configs(grid)
+    if DEFAULT_CONFIG not in configs:
+        configs.append(DEFAULT_CONFIG)
+
+    import main  # noqa: E402  (connects to SUPABASE_DB_URL)
+
+    arrays, n_players = load_history_arrays(main.engine, args.league)
+    print(f"{len(arrays)} matches, {n_players} players, {len(configs)} configs")
+
+    t0 = time.perf_counter()
+    ranked = run_sweep(arrays, n_players, configs, args.rank_by, args.burn_in, args.workers)
+    elapsed = time.perf_counter() - t0
+    print(f"Scored in {elapsed:.2f}s, ranked by {args.rank_by}\n")
+
+    header = f"{'rank':>4}  {'k_s':>6} {'k_d':>6} {'mov_lo':>6} {'mov_hi':>6} {'eps':>5}  {'log_loss':>8} {'brier':>7} {'acc':>6}"
+    print(header)
+    for rank, s in enumerate(ranked, start=1):
+        is_current = s.config == DEFAULT_CONFIG
+        if rank > args.top and not is_current:
+            continue
+        c = s.config
+        print(
+            f"{rank:>4}  {c.base_k_singles:>6.2f} {c.base_k_doubles:>6.2f} {c.min_mov_mult:>6.2f} "
+            f"{c.max_mov_mult:>6.2f} {c.epsilon:>5.2f}  {s.log_loss:>8.4f} {s.brier:>7.4f} "
+            f"{s.accuracy:>6.3f}{'  <- current' if is_current else ''}"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "rank_by": args.rank_by,
+                    "burn_in": args.burn_in,
+                    "matches": len(arrays),
+                    "current": asdict(DEFAULT_CONFIG),
+                    "ranking": [s.as_row() for s in ranked],
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nWrote {args.out}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,366 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+from operator import attrgetter, itemgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+import sys
+import threading
+import numpy as np
+from sqlmodel import Session, select, or_, and_
+from models import DEFAULT_LEAGUE_ID, Match, MatchPlayer
+from data_version import history_version
+from instrumentation import MATCH_HISTORY_BYTES, MATCH_HISTORY_MATCHES, span
+
+
+# ---------- Compact in-memory history ----------
+
+FORMATS = ("singles", "doubles")
+SIDES = ("A", "B")
+# Players per side, by format code
+_PER_SIDE = (1, 2)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# (mp id, player_id, team_side, winners, errors, rating_before, rating_after)
+Participant = Tuple[int, int, str, int, int, int, int]
+
+
+def _micros(played_at: datetime) -> int:
+    return (played_at - _EPOCH) // _MICROSECOND
+
+
+class MatchHistory:
+    """
+    Every match of one league that has MatchPlayer rows, in (played_at, id)
+    order, as parallel typed arrays instead of ORM objects (see nbytes).
+
+    Match i owns participants first[i] .. first[i + 1] - 1, in MatchPlayer id
+    order. format / side hold indexes into FORMATS / SIDES, -1 for anything
+    else. valid[i] is the malformed-record check every consumer used to
+    repeat: 1 + 1 players for singles or 2 + 2 for doubles, on sides A and B.
+
+    Appends only ever add at the end, and match_id is extended last, so a
+    reader that stops at len() never sees a half-appended match.
+    """
+
+    def __init__(self):
+        self.played_at_us = array("q")  # microseconds since 1970-01-01 (naive)
+        self.format = array("b")
+        self.score_a = array("i")
+        self.score_b = array("i")
+        self.valid = array("b")
+        self.first = array("q", [0])
+        self.match_id = array("q")
+
+        self.mp_id = array("q")
+        self.player_id = array("q")
+        self.side = array("b")
+        self.winners = array("i")
+        self.errors = array("i")
+        self.rating_before = array("i")
+        self.rating_after = array("i")
+
+    def __len__(self) -> int:
+        return len(self.match_id)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays, headers and spare capacity included."""
+        return sum(sys.getsizeof(a) for a in vars(self).values())
+
+    @classmethod
+    def load(
+        cls,
+        session: Session,
+        league_id: int = DEFAULT_LEAGUE_ID,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> "MatchHistory":
+        """
+        Read a league's history in one ordered query, without ORM objects.
+
+        after: optional (played_at, match_id) position; only matches
+        strictly after it are read (see extend()).
+        """
+        stmt = (
+            select(
+                Match.id,
+                Match.played_at,
+                Match.format,
+                Match.scoreA,
+                Match.scoreB,
+                MatchPlayer.id,
+                MatchPlayer.player_id,
+                MatchPlayer.team_side,
+                MatchPlayer.winners,
+                MatchPlayer.errors,
+                MatchPlayer.rating_before,
+                MatchPlayer.rating_after,
+            )
+            .join(MatchPlayer, MatchPlayer.match_id == Match.id)
+            .where(Match.league_id == league_id)
+            .order_by(Match.played_at, Match.id, MatchPlayer.id)
+        )
+        if after is not None:
+            after_played_at, after_match_id = after
+            stmt = stmt.where(
+                or_(
+                    Match.played_at > after_played_at,
+                    and_(Match.played_at == after_played_at, Match.id > after_match_id),
+                )
+            )
+        history = cls()
+        for _, group in groupby(session.exec(stmt), key=itemgetter(0)):
+            rows = list(group)
+            match_id, played_at, match_format, score_a, score_b = rows[0][:5]
+            history.append(match_id, played_at, match_format, score_a, score_b, [r[5:] for r in rows])
+        return history
+
+    def append(
+        self,
+        match_id: int,
+        played_at: datetime,
+        match_format: str,
+        score_a: int,
+        score_b: int,
+        participants: Sequence[Participant],
+    ) -> None:
+        """Add a match after the current last one."""
+        fmt = FORMATS.index(match_format) if match_format in FORMATS else -1
+        sides = [SIDES.index(p[2]) if p[2] in SIDES else -1 for p in participants]
+        per_side = _PER_SIDE[fmt] if fmt >= 0 else 0
+        valid = (
+            per_side > 0
+            and len(sides) == 2 * per_side
+            and sides.count(0) == per_side
+            and sides.count(1) == per_side
+        )
+
+        for (mp_id, player_id, _, winners, errors, before, after), side in zip(participants, sides):
+            self.mp_id.append(mp_id)
+            self.player_id.append(player_id)
+            self.side.append(side)
+            self.winners.append(winners)
+            self.errors.append(errors)
+            self.rating_before.append(before)
+            self.rating_after.append(after)
+
+        self.played_at_us.append(_micros(played_at))
+        self.format.append(fmt)
+        self.score_a.append(score_a)
+        self.score_b.append(score_b)
+        self.valid.append(valid)
+        self.first.append(len(self.mp_id))
+        self.match_id.append(match_id)
+
+    def head(self, n: int) -> "MatchHistory":
+        """A copy of the first n matches."""
+        head = MatchHistory()
+        m = self.first[n]
+        for name in ("played_at_us", "format", "score_a", "score_b", "valid", "match_id"):
+            setattr(head, name, getattr(self, name)[:n])
+        head.first = self.first[: n + 1]
+        for name in ("mp_id", "player_id", "side", "winners", "errors", "rating_before", "rating_after"):
+            setattr(head, name, getattr(self, name)[:m])
+        return head
+
+    def extend(self, other: "MatchHistory") -> None:
+        """Add every match of other, which must all come after the current last one."""
+        offset = len(self.mp_id)
+        for name in ("mp_id", "player_id", "side", "winners", "errors", "rating_before", "rating_after"):
+            getattr(self, name).extend(getattr(other, name))
+        for name in ("played_at_us", "format", "score_a", "score_b", "valid"):
+            getattr(self, name).extend(getattr(other, name))
+        self.first.extend(array("q", (f + offset for f in other.first[1:])))
+        self.match_id.extend(other.match_id)
+
+    def played_at(self, i: int) -> datetime:
+        return _EPOCH + self.played_at_us[i] * _MICROSECOND
+
+    def position(self, i: int) -> Tuple[datetime, int]:
+        """(played_at, match_id) of match i, as used by checkpoints and cursors."""
+        return self.played_at(i), self.match_id[i]
+
+    def participants(self, i: int) -> range:
+        return range(self.first[i], self.first[i + 1])
+
+    def team_side(self, k: int) -> Optional[str]:
+        return SIDES[self.side[k]] if self.side[k] >= 0 else None
+
+    def won(self, k: int, i: int) -> bool:
+        """player_stats.is_win for participant k of match i."""
+        if self.side[k] == 0:
+            return self.score_a[i] > self.score_b[i]
+        if self.side[k] == 1:
+            return self.score_b[i] > self.score_a[i]
+        return False
+
+    def index_after(self, position: Optional[Tuple[datetime, int]]) -> int:
+        """Index of the first match strictly after (played_at, match_id)."""
+        if position is None:
+            return 0
+        played_at, match_id = position
+        us = _micros(played_at)
+        lo = bisect_left(self.played_at_us, us, 0, len(self))
+        hi = bisect_right(self.played_at_us, us, lo, len(self))
+        # Same played_at: ordered on match id
+        return bisect_right(self.match_id, match_id, lo, hi)
+
+    def player_matches(self, player_id: int) -> List[Tuple[int, int]]:
+        """(match index, participant index) of every row of player_id, oldest first."""
+        n = len(self)
+        ks = np.flatnonzero(np.array(self.player_id, dtype=np.int64)[: self.first[n]] == player_id)
+        matches = np.searchsorted(np.array(self.first, dtype=np.int64)[: n + 1], ks, side="right") - 1
+        return list(zip(matches.tolist(), ks.tolist()))
+
+    def doubles_rows(self) -> List[dict]:
+        """Valid doubles matches in the chemistry_service.fetch_doubles_matches() shape."""
+        rows: List[dict] = []
+        for i in range(len(self)):
+            if self.format[i] != 1 or not self.valid[i]:
+                continue
+            ks = self.participants(i)
+            rows.append(
+                {
+                    "match_id": self.match_id[i],
+                    "team_a": [self.player_id[k] for k in ks if self.side[k] == 0],
+                    "team_b": [self.player_id[k] for k in ks if self.side[k] == 1],
+                    "score_a": self.score_a[i],
+                    "score_b": self.score_b[i],
+                }
+            )
+        return rows
+
+    def doubles_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        doubles_rows() as arrays, without a Python object per row:
+        (match_id (M,), players (M, 4), scores (M, 2)). players[m] holds team
+        A then team B, each in MatchPlayer id order; scores[m] is
+        (score_a, score_b).
+        """
+        n = len(self)
+        doubles = (np.array(self.format[:n], dtype=np.int8) == 1) & (np.array(self.valid[:n], dtype=np.int8) == 1)
+        keep = np.flatnonzero(doubles)
+        # valid doubles matches have exactly four participants, two per side
+        ks = np.array(self.first[:n], dtype=np.int64)[keep, None] + np.arange(4)
+        order = np.argsort(np.array(self.side, dtype=np.int8)[ks], axis=1, kind="stable")
+        players = np.take_along_axis(np.array(self.player_id, dtype=np.int64)[ks], order, axis=1)
+        scores = np.stack(
+            [np.array(self.score_a[:n], dtype=np.int64)[keep], np.array(self.score_b[:n], dtype=np.int64)[keep]],
+            axis=1,
+        )
+        return np.array(self.match_id[:n], dtype=np.int64)[keep], players, scores
+
+
+def history_entry(match: Match, mp_rows: Sequence[MatchPlayer]) -> tuple:
+    """MatchHistory.append() arguments for a flushed match and its rows."""
+    participants = [
+        (mp.id, mp.player_id, mp.team_side, mp.winners, mp.errors, mp.rating_before, mp.rating_after)
+        for mp in sorted(mp_rows, key=attrgetter("id"))
+    ]
+    return (match.id, match.played_at, match.format, match.scoreA, match.scoreB, participants)
+
+
+class MatchHistoryStore:
+    """
+    The process-wide MatchHistory of each league, behind the Elo and crown
+    replays, chemistry and GET /players/{id}.
+
+    Each cached history is tagged with the league's
+    DataVersion.history_version, which every match write bumps in its own
+    transaction (see data_version.py). get() reads that one row and reloads
+    when it has moved, so writes from other workers or the import CLI are
+    picked up on the next read. This process's own writes keep the cache
+    warm instead: create_match appends its match, and the Elo replay
+    publishes the history it just rewrote.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # league id -> (history_version it reflects, history)
+        self._histories: Dict[int, Tuple[int, MatchHistory]] = {}
+        self.loads = 0
+
+    def get(self, session: Session, league_id: int = DEFAULT_LEAGUE_ID) -> MatchHistory:
+        """
+        The league's current history, (re)loaded through session if the
+        cached one is missing or older than the database. The session must
+        not hold uncommitted match writes.
+        """
+        version, history = self._lookup(session, league_id)
+        if history is not None:
+            return history
+
+        with span("match_history_load"):
+            # Read after the version: a write landing in between only
+            # causes one extra reload
+            history = MatchHistory.load(session, league_id)
+        self.loads += 1
+        self.publish(league_id, history, version)
+        return history
+
+    def current(self, session: Session, league_id: int = DEFAULT_LEAGUE_ID) -> Optional[MatchHistory]:
+        """
+        The cached history if it is still at the history_version session
+        sees, without loading anything. Treat it as read-only.
+        """
+        return self._lookup(session, league_id)[1]
+
+    def _lookup(self, session: Session, league_id: int) -> Tuple[int, Optional[MatchHistory]]:
+        version = history_version(session, league_id)
+        with self._lock:
+            cached = self._histories.get(league_id)
+        return version, cached[1] if cached is not None and cached[0] == version else None
+
+    def publish(self, league_id: int, history: MatchHistory, version: int) -> None:
+        """
+        Install a history reflecting history_version version (after its
+        writes committed), unless a newer one is already cached.
+        """
+        with self._lock:
+            cached = self._histories.get(league_id)
+            if cached is None or cached[0] <= version:
+                self._histories[league_id] = (version, history)
+            self._report()
+
+    def append(self, league_id: int, entry: tuple, version: int) -> None:
+        """
+        Add a committed match (a history_entry()) whose transaction moved
+        the league to history_version version.
+        """
+        with self._lock:
+            cached = self._histories.get(league_id)
+            if cached is None or cached[0] >= version:
+                # Nothing cached, or already reloaded past this write
+                return
+            cached_version, history = cached
+            match_id, played_at = entry[0], entry[1]
+            last = len(history) - 1
+            position = (_micros(played_at), match_id)
+            last_position = (history.played_at_us[last], history.match_id[last]) if last >= 0 else None
+            if cached_version == version - 1 and (last_position is None or position > last_position):
+                history.append(*entry)
+                self._histories[league_id] = (version, history)
+            else:
+                # Missed another write, or lands before the newest match:
+                # rebuild rather than insert
+                del self._histories[league_id]
+            self._report()
+
+    def invalidate(self, league_id: Optional[int] = None) -> None:
+        """Drop one league's history, or every league's."""
+        with self._lock:
+            if league_id is None:
+                self._histories.clear()
+            else:
+                self._histories.pop(league_id, None)
+            self._report()
+
+    def _report(self) -> None:
+        histories = [history for _, history in self._histories.values()]
+        MATCH_HISTORY_MATCHES.set(sum(len(h) for h in histories))
+        MATCH_HISTORY_BYTES.set(sum(h.nbytes for h in histories))
+
+
+history_store = MatchHistoryStore()
@@ -0,0 +1,161 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from typing import Optional
+import time
+from fastapi import Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy import event
+
+"""
+Prometheus metrics for the API.
+
+- Per-route request latency (middleware, labelled by route template).
+- SQL queries per request: count and total time, from SQLAlchemy cursor
+  events. The count is also returned on every response as X-DB-Query-Count.
+- Spans around the heavy recomputes (Elo replay, crown rebuild, chemistry
+  fits), whether they run on a request or on the background worker.
+- Size of the in-memory match history (history.MatchHistoryStore).
+
+Everything is served as Prometheus text from GET /metrics.
+"""
+
+REGISTRY = CollectorRegistry()
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+
+REQUEST_LATENCY = Histogram(
+    "pickle_elo_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+REQUEST_QUERIES = Histogram(
+    "pickle_elo_request_db_queries",
+    "SQL queries issued while serving one request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000),
+    registry=REGISTRY,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "pickle_elo_request_db_seconds",
+    "Time spent in SQL while serving one request",
+    ["route"],
+    registry=REGISTRY,
+)
+DB_QUERIES = Counter(
+    "pickle_elo_db_queries",
+    "SQL queries executed, by where they came from",
+    ["source"],  # "request" or "background"
+    registry=REGISTRY,
+)
+SPAN_SECONDS = Histogram(
+    "pickle_elo_span_duration_seconds",
+    "Duration of instrumented recompute steps",
+    ["span"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    registry=REGISTRY,
+)
+MATCH_HISTORY_MATCHES = Gauge(
+    "pickle_elo_match_history_matches",
+    "Matches held by the in-memory match histories, all leagues (0 when none is loaded)",
+    registry=REGISTRY,
+)
+MATCH_HISTORY_BYTES = Gauge(
+    "pickle_elo_match_history_bytes",
+    "Memory held by the in-memory match histories' arrays, all leagues",
+    registry=REGISTRY,
+)
+
+
+@dataclass
+class _QueryStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Set per request by the middleware; async endpoints share its context and a
+# sync endpoint's worker thread gets a copy, so both update the same _QueryStats.
+_request_queries: ContextVar[Optional[_QueryStats]] = ContextVar(
+    "pickle_elo_request_queries", default=None
+)
+
+
+# ---------- SQLAlchemy hooks ----------
+
+def instrument_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._pickle_elo_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._pickle_elo_started
+        stats = _request_queries.get()
+        if stats is None:
+            DB_QUERIES.labels("background").inc()
+            return
+        DB_QUERIES.labels("request").inc()
+        stats.queries += 1
+        stats.seconds += elapsed
+
+
+# ---------- Spans ----------
+
+@contextmanager
+def span(name: str):
+    """Time a block into pickle_elo_span_duration_seconds{span=name}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def traced(name: str):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------- HTTP ----------
+
+async def metrics_middleware(request: Request, call_next):
+    stats = _QueryStats()
+    token = _request_queries.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        _request_queries.reset(token)
+
+        # Route template (/players/{player_id}), not the raw path, to keep
+        # label cardinality bounded
+        route = request.scope.get("route")
+        route_label = getattr(route, "path", "unmatched")
+        REQUEST_LATENCY.labels(request.method, route_label, str(status)).observe(elapsed)
+        REQUEST_QUERIES.labels(route_label).observe(stats.queries)
+        REQUEST_DB_SECONDS.labels(route_label).observe(stats.seconds)
+
+    response.headers[QUERY_COUNT_HEADER] = str(stats.queries)
+    return response
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,209 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+import logging
+import threading
+import time
+from sqlmodel import Session
+from models import DEFAULT_LEAGUE_ID
+
+"""
+In-process queue for derived-state recomputes (crowns, chemistry).
+
+Match writes only persist the match and its Elo ratings, then submit a
+DerivedWork item. Items that pile up while the worker is busy are merged
+per league, so a burst of writes costs one recompute of each league it
+touched.
+
+Every submit bumps requested_version; once the worker has finished a run
+covering that submit, derived_version catches up to it. Clients compare the
+two (or poll a job id) to know when crowns and chemistry reflect their write.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DerivedWork:
+    """What needs recomputing in one league; merged across coalesced submits."""
+    league_id: int = DEFAULT_LEAGUE_ID
+    crowns: bool = False
+    full_chemistry: bool = False
+    # Rows in the chemistry_service.fetch_doubles_matches() shape
+    chemistry_added: List[dict] = field(default_factory=list)
+    chemistry_removed: List[dict] = field(default_factory=list)
+
+    def merge(self, other: "DerivedWork") -> None:
+        self.crowns = self.crowns or other.crowns
+        self.full_chemistry = self.full_chemistry or other.full_chemistry
+        self.chemistry_added += other.chemistry_added
+        self.chemistry_removed += other.chemistry_removed
+
+    def is_empty(self) -> bool:
+        return not (
+            self.crowns
+            or self.full_chemistry
+            or self.chemistry_added
+            or self.chemistry_removed
+        )
+
+
+class DerivedDataQueue:
+    """
+    Coalescing single-worker queue.
+
+    run(session, work) does the actual recompute; the queue commits after it.
+    With synchronous=True, submit() runs the work inline before returning
+    and re-raises its errors (for tests and scripts).
+    """
+
+    def __init__(
+        self,
+        engine,
+        run: Callable[[Session, DerivedWork], None],
+        synchronous: bool = False,
+    ):
+        self.engine = engine
+        self.run = run
+        self.synchronous = synchronous
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending: Dict[int, DerivedWork] = {}
+        self._worker: Optional[threading.Thread] = None
+        # Leagues of a failed run; their next run rebuilds from scratch
+        self._rebuild_next: Set[int] = set()
+
+        self.requested_version = 0
+        self.derived_version = 0
+        self.failed_version = 0
+        self.running = False
+        self.runs = 0
+        self.last_error: Optional[str] = None
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_seconds: Optional[float] = None
+
+    # ---------- Producer side ----------
+
+    def submit(self, work: DerivedWork) -> int:
+        """
+        Queue work (call after the triggering write has committed).
+        Returns the job id: the data version that will include this work.
+        """
+        with self._lock:
+            self.requested_version += 1
+            job_id = self.requested_version
+            pending = self._pending.setdefault(work.league_id, DerivedWork(league_id=work.league_id))
+            pending.merge(work)
+            if work.league_id in self._rebuild_next:
+                pending.merge(DerivedWork(crowns=True, full_chemistry=True))
+                self._rebuild_next.discard(work.league_id)
+
+            if not self.synchronous:
+                self._ensure_worker()
+                self._wakeup.notify_all()
+                return job_id
+
+        self._run_pending()
+        return job_id
+
+    def job_status(self, job_id: int) -> str:
+        with self._lock:
+            if job_id < 1 or job_id > self.requested_version:
+                return "unknown"
+            if job_id <= self.derived_version:
+                return "done"
+            if job_id <= self.failed_version:
+                return "failed"
+            return "running" if self.running else "pending"
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "derived_version": self.derived_version,
+                "requested_version": self.requested_version,
+                "caught_up": self.derived_version >= self.requested_version,
+                "running": self.running,
+                "runs": self.runs,
+                "last_run_at": self.last_run_at,
+                "last_run_seconds": self.last_run_seconds,
+                "last_error": self.last_error,
+            }
+
+    def wait_until_caught_up(self, timeout: float = 30.0) -> bool:
+        """
+        Block until every submitted job has been applied. Returns False on
+        timeout or if the latest run failed.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self.derived_version < self.requested_version and not (
+                self.failed_version >= self.requested_version and not self.running
+            ):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._wakeup.wait(remaining)
+            return self.derived_version >= self.requested_version
+
+    # ---------- Worker side ----------
+
+    def _ensure_worker(self) -> None:
+        # Caller holds the lock
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._worker_loop, name="derived-data-worker", daemon=True
+            )
+            self._worker.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._lock:
+                # Empty work still has to be acknowledged so its job id
+                # reports done
+                while all(w.is_empty() for w in self._pending.values()) and (
+                    max(self.derived_version, self.failed_version) >= self.requested_version
+                ):
+                    self._wakeup.wait()
+            self._run_pending()
+
+    def _run_pending(self) -> None:
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            covers_version = self.requested_version
+            self.running = True
+
+        started = time.perf_counter()
+        error: Optional[str] = None
+        failure: Optional[Exception] = None
+        failed_leagues: Set[int] = set()
+        for work in pending.values():
+            if work.is_empty():
+                continue
+            try:
+                with Session(self.engine) as session:
+                    self.run(session, work)
+                    session.commit()
+            except Exception as exc:  # keep the worker alive
+                logger.exception("Derived data recompute failed (league %s)", work.league_id)
+                error = repr(exc)
+                failure = exc
+                failed_leagues.add(work.league_id)
+
+        with self._lock:
+            self.running = False
+            self.runs += 1
+            self.last_error = error
+            self.last_run_at = datetime.utcnow()
+            self.last_run_seconds = time.perf_counter() - started
+            if error is None:
+                self.derived_version = max(self.derived_version, covers_version)
+            else:
+                self.failed_version = max(self.failed_version, covers_version)
+                self._rebuild_next |= failed_leagues
+            self._wakeup.notify_all()
+
+        # Synchronous callers (tests) want to see the failure
+        if failure is not None and self.synchronous:
+            raise failure
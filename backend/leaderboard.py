@@ -0,0 +1,58 @@
+from typing import Dict, List, Optional, Tuple
+from sortedcontainers import SortedList
+
+"""
+Order-statistic leaderboard: players ordered by rating, highest first, ties
+going to the lowest player id (the King/Queen rule).
+
+Backed by a SortedList of (-rating, player_id), so top(), rank(),
+percentile() and update() are O(log P), and page() is O(log P + limit).
+The crown replay keeps one current through every match, and the read
+endpoints keep one per data version.
+"""
+
+
+class Leaderboard:
+    def __init__(self, ratings: Optional[Dict[int, float]] = None):
+        self._ratings: Dict[int, float] = dict(ratings or {})
+        self._order = SortedList((-rating, pid) for pid, rating in self._ratings.items())
+
+    def __len__(self) -> int:
+        return len(self._ratings)
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self._ratings
+
+    def rating(self, player_id: int) -> float:
+        return self._ratings[player_id]
+
+    def update(self, player_id: int, rating: float) -> None:
+        """Insert a player or move them to a new rating."""
+        old = self._ratings.get(player_id)
+        if old == rating:
+            return
+        if old is not None:
+            self._order.remove((-old, player_id))
+        self._ratings[player_id] = rating
+        self._order.add((-rating, player_id))
+
+    def top(self) -> Optional[int]:
+        """The King/Queen: highest rating, lowest id on ties."""
+        return self._order[0][1] if self._order else None
+
+    def rank(self, player_id: int) -> int:
+        """1-based position; equal ratings are ordered by player id."""
+        return self._order.index((-self._ratings[player_id], player_id)) + 1
+
+    def percentile(self, player_id: int) -> float:
+        """Share of the other players ranked below, in percent (top = 100)."""
+        if len(self) == 1:
+            return 100.0
+        return 100.0 * (len(self) - self.rank(player_id)) / (len(self) - 1)
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int, float]]:
+        """(rank, player_id, rating) for ranks offset+1 .. offset+limit."""
+        return [
+            (offset + i + 1, pid, -neg_rating)
+            for i, (neg_rating, pid) in enumerate(self._order.islice(offset, offset + limit))
+        ]
@@ -1,34 +1,90 @@
-from fastapi import FastAPI, HTTPException
-from sqlmodel import SQLModel, create_engine, Session, select, delete
-from typing import List
+from fastapi import FastAPI, HTTPException, Query, Response, UploadFile, File, Depends, Header
+from sqlmodel import SQLModel, create_engine, Session, select, delete, update, func, or_, and_
+from typing import AsyncIterator, List, Optional
 from pydantic import BaseModel
-from models import Player, Match, MatchPlayer, PairChemistry
+from models import (
+    DEFAULT_LEAGUE_ID,
+    League,
+    Player,
+    Match,
+    MatchPlayer,
+    PairChemistry,
+    RatingCheckpoint,
+    Reign,
+    PlayerStats,
+    DataVersion,
+)
 from elo import PlayerStat, apply_match
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import datetime
 import os
+import base64
+import threading
 from dotenv import load_dotenv
-from chemistry_service import recompute_chemistry
+from chemistry_service import (
+    CHEMISTRY_SE_REFRESH_SECONDS,
+    doubles_row,
+    recompute_chemistry,
+    refresh_pair_uncertainty,
+    update_chemistry,
+)
+from history import FORMATS, SIDES, MatchHistory, history_entry, history_store
+from leaderboard import Leaderboard
+from jobs import DerivedDataQueue, DerivedWork
+from data_version import (
+    bump_data_version,
+    ensure_data_version,
+    etag_matches,
+    etag_query,
+    history_version,
+    make_etag,
+)
+from player_stats import (
+    PlayerCounters,
+    add_match_to_stats,
+    counters_from_row,
+    derive_player_stats,
+    load_stored_counters,
+    rebuild_player_stats,
+)
+from migrations import migrate
+from match_import import (
+    MatchIn,
+    MatchImportIn,
+    MatchImportError,
+    match_shape_error,
+    fill_missing_point_stats,
+    parse_matches,
+    file_format_for,
+    insert_matches,
+    to_naive_utc,
+)
+from matchmaking import MatchmakingError, MatchmakingIn, suggest_lineups
+from match_export import (
+    EXPORT_MEDIA_TYPES,
+    match_players_export_query,
+    matches_export_query,
+    stream_export,
+)
+from instrumentation import (
+    QUERY_COUNT_HEADER,
+    instrument_engine,
+    metrics_middleware,
+    metrics_response,
+    traced,
+    span,
+)
 
 """
 This WebApp is dedicated to my friends! I will have fun kicking their asses in pickleball.
 """
 
 
-class PlayerStatIn(BaseModel):
-    player_id: int
-    team_side: str  # "A" or "B"
-    winners: int    # points this player won directly
-    errors: int     # points this player lost directly
-
-
-class MatchIn(BaseModel):
-    format: str     # "singles" | "doubles"
-    scoreA: int
-    scoreB: int
-    players: List[PlayerStatIn]
-
-
 class MatchUpdate(BaseModel):
     scoreA: int
     scoreB: int
@@ -42,160 +98,501 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Total-Count", QUERY_COUNT_HEADER],
 )
+app.middleware("http")(metrics_middleware)
 
 load_dotenv()
 supabase_db_url = os.getenv("SUPABASE_DB_URL")
 if not supabase_db_url:
     raise RuntimeError("SUPABASE_DB_URL environment variable not set.")
-engine = create_engine(supabase_db_url, echo=False)
+
+# Connection pool knobs (both engines). Each uvicorn worker holds up to
+# 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections: one pool for writes and
+# one for the async read endpoints.
+pool_settings = dict(
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    # Supabase / PgBouncer drop idle server connections; recycle before that
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "1") == "1",
+)
+
+db_url = make_url(supabase_db_url)
+async_connect_args: dict = {}
+
+if db_url.get_backend_name() == "sqlite":
+    # Local SQLite stand-in (benchmarks / offline dev). SQLite has no schemas,
+    # so the database file is attached a second time under "pickle_elo".
+    engine = create_engine(
+        supabase_db_url,
+        echo=False,
+        connect_args={"check_same_thread": False},
+        **pool_settings,
+    )
+    sqlite_path = engine.url.database
+    if not sqlite_path or sqlite_path == ":memory:":
+        raise RuntimeError("SQLite stand-in needs a file path, e.g. sqlite:///pickle_elo.sqlite")
+
+    async_db_url = db_url.set(drivername="sqlite+aiosqlite")
+else:
+    engine = create_engine(supabase_db_url, echo=False, **pool_settings)
+
+    async_db_url = db_url.set(drivername="postgresql+asyncpg")
+    # asyncpg takes ssl=<mode> instead of libpq's sslmode=<mode>
+    sslmode = db_url.query.get("sslmode")
+    if sslmode:
+        async_db_url = async_db_url.difference_update_query(["sslmode"])
+        async_connect_args["ssl"] = sslmode
+    # Behind PgBouncer in transaction mode (Supabase pooler) set this to 0
+    if os.getenv("DB_STATEMENT_CACHE_SIZE") is not None:
+        async_connect_args["statement_cache_size"] = int(os.getenv("DB_STATEMENT_CACHE_SIZE"))
+
+# Read-only endpoints run on this engine with async def handlers, so slow
+# queries park a coroutine instead of a threadpool thread
+async_engine = create_async_engine(
+    async_db_url,
+    echo=False,
+    connect_args=async_connect_args,
+    **pool_settings,
+)
+
+if db_url.get_backend_name() == "sqlite":
+    def _attach_pickle_elo_schema(dbapi_conn, _record):
+        dbapi_conn.cursor().execute(f"ATTACH DATABASE '{sqlite_path}' AS pickle_elo")
+
+    event.listen(engine, "connect", _attach_pickle_elo_schema)
+    event.listen(async_engine.sync_engine, "connect", _attach_pickle_elo_schema)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
 QUEEN_PLAYER_ID = 1
 BASE_RATING = 1000.0
 
+# Snapshot every player's rating after this many replayed matches
+CHECKPOINT_INTERVAL = 50
+
+# Upper bound for GET /matches?limit=
+MAX_MATCH_PAGE_SIZE = 500
+MAX_LEADERBOARD_PAGE_SIZE = 500
+
+# A reign this long (in days) earns a crown
+CROWN_MIN_DAYS = 14
+
+# Serializes Reign table writes between request handlers and the
+# background rebuild
+reign_lock = threading.Lock()
+
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    migrate(engine)
+    with Session(engine) as session:
+        ensure_data_version(session)
+
+
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Dependency for the async read endpoints."""
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+
+async def league_scope(
+    league_id: int = DEFAULT_LEAGUE_ID,
+    session: AsyncSession = Depends(get_read_session),
+) -> int:
+    """
+    Dependency resolving the league a request works on: the {league_id} of
+    the /leagues/{league_id}/... routes, or ?league_id= (default league) on
+    the plain ones. 404 for an unknown league.
+    """
+    if await session.get(League, league_id) is None:
+        raise HTTPException(status_code=404, detail=f"League {league_id} not found")
+    return league_id
+
+
+async def conditional_get(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    league_id: int = Depends(league_scope),
+    session: AsyncSession = Depends(get_read_session),
+) -> None:
+    """
+    Dependency for the cacheable GETs: sets a strong ETag from the league's
+    data version and answers 304 when the client already has it, before
+    the endpoint reads anything else.
+    """
+    version, open_reign_start = (await session.exec(etag_query(league_id))).one()
+    etag = make_etag(version, open_reign_start, datetime.now())
+    if etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
 
 
 init_db()
 
 
-def recompute_crowns_and_king(session: Session):
-    players = session.exec(select(Player)).all()
-    matches = session.exec(
-        select(Match).order_by(Match.played_at, Match.id)
+@traced("recompute_crowns_and_king")
+def recompute_crowns_and_king(session: Session, league_id: int = DEFAULT_LEAGUE_ID):
+    """
+    Full rebuild of a league's Reign rows and its players' crowns_collected
+    from a replay of the league's match history. Needed whenever a
+    historical match changes; appended matches go through _advance_reigns()
+    instead.
+    """
+    players = session.exec(
+        select(Player).where(Player.league_id == league_id).order_by(Player.id)
     ).all()
+    history = history_store.get(session, league_id)
 
     # Reset crowns for everyone first
     crowns: dict[int, int] = {}
     for p in players:
         crowns[p.id] = 0
 
-    # Name lookup for later
-    name_map: dict[int, str] = {p.id: p.name for p in players}
-
-    # Reign segments we will build
-    reigns: list[dict] = []
-
-    if not players or not matches:
-        # No matches → no king; ensure DB crowns are zeroed
-        for p in players:
-            p.crowns_collected = 0
-        return None, None, {}, reigns
+    # Closed reign segments we will build
+    reigns: list[Reign] = []
 
     # Start everyone at base rating for this replay
     rating_map: dict[int, float] = {p.id: float(BASE_RATING) for p in players}
+    board = Leaderboard(rating_map)
 
     current_king_id: int | None = None
     reign_start: datetime | None = None
 
-    def close_reign(king_id: int | None, start: datetime | None, end: datetime):
+    def close_reign(king_id: int, start: datetime, end: datetime):
         """
-        Close a reign segment; if it lasted >= 14 days, award a crown
-        and append it to the reign list.
+        Close a reign segment; if it lasted >= CROWN_MIN_DAYS, award a crown.
         All datetimes are naive and interpreted in the same local timezone.
         """
-        if king_id is None or start is None:
-            return
-        days_total = (end - start).total_seconds() / 86400.0
-        days_int = int(days_total)
-        earned_crown = days_total >= 14.0
-
+        earned_crown = _reign_days(start, end) >= CROWN_MIN_DAYS
         if earned_crown:
             crowns[king_id] = crowns.get(king_id, 0) + 1
 
         reigns.append(
-            {
-                "king_id": king_id,
-                "king_name": name_map.get(king_id, f"Player {king_id}"),
-                "start": start,
-                "end": end,
-                "days": days_int,
-                "earned_crown": earned_crown,
-            }
+            Reign(league_id=league_id, king_id=king_id, start=start, end=end, earned_crown=earned_crown)
         )
 
-    for m in matches:
-        played_at: datetime = m.played_at  # naive local time
-
-        mp_rows = session.exec(
-            select(MatchPlayer).where(MatchPlayer.match_id == m.id)
-        ).all()
-
-        # ---- Guard against malformed matches ----
-        if m.format == "singles":
-            if len(mp_rows) != 2:
-                # bad singles record, skip from Elo replay
-                continue
-            sides = {mp.team_side for mp in mp_rows}
-            if sides != {"A", "B"}:
-                continue
-        elif m.format == "doubles":
-            if len(mp_rows) != 4:
-                # bad doubles record, skip from Elo replay
-                continue
-            teamA = [mp for mp in mp_rows if mp.team_side == "A"]
-            teamB = [mp for mp in mp_rows if mp.team_side == "B"]
-            if len(teamA) != 2 or len(teamB) != 2:
-                # malformed doubles, skip
-                continue
-
-        # Build PlayerStat using our replay rating_map as rating_before
-        stats: list[PlayerStat] = []
-        for mp in mp_rows:
-            # If some weird record references a player not in rating_map, skip match
-            if mp.player_id not in rating_map:
-                stats = []
-                break
-            before_rating = rating_map[mp.player_id]
-            ps = PlayerStat(
-                player_id=mp.player_id,
-                team_side=mp.team_side,
-                winners=mp.winners,
-                errors=mp.errors,
-                rating_before=before_rating,
-            )
-            stats.append(ps)
-
-        if not stats:
+    for i in range(len(history)):
+        # Malformed matches and unknown players are skipped
+        stats = _replay_stats(history, i, rating_map)
+        if stats is None:
             continue
 
         elo_result = apply_match(
-            match_format=m.format,
-            scoreA=m.scoreA,
-            scoreB=m.scoreB,
+            match_format=FORMATS[history.format[i]],
+            scoreA=history.score_a[i],
+            scoreB=history.score_b[i],
             players=stats,
         )
 
         # Update ratings after this match
-        for mp in mp_rows:
-            new_after = elo_result[mp.player_id]["after"]
-            rating_map[mp.player_id] = new_after
+        for ps in stats:
+            new_after = elo_result[ps.player_id]["after"]
+            rating_map[ps.player_id] = new_after
+            board.update(ps.player_id, new_after)
 
         # Determine top-rated player after this match
-        top_id = max(rating_map, key=lambda pid: rating_map[pid])
+        top_id = board.top()
 
         if current_king_id is None:
             # First ever king
             current_king_id = top_id
-            reign_start = played_at
+            reign_start = history.played_at(i)  # naive local time
         elif top_id != current_king_id:
             # Close previous reign and start a new one
+            played_at = history.played_at(i)
             close_reign(current_king_id, reign_start, played_at)
             current_king_id = top_id
             reign_start = played_at
 
-    # Close the final reign up to "now" (local naive time)
-    now = datetime.now()
-    close_reign(current_king_id, reign_start, now)
+    # The final reign stays open (end=NULL); its crown is only counted at
+    # read time until someone takes over
+    if current_king_id is not None:
+        reigns.append(Reign(league_id=league_id, king_id=current_king_id, start=reign_start, end=None))
+
+    session.exec(delete(Reign).where(Reign.league_id == league_id))
+    session.add_all(reigns)
 
     # Persist crowns into Player.crowns_collected
     for p in players:
         p.crowns_collected = crowns.get(p.id, 0)
 
     # Caller is responsible for session.commit()
-    return current_king_id, reign_start, rating_map, reigns
+    return current_king_id, reign_start, rating_map
+
+
+def _replay_stats(
+    history: MatchHistory, i: int, rating_map: dict[int, float]
+) -> list[PlayerStat] | None:
+    """
+    PlayerStats for replaying history match i on top of rating_map, or None
+    if the match is malformed or names a player rating_map doesn't have.
+    """
+    if not history.valid[i]:
+        return None
+    stats: list[PlayerStat] = []
+    for k in history.participants(i):
+        player_id = history.player_id[k]
+        if player_id not in rating_map:
+            return None
+        stats.append(
+            PlayerStat(
+                player_id=player_id,
+                team_side=SIDES[history.side[k]],
+                winners=history.winners[k],
+                errors=history.errors[k],
+                rating_before=rating_map[player_id],
+            )
+        )
+    return stats
+
+
+def _reign_days(start: datetime, end: datetime) -> float:
+    return (end - start).total_seconds() / 86400.0
+
+
+def _open_reign_query(league_id: int):
+    return select(Reign).where(Reign.league_id == league_id, Reign.end == None)  # noqa: E711
+
+
+def _open_reign(session: Session, league_id: int) -> Optional[Reign]:
+    return session.exec(_open_reign_query(league_id)).first()
+
+
+def _is_latest_match(session: Session, match: Match) -> bool:
+    later = session.exec(
+        select(Match.id)
+        .where(
+            Match.league_id == match.league_id,
+            or_(
+                Match.played_at > match.played_at,
+                and_(Match.played_at == match.played_at, Match.id > match.id),
+            ),
+        )
+        .limit(1)
+    ).first()
+    return later is None
+
+
+def _advance_reigns(session: Session, match: Match) -> bool:
+    """
+    Extend the league's reign timeline by one freshly appended match, after its Elo
+    updates are applied to Player.rating (pending in session is fine).
+
+    Returns False without touching anything if the match is not the newest
+    one; the timeline then needs a full recompute_crowns_and_king().
+    Call under reign_lock.
+    """
+    if not _is_latest_match(session, match):
+        return False
+
+    top = session.exec(
+        select(Player)
+        .where(Player.league_id == match.league_id)
+        .order_by(Player.rating.desc(), Player.id)
+        .limit(1)
+    ).first()
+    if top is None:
+        return True
+
+    current = _open_reign(session, match.league_id)
+    if current is not None and current.king_id == top.id:
+        return True
+
+    if current is not None:
+        # Close the previous reign at the match that ended it
+        current.end = match.played_at
+        current.earned_crown = _reign_days(current.start, current.end) >= CROWN_MIN_DAYS
+        if current.earned_crown:
+            previous_king = session.get(Player, current.king_id)
+            if previous_king:
+                previous_king.crowns_collected += 1
+        session.add(current)
+
+    session.add(Reign(league_id=match.league_id, king_id=top.id, start=match.played_at, end=None))
+    return True
+
+
+def _live_crown_holder(current: Optional[Reign]) -> Optional[int]:
+    """
+    King/Queen whose open reign (current) already passed CROWN_MIN_DAYS.
+    That crown is persisted once the reign closes; until then reads add it
+    on the fly.
+    """
+    if current and _reign_days(current.start, datetime.now()) >= CROWN_MIN_DAYS:
+        return current.king_id
+    return None
+
+
+def _player_out(p: Player, live_crown_holder: Optional[int]) -> dict:
+    out = p.model_dump()
+    if p.id == live_crown_holder:
+        out["crowns_collected"] += 1
+    return out
+
+
+def _ratings_as_of_query(league_id: int, as_of: datetime):
+    """
+    (Player, rating_after of their last match at or before as_of) for every
+    player of the league, in id order; None for players with no match by
+    then. Each player is one seek on ix_matchplayer_player_id_played_at_match_id
+    instead of a replay of the history.
+    """
+    rating_as_of = (
+        select(MatchPlayer.rating_after)
+        .where(MatchPlayer.player_id == Player.id, MatchPlayer.played_at <= as_of)
+        .order_by(MatchPlayer.played_at.desc(), MatchPlayer.match_id.desc(), MatchPlayer.id.desc())
+        .limit(1)
+        .correlate(Player)
+        .scalar_subquery()
+    )
+    return select(Player, rating_as_of).where(Player.league_id == league_id).order_by(Player.id)
+
+
+def _board_as_of(rows) -> Optional[Leaderboard]:
+    """
+    Leaderboard of _ratings_as_of_query() rows, players without a match yet
+    at BASE_RATING as in a replay. None if nobody had played yet (no
+    King/Queen then).
+    """
+    if all(rating is None for _, rating in rows):
+        return None
+    return Leaderboard({p.id: rating if rating is not None else BASE_RATING for p, rating in rows})
+
+
+def _reigns_as_of_query(league_id: int, as_of: datetime):
+    return (
+        select(Reign, Player.name)
+        .join(Player, Player.id == Reign.king_id)
+        .where(Reign.league_id == league_id, Reign.start <= as_of)
+        .order_by(Reign.start, Reign.id)
+    )
+
+
+def _reign_as_of(reign: Reign, as_of: datetime) -> Reign:
+    """The reign as the timeline stood at as_of: still open if it ended later."""
+    if reign.end is None or reign.end <= as_of:
+        return reign
+    # Detached copy; the loaded row must not change
+    return Reign(id=reign.id, league_id=reign.league_id, king_id=reign.king_id, start=reign.start)
+
+
+def _crowns_as_of(reigns: List[Reign], as_of: datetime) -> dict[int, int]:
+    """crowns_collected at as_of, the open reign's live crown included."""
+    crowns: dict[int, int] = {}
+    for r in reigns:
+        end = r.end if r.end is not None else as_of
+        if _reign_days(r.start, end) >= CROWN_MIN_DAYS:
+            crowns[r.king_id] = crowns.get(r.king_id, 0) + 1
+    return crowns
+
+
+# league id -> (data version, Leaderboard of Player.rating) for the read
+# endpoints
+_live_boards: dict[int, tuple[int, Leaderboard]] = {}
+
+
+async def _live_leaderboard(session: AsyncSession, league_id: int) -> Leaderboard:
+    """A league's current ratings as a Leaderboard, rebuilt once per data version."""
+    version = (
+        await session.exec(select(DataVersion.version).where(DataVersion.id == league_id))
+    ).one()
+    cached = _live_boards.get(league_id)
+    if cached is None or cached[0] != version:
+        rows = (
+            await session.exec(select(Player.id, Player.rating).where(Player.league_id == league_id))
+        ).all()
+        cached = _live_boards[league_id] = (version, Leaderboard(dict(rows)))
+    return cached[1]
+
+
+def recompute_derived(session: Session, work: DerivedWork):
+    """Run one (possibly coalesced) derived-data job; the queue commits."""
+    with span("derived_job"):
+        _run_derived(session, work)
+
+
+def _run_derived(session: Session, work: DerivedWork):
+    if work.crowns:
+        with reign_lock:
+            recompute_crowns_and_king(session, work.league_id)
+            bump_data_version(session, work.league_id)
+            session.commit()
+
+    chemistry = work.full_chemistry or work.chemistry_added or work.chemistry_removed
+    if work.full_chemistry:
+        recompute_chemistry(session, work.league_id)
+    elif chemistry:
+        update_chemistry(
+            session,
+            work.league_id,
+            added=work.chemistry_added,
+            removed=work.chemistry_removed,
+        )
+    if chemistry:
+        # the pair_chemistry swap and the new version commit together
+        bump_data_version(session, work.league_id)
+        session.commit()
+
+    # Standard errors lag the coefficients by up to CHEMISTRY_SE_REFRESH_SECONDS
+    if chemistry and refresh_pair_uncertainty(
+        session, work.league_id, max_age=CHEMISTRY_SE_REFRESH_SECONDS
+    ):
+        bump_data_version(session, work.league_id)
+        session.commit()
+
+
+# DERIVED_JOBS_SYNC=1 runs recomputes inline on the request (tests / scripts)
+derived_jobs = DerivedDataQueue(
+    engine,
+    recompute_derived,
+    synchronous=os.getenv("DERIVED_JOBS_SYNC", "0") == "1",
+)
+
+
+def bootstrap_reigns():
+    # Databases that predate the Reign table get their timelines built once
+    with Session(engine) as session:
+        for league_id in session.exec(select(League.id)).all():
+            has_matches = (
+                session.exec(select(Match.id).where(Match.league_id == league_id).limit(1)).first()
+                is not None
+            )
+            if has_matches and _open_reign(session, league_id) is None:
+                derived_jobs.submit(DerivedWork(league_id=league_id, crowns=True))
+
+
+bootstrap_reigns()
+
+
+def bootstrap_player_stats():
+    # Histories recorded before the PlayerStats table get their totals once.
+    # The new rows change /players, so cached ETags must not survive them.
+    with Session(engine) as session:
+        for league_id in session.exec(select(League.id)).all():
+            has_matches = (
+                session.exec(select(Match.id).where(Match.league_id == league_id).limit(1)).first()
+                is not None
+            )
+            has_stats = (
+                session.exec(
+                    select(PlayerStats.player_id)
+                    .join(Player, Player.id == PlayerStats.player_id)
+                    .where(Player.league_id == league_id)
+                    .limit(1)
+                ).first()
+                is not None
+            )
+            if has_matches and not has_stats:
+                rebuild_player_stats(session, league_id)
+                bump_data_version(session, league_id)
+                session.commit()
+
+
+bootstrap_player_stats()
 
 
 @app.get("/health")
@@ -203,52 +600,144 @@ def health():
     return {"status": "ok"}
 
 
-@app.get("/players")
-def list_players():
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of request, SQL and recompute metrics."""
+    return metrics_response()
+
+
+@app.get("/jobs/status")
+def get_derived_status():
+    """
+    Progress of the background crown / chemistry recomputes.
+    derived_version == requested_version means derived data is caught up.
+    """
+    return derived_jobs.status()
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: int):
+    status = derived_jobs.job_status(job_id)
+    if status == "unknown":
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {"job_id": job_id, "status": status}
+
+
+@app.get("/leagues")
+async def list_leagues(session: AsyncSession = Depends(get_read_session)):
+    return (await session.exec(select(League).order_by(League.id))).all()
+
+
+@app.post("/leagues")
+def create_league(name: str):
+    """
+    Start an empty league. Its players, matches, ratings, King/Queen and
+    chemistry live under /leagues/{id}/...; the plain routes work on the
+    default league.
+    """
     with Session(engine) as session:
-        players = session.exec(select(Player)).all()
-        return players
+        league = League(name=name)
+        session.add(league)
+        session.flush()
+        session.add(DataVersion(id=league.id, version=0))
+        session.commit()
+        session.refresh(league)
+        return league
+
+
+@app.get("/players", dependencies=[Depends(conditional_get)])
+@app.get("/leagues/{league_id}/players", dependencies=[Depends(conditional_get)])
+async def list_players(
+    league_id: int = Depends(league_scope),
+    session: AsyncSession = Depends(get_read_session),
+    as_of: Optional[datetime] = None,
+):
+    """
+    The league's players. With as_of, rating and crowns_collected are those
+    at that moment, from the MatchPlayer.rating_after history and the reign
+    timeline rather than a replay.
+    """
+    if as_of is not None:
+        as_of = to_naive_utc(as_of)
+        rows = (await session.exec(_ratings_as_of_query(league_id, as_of))).all()
+        reign_rows = (await session.exec(_reigns_as_of_query(league_id, as_of))).all()
+        reigns = [_reign_as_of(r, as_of) for r, _ in reign_rows]
+        crowns = _crowns_as_of(reigns, as_of)
+        return [
+            {
+                **p.model_dump(),
+                "rating": int(rating if rating is not None else BASE_RATING),
+                "crowns_collected": crowns.get(p.id, 0),
+            }
+            for p, rating in rows
+        ]
+
+    players = (await session.exec(select(Player).where(Player.league_id == league_id))).all()
+    live_crown_holder = _live_crown_holder((await session.exec(_open_reign_query(league_id))).first())
+    return [_player_out(p, live_crown_holder) for p in players]
+
+
+@app.get("/leaderboard", dependencies=[Depends(conditional_get)])
+@app.get("/leagues/{league_id}/leaderboard", dependencies=[Depends(conditional_get)])
+async def get_leaderboard(
+    response: Response,
+    league_id: int = Depends(league_scope),
+    session: AsyncSession = Depends(get_read_session),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_LEADERBOARD_PAGE_SIZE),
+):
+    """
+    Players by rating, highest first (ties to the lower id, as for the
+    King/Queen), with rank and percentile. X-Total-Count carries the number
+    of players in the league.
+    """
+    board = await _live_leaderboard(session, league_id)
+    response.headers["X-Total-Count"] = str(len(board))
+
+    page = board.page(offset, limit)
+    players = {
+        p.id: p
+        for p in (
+            await session.exec(select(Player).where(Player.id.in_([pid for _, pid, _ in page])))
+        ).all()
+    }
+    live_crown_holder = _live_crown_holder((await session.exec(_open_reign_query(league_id))).first())
+    return [
+        {
+            "rank": rank,
+            "percentile": board.percentile(pid),
+            "player": _player_out(players[pid], live_crown_holder),
+        }
+        for rank, pid, _ in page
+        if pid in players
+    ]
 
 
 @app.post("/players")
-def create_player(name: str):
+@app.post("/leagues/{league_id}/players")
+def create_player(name: str, league_id: int = Depends(league_scope)):
     with Session(engine) as session:
-        player = Player(name=name)
+        player = Player(name=name, league_id=league_id)
         session.add(player)
+        bump_data_version(session, league_id)
         session.commit()
         session.refresh(player)
         return player
 
 
 @app.post("/matches")
-def create_match(match_in: MatchIn):
+@app.post("/leagues/{league_id}/matches")
+def create_match(match_in: MatchIn, league_id: int = Depends(league_scope)):
     with Session(engine) as session:
         # 0. Basic validation of team sizes
-        teamA_in = [p for p in match_in.players if p.team_side == "A"]
-        teamB_in = [p for p in match_in.players if p.team_side == "B"]
-
-        if match_in.format == "singles":
-            if len(teamA_in) != 1 or len(teamB_in) != 1 or len(match_in.players) != 2:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Singles match must have exactly 2 players: 1 on team A and 1 on team B.",
-                )
-        elif match_in.format == "doubles":
-            if len(teamA_in) != 2 or len(teamB_in) != 2 or len(match_in.players) != 4:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Doubles match must have exactly 4 players: 2 on team A and 2 on team B.",
-                )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid format; must be 'singles' or 'doubles'.",
-            )
+        shape_error = match_shape_error(match_in)
+        if shape_error:
+            raise HTTPException(status_code=400, detail=shape_error)
 
-        # 1. Load all involved players from DB
+        # 1. Load all involved players from the league
         player_ids = [p.player_id for p in match_in.players]
         players = session.exec(
-            select(Player).where(Player.id.in_(player_ids))
+            select(Player).where(Player.id.in_(player_ids), Player.league_id == league_id)
         ).all()
 
         # Sanity check: did we find them all?
@@ -257,48 +746,11 @@ def create_match(match_in: MatchIn):
             missing = [pid for pid in player_ids if pid not in found_ids]
             raise HTTPException(
                 status_code=400,
-                detail=f"Some player_ids not found in DB: {missing}",
+                detail=f"Some player_ids not found in league {league_id}: {missing}",
             )
 
         # 2. If no winners/errors were tracked, auto-fill them from the score
-        no_stats_tracked = all(
-            (p.winners == 0 and p.errors == 0) for p in match_in.players
-        )
-
-        if no_stats_tracked:
-            teamA = [p for p in match_in.players if p.team_side == "A"]
-            teamB = [p for p in match_in.players if p.team_side == "B"]
-
-            # Helper to split points roughly evenly across n players
-            def split_points(total: int, n: int) -> list[int]:
-                if n <= 0:
-                    return []
-                base = total // n
-                rem = total % n
-                return [base + (1 if i < rem else 0) for i in range(n)]
-
-            if match_in.format == "singles":
-                # Expect exactly 1 per team (already validated)
-                a = teamA[0]
-                b = teamB[0]
-                # winners = points won, errors = points lost
-                a.winners = match_in.scoreA
-                a.errors = match_in.scoreB
-                b.winners = match_in.scoreB
-                b.errors = match_in.scoreA
-            elif match_in.format == "doubles":
-                # Split team points across teammates (already validated to be len 2 each)
-                a_winners_split = split_points(match_in.scoreA, len(teamA))
-                a_errors_split = split_points(match_in.scoreB, len(teamA))
-                for i, p in enumerate(teamA):
-                    p.winners = a_winners_split[i]
-                    p.errors = a_errors_split[i]
-
-                b_winners_split = split_points(match_in.scoreB, len(teamB))
-                b_errors_split = split_points(match_in.scoreA, len(teamB))
-                for i, p in enumerate(teamB):
-                    p.winners = b_winners_split[i]
-                    p.errors = b_errors_split[i]
+        fill_missing_point_stats(match_in)
 
         # 3. Build rating map from current Player.rating
         rating_map = {p.id: p.rating for p in players}
@@ -327,6 +779,7 @@ def create_match(match_in: MatchIn):
 
         # 6. Create Match record
         match = Match(
+            league_id=league_id,
             format=match_in.format,
             scoreA=match_in.scoreA,
             scoreB=match_in.scoreB,
@@ -336,6 +789,7 @@ def create_match(match_in: MatchIn):
         session.refresh(match)
 
         # 7. Create MatchPlayer records and update Player ratings
+        mp_rows: list[MatchPlayer] = []
         for p_in in match_in.players:
             res = elo_result[p_in.player_id]
             mp = MatchPlayer(
@@ -346,22 +800,64 @@ def create_match(match_in: MatchIn):
                 errors=p_in.errors,
                 rating_before=res["before"],
                 rating_after=res["after"],
+                played_at=match.played_at,
             )
             session.add(mp)
+            mp_rows.append(mp)
 
             # Update Player rating
             player = next(pl for pl in players if pl.id == p_in.player_id)
             player.rating = res["after"]
 
-        # 7.5 Recompute crowns based on full history
-        recompute_crowns_and_king(session)
-
-        # 7.6 Recompute chemistry if this is a doubles match
-        if match.format == "doubles":
-            recompute_chemistry(session)
+        # 7.4 Snapshot ratings once enough matches piled up since the last one.
+        # Counts what MatchHistory holds (matches with player rows), as the
+        # replay in recompute_all_ratings does
+        after_checkpoint = (
+            select(func.count())
+            .select_from(Match)
+            .where(Match.league_id == league_id, Match.id.in_(select(MatchPlayer.match_id)))
+        )
+        last_checkpoint = _checkpoint_before(session, league_id, match.played_at, match.id)
+        if last_checkpoint is not None:
+            cp_played_at, cp_match_id = last_checkpoint
+            after_checkpoint = after_checkpoint.where(
+                or_(
+                    Match.played_at > cp_played_at,
+                    and_(Match.played_at == cp_played_at, Match.id > cp_match_id),
+                )
+            )
+        if session.exec(after_checkpoint).one() >= CHECKPOINT_INTERVAL:
+            all_players = session.exec(select(Player).where(Player.league_id == league_id)).all()
+            _write_checkpoint(
+                session, league_id, match.played_at, match.id, {p.id: p.rating for p in all_players}
+            )
 
-        # 8. Commit everything
-        session.commit()
+        # 7.45 Running profile totals, same transaction as the match
+        add_match_to_stats(session, match, mp_rows)
+
+        chem_row = doubles_row(match, mp_rows)
+        session.flush()  # MatchPlayer ids for the history entry
+        new_history_entry = history_entry(match, mp_rows)
+
+        # 7.5 Extend the reign timeline in place; only a match that lands
+        # before existing ones needs the full crown rebuild
+        with reign_lock:
+            rebuild_crowns = not _advance_reigns(session, match)
+
+            # 8. Commit everything
+            bump_data_version(session, league_id, history_changed=True)
+            new_history_version = history_version(session, league_id)
+            session.commit()
+        history_store.append(league_id, new_history_entry, new_history_version)
+
+        # 8.5 Chemistry (if doubles) catches up in the background
+        job_id = derived_jobs.submit(
+            DerivedWork(
+                league_id=league_id,
+                crowns=rebuild_crowns,
+                chemistry_added=[chem_row] if chem_row else [],
+            )
+        )
 
         # 9. Return something useful
         return {
@@ -370,430 +866,669 @@ def create_match(match_in: MatchIn):
             "scoreA": match.scoreA,
             "scoreB": match.scoreB,
             "rating_updates": elo_result,
+            "derived_job": job_id,
         }
 
 
-@app.get("/players/{player_id}")
-def get_player(player_id: int):
-    with Session(engine) as session:
-        player = session.get(Player, player_id)
-        if not player:
-            raise HTTPException(status_code=404, detail=f"Player {player_id} not found")
-
-        stmt = (
-            select(MatchPlayer, Match)
-            .join(Match, Match.id == MatchPlayer.match_id)
-            .where(MatchPlayer.player_id == player_id)
-            .order_by(Match.played_at)
-        )
-        rows = session.exec(stmt).all()
+def import_matches(
+    session: Session, matches: List[MatchImportIn], league_id: int = DEFAULT_LEAGUE_ID
+) -> dict:
+    """
+    Insert a batch of validated matches into a league and replay the
+    league's Elo once from the earliest of them, all in one transaction.
+    Crowns and chemistry are rebuilt once on derived_jobs afterwards. Raises
+    MatchImportError before writing anything if the batch references players
+    outside the league.
+    """
+    first_position = insert_matches(session, matches, league_id)
+    if first_position is None:
+        return {"imported": 0, "derived_job": None}
 
-        matches = []
-        wins = losses = 0
-        wins_singles = losses_singles = 0
-        wins_doubles = losses_doubles = 0
+    job_id = recompute_all_ratings(session, league_id, from_position=first_position)
+    return {"imported": len(matches), "derived_job": job_id}
 
-        total_winners = 0
-        total_errors = 0
 
-        # For CI / LI (using points = winners/errors, as per your simplification)
-        total_team_points_won = 0
-        total_team_points_lost = 0
+@app.post("/matches/import")
+@app.post("/leagues/{league_id}/matches/import")
+def import_matches_file(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|jsonl)$"),
+    league_id: int = Depends(league_scope),
+):
+    """
+    Bulk-import matches from a CSV or JSONL upload (see match_import.py for
+    the columns). The format defaults to the file extension. Either every
+    row is imported or none is; a 400 lists the rows that failed.
+    """
+    try:
+        text = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Import file must be UTF-8 text.")
+
+    try:
+        matches = parse_matches(text, file_format or file_format_for(file.filename))
+        with Session(engine) as session:
+            return import_matches(session, matches, league_id)
+    except MatchImportError as exc:
+        raise HTTPException(status_code=400, detail={"message": str(exc), "errors": exc.errors})
+
+
+@app.post("/matchmaking")
+@app.post("/leagues/{league_id}/matchmaking")
+def matchmaking(request: MatchmakingIn, league_id: int = Depends(league_scope)):
+    """
+    Rank doubles lineups (or, with rounds > 1, rotations) for the players
+    present, balancing Elo, pair chemistry and partner variety. See
+    matchmaking.py for the penalty and the search.
+    """
+    with Session(engine) as session:
+        try:
+            return suggest_lineups(session, request, league_id=league_id)
+        except MatchmakingError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
 
-        rating_history = []
 
-        for mp, m in rows:
-            is_win = (
-                (mp.team_side == "A" and m.scoreA > m.scoreB)
-                or (mp.team_side == "B" and m.scoreB > m.scoreA)
-            )
+@app.get("/players/summary", dependencies=[Depends(conditional_get)])
+@app.get("/leagues/{league_id}/players/summary", dependencies=[Depends(conditional_get)])
+def list_player_summaries(league_id: int = Depends(league_scope)):
+    """
+    Profile stats (W/L, win rates, CI, LI, archetypes) for every player of
+    the league in one response, derived from the materialized PlayerStats
+    counters.
+    """
+    with Session(engine) as session:
+        players = session.exec(select(Player).where(Player.league_id == league_id)).all()
+        counters = load_stored_counters(session, league_id)
+        live_crown_holder = _live_crown_holder(_open_reign(session, league_id))
 
-            # Overall W/L
-            if is_win:
-                wins += 1
-            else:
-                losses += 1
-
-            # By format
-            if m.format == "singles":
-                if is_win:
-                    wins_singles += 1
-                else:
-                    losses_singles += 1
-            elif m.format == "doubles":
-                if is_win:
-                    wins_doubles += 1
-                else:
-                    losses_doubles += 1
-
-            # Player totals
-            total_winners += mp.winners
-            total_errors += mp.errors
-
-            # --- Team points for CI/LI ---
-            # You defined: winners = points won, errors = points lost.
-            # So we can use the scoreboard as team points.
-            if mp.team_side == "A":
-                team_points_won = m.scoreA
-                team_points_lost = m.scoreB
-            else:
-                team_points_won = m.scoreB
-                team_points_lost = m.scoreA
-
-            total_team_points_won += team_points_won
-            total_team_points_lost += team_points_lost
-
-            matches.append(
-                {
-                    "match_id": m.id,
-                    "played_at": m.played_at,
-                    "format": m.format,
-                    "team_side": mp.team_side,
-                    "scoreA": m.scoreA,
-                    "scoreB": m.scoreB,
-                    "winners": mp.winners,
-                    "errors": mp.errors,
-                    "rating_before": mp.rating_before,
-                    "rating_after": mp.rating_after,
-                    "result": "win" if is_win else "loss",
-                }
-            )
+        return [
+            {
+                "player": _player_out(p, live_crown_holder),
+                "stats": derive_player_stats(counters.get(p.id, PlayerCounters())),
+            }
+            for p in players
+        ]
 
-            rating_history.append(
-                {
-                    "played_at": m.played_at,
-                    "rating_after": mp.rating_after,
-                }
-            )
 
-        total_matches = wins + losses
-        net_winners = total_winners - total_errors
+@app.get("/players/{player_id}", dependencies=[Depends(conditional_get)])
+@app.get("/leagues/{league_id}/players/{player_id}", dependencies=[Depends(conditional_get)])
+async def get_player(
+    player_id: int,
+    league_id: int = Depends(league_scope),
+    session: AsyncSession = Depends(get_read_session),
+):
+    player = await session.get(Player, player_id)
+    if not player or player.league_id != league_id:
+        raise HTTPException(status_code=404, detail=f"Player {player_id} not found")
 
-        avg_winners_per_match = (
-            total_winners / total_matches if total_matches > 0 else 0.0
-        )
-        avg_errors_per_match = (
-            total_errors / total_matches if total_matches > 0 else 0.0
-        )
+    # Loads the league's shared history on first use; after that no query
+    history = await session.run_sync(history_store.get, league_id)
 
-        win_rate = wins / total_matches if total_matches > 0 else 0.0
-        net_winners_per_match = (
-            net_winners / total_matches if total_matches > 0 else 0.0
-        )
+    matches = []
+    rating_history = []
 
-        singles_games = wins_singles + losses_singles
-        doubles_games = wins_doubles + losses_doubles
+    for i, k in history.player_matches(player_id):
+        played_at = history.played_at(i)
 
-        singles_win_rate = (
-            wins_singles / singles_games if singles_games > 0 else 0.0
-        )
-        doubles_win_rate = (
-            wins_doubles / doubles_games if doubles_games > 0 else 0.0
+        matches.append(
+            {
+                "match_id": history.match_id[i],
+                "played_at": played_at,
+                "format": FORMATS[history.format[i]] if history.format[i] >= 0 else None,
+                "team_side": history.team_side(k),
+                "scoreA": history.score_a[i],
+                "scoreB": history.score_b[i],
+                "winners": history.winners[k],
+                "errors": history.errors[k],
+                "rating_before": history.rating_before[k],
+                "rating_after": history.rating_after[k],
+                "result": "win" if history.won(k, i) else "loss",
+            }
         )
 
-        # --- CI & LI (your formulas) ---
-        # Share of team winners / errors (using team points as proxy)
-        winner_share = (
-            total_winners / total_team_points_won
-            if total_team_points_won > 0 else 0.0
-        )
-        error_share = (
-            total_errors / total_team_points_lost
-            if total_team_points_lost > 0 else 0.0
+        rating_history.append(
+            {
+                "played_at": played_at,
+                "rating_after": history.rating_after[k],
+            }
         )
 
-        # Normalize net_winners_per_match to roughly [0,1]
-        # Assume typical range is about -4 to +4 net winners per match.
-        raw_norm = (net_winners_per_match + 4.0) / 8.0
-        norm_net_winners = max(0.0, min(1.0, raw_norm))
-
-        ci = 0.6 * winner_share + 0.4 * norm_net_winners
-        li = error_share
-
-        # --- Archetype logic ---
-        archetypes: list[str] = []
-
-        if total_matches >= 5:
-            # OFFENSE
-            if 2.0 < net_winners_per_match >= 5.0 and ci >= 0.55:
-                archetypes.append("Playmaker")
-            if avg_winners_per_match >= 5.0 and ci >= 0.6:
-                archetypes.append("Savage Attacker")
-            if ci >= 0.65 and win_rate >= 0.55:
-                archetypes.append("Team Carry")
-
-            # DEFENSE
-            if 0.7 < avg_errors_per_match <= 1.0 and li <= 0.35 and win_rate >= 0.5:
-                archetypes.append("Reliable Defender")
-            if avg_errors_per_match <= 0.7 and li <= 0.25 and win_rate >= 0.65:
-                archetypes.append("The Wall")
-
-            # RISK / VARIANCE
-            if avg_winners_per_match >= 4.0 and avg_errors_per_match >= 3.0:
-                archetypes.append("Reckless Attacker")
-            if ci >= 0.55 and li >= 0.35:
-                archetypes.append("Wildcard")
-            if li >= 0.5 and win_rate <= 0.5:
-                archetypes.append("Team Liability")
-
-            # MENTALITY
-            if win_rate >= 0.65 and net_winners_per_match >= 1.5:
-                archetypes.append("Closer")
-            if -0.5 <= net_winners_per_match <= 0.5 and 0.45 <= win_rate <= 0.6:
-                archetypes.append("Team Player")
-
-            # FORMAT SPECIALIZATION (performance-based)
-            if singles_games >= 3 and singles_win_rate >= 0.6 and \
-               singles_win_rate >= doubles_win_rate + 0.10:
-                archetypes.append("Singles Specialist")
-
-            if doubles_games >= 3 and doubles_win_rate >= 0.6 and \
-               doubles_win_rate >= singles_win_rate + 0.10:
-                archetypes.append("Doubles Specialist")
-
-            if singles_games >= 3 and doubles_games >= 3 and \
-               singles_win_rate >= 0.55 and doubles_win_rate >= 0.55 and \
-               abs(singles_win_rate - doubles_win_rate) <= 0.10:
-                archetypes.append("Versatile")
-
-        return {
-            "player": player,
-            "stats": {
-                "wins": wins,
-                "losses": losses,
-                "total_matches": total_matches,
-                "wins_singles": wins_singles,
-                "losses_singles": losses_singles,
-                "wins_doubles": wins_doubles,
-                "losses_doubles": losses_doubles,
-                "total_winners": total_winners,
-                "total_errors": total_errors,
-                "net_winners": net_winners,
-                "avg_winners_per_match": avg_winners_per_match,
-                "avg_errors_per_match": avg_errors_per_match,
-                "win_rate": win_rate,
-                "net_winners_per_match": net_winners_per_match,
-                "ci": ci,
-                "li": li,
-                "archetypes": archetypes,
-            },
-            "matches": matches,
-            "rating_history": rating_history,
-        }
+    # Profile stats come from the running counters, not from the rows above
+    counters = counters_from_row(await session.get(PlayerStats, player_id))
+    current = (await session.exec(_open_reign_query(league_id))).first()
+    board = await _live_leaderboard(session, league_id)
+    return {
+        "player": _player_out(player, _live_crown_holder(current)),
+        # None only if the player was created after the board's version
+        "rank": board.rank(player_id) if player_id in board else None,
+        "percentile": board.percentile(player_id) if player_id in board else None,
+        "stats": derive_player_stats(counters),
+        "matches": matches,
+        "rating_history": rating_history,
+    }
 
 
-@app.get("/matches")
-def list_matches():
-    with Session(engine) as session:
-        # Get all matches, newest first
-        matches = session.exec(
-            select(Match).order_by(Match.played_at.desc())
-        ).all()
+def _encode_match_cursor(m: Match) -> str:
+    raw = f"{m.played_at.isoformat()}|{m.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_match_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        played_at_raw, match_id_raw = raw.rsplit("|", 1)
+        return datetime.fromisoformat(played_at_raw), int(match_id_raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/matches", dependencies=[Depends(conditional_get)])
+@app.get("/leagues/{league_id}/matches", dependencies=[Depends(conditional_get)])
+async def list_matches(
+    response: Response,
+    league_id: int = Depends(league_scope),
+    session: AsyncSession = Depends(get_read_session),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_MATCH_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    player_id: Optional[int] = None,
+    format: Optional[str] = None,
+    count: bool = False,
+):
+    """
+    The league's matches newest first, optionally paged and filtered.
+
+    - limit / cursor: keyset paging on (played_at, id). When more rows exist,
+      the X-Next-Cursor header holds the cursor for the next page.
+    - from (inclusive) / to (exclusive): played_at window; offsets are
+      converted to UTC like every stored played_at
+    - player_id: only matches this player took part in
+    - format: "singles" | "doubles"
+
+    - count: also send X-Total-Count, the number of matches matching the
+      filters. Counting reads every one of them, so it's opt-in (the first
+      page of a listing); paging only needs X-Next-Cursor.
+    """
+    filters = [Match.league_id == league_id]
+    if from_ is not None:
+        filters.append(Match.played_at >= to_naive_utc(from_))
+    if to is not None:
+        filters.append(Match.played_at < to_naive_utc(to))
+    if format is not None:
+        filters.append(Match.format == format)
+    if player_id is not None:
+        filters.append(
+            Match.id.in_(
+                select(MatchPlayer.match_id).where(MatchPlayer.player_id == player_id)
+            )
+        )
 
-        # For each match, pull its players
-        result = []
-        for m in matches:
-            mp_rows = session.exec(
+    if count:
+        total = (
+            await session.exec(select(func.count()).select_from(Match).where(*filters))
+        ).one()
+        response.headers["X-Total-Count"] = str(total)
+
+    stmt = (
+        select(Match)
+        .where(*filters)
+        .order_by(Match.played_at.desc(), Match.id.desc())
+    )
+    if cursor is not None:
+        cursor_played_at, cursor_id = _decode_match_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                Match.played_at < cursor_played_at,
+                and_(Match.played_at == cursor_played_at, Match.id < cursor_id),
+            )
+        )
+    if limit is not None:
+        # One extra row tells us whether another page exists
+        stmt = stmt.limit(limit + 1)
+
+    matches = (await session.exec(stmt)).all()
+    if limit is not None and len(matches) > limit:
+        matches = matches[:limit]
+        response.headers["X-Next-Cursor"] = _encode_match_cursor(matches[-1])
+
+    # Players for the whole page in one joined query
+    players_by_match: dict[int, list[dict]] = {m.id: [] for m in matches}
+    if matches:
+        mp_rows = (
+            await session.exec(
                 select(MatchPlayer, Player)
                 .join(Player, Player.id == MatchPlayer.player_id)
-                .where(MatchPlayer.match_id == m.id)
-            ).all()
-
-            players = []
-            for mp, p in mp_rows:
-                players.append(
-                    {
-                        "player_id": p.id,
-                        "name": p.name,
-                        "team_side": mp.team_side,
-                        "winners": mp.winners,
-                        "errors": mp.errors,
-                        "rating_before": mp.rating_before,
-                        "rating_after": mp.rating_after,
-                    }
-                )
+                .where(MatchPlayer.match_id.in_(list(players_by_match)))
+                .order_by(MatchPlayer.match_id, MatchPlayer.id)
+            )
+        ).all()
 
-            result.append(
+        for mp, p in mp_rows:
+            players_by_match[mp.match_id].append(
                 {
-                    "id": m.id,
-                    "played_at": m.played_at,
-                    "format": m.format,
-                    "scoreA": m.scoreA,
-                    "scoreB": m.scoreB,
-                    "players": players,
+                    "player_id": p.id,
+                    "name": p.name,
+                    "team_side": mp.team_side,
+                    "winners": mp.winners,
+                    "errors": mp.errors,
+                    "rating_before": mp.rating_before,
+                    "rating_after": mp.rating_after,
                 }
             )
 
-        return result
+    result = []
+    for m in matches:
+        result.append(
+            {
+                "id": m.id,
+                "played_at": m.played_at,
+                "format": m.format,
+                "scoreA": m.scoreA,
+                "scoreB": m.scoreB,
+                "players": players_by_match[m.id],
+            }
+        )
 
+    return result
 
-def recompute_all_ratings(session: Session):
-    # Reset all players to base rating
-    players = session.exec(select(Player)).all()
-    base_rating = BASE_RATING
-    rating_map = {p.id: base_rating for p in players}
-    for p in players:
-        p.rating = base_rating
 
-    # Re-run Elo in chronological order
-    matches = session.exec(
-        select(Match).order_by(Match.played_at, Match.id)
-    ).all()
+@app.get("/export/matches")
+@app.get("/leagues/{league_id}/export/matches")
+async def export_matches(
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    league_id: int = Depends(league_scope),
+):
+    """
+    Stream every match of the league (id, played_at, format, scoreA, scoreB)
+    oldest first as NDJSON or CSV; since (inclusive) limits it to
+    played_at >= since. See match_export.py.
+    """
+    stmt = matches_export_query(to_naive_utc(since) if since else None, league_id)
+    return StreamingResponse(
+        stream_export(async_engine, stmt, file_format),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+    )
+
+
+@app.get("/export/match_players")
+@app.get("/leagues/{league_id}/export/match_players")
+async def export_match_players(
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    league_id: int = Depends(league_scope),
+):
+    """
+    Stream every match_player row of the league, with its match's
+    played_at, in match order as NDJSON or CSV; since works as on
+    /export/matches.
+    """
+    stmt = match_players_export_query(to_naive_utc(since) if since else None, league_id)
+    return StreamingResponse(
+        stream_export(async_engine, stmt, file_format),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+    )
 
-    for m in matches:
-        mp_rows = session.exec(
-            select(MatchPlayer).where(MatchPlayer.match_id == m.id)
-        ).all()
 
-        # ---- Guard against malformed matches ----
-        if m.format == "singles":
-            if len(mp_rows) != 2:
-                continue
-            sides = {mp.team_side for mp in mp_rows}
-            if sides != {"A", "B"}:
-                continue
-        elif m.format == "doubles":
-            if len(mp_rows) != 4:
-                continue
-            teamA = [mp for mp in mp_rows if mp.team_side == "A"]
-            teamB = [mp for mp in mp_rows if mp.team_side == "B"]
-            if len(teamA) != 2 or len(teamB) != 2:
-                continue
-
-        # Build PlayerStat list using current rating_map as rating_before
-        stats: list[PlayerStat] = []
-        for mp in mp_rows:
-            if mp.player_id not in rating_map:
-                stats = []
-                break
-            before_rating = rating_map[mp.player_id]
-            ps = PlayerStat(
-                player_id=mp.player_id,
-                team_side=mp.team_side,
-                winners=mp.winners,
-                errors=mp.errors,
-                rating_before=before_rating,
+def _checkpoint_before(session: Session, league_id: int, played_at: datetime, match_id: int):
+    """
+    Return the (played_at, match_id) key of the league's newest rating
+    checkpoint that sits strictly before the given timeline position, or None.
+    """
+    return session.exec(
+        select(RatingCheckpoint.played_at, RatingCheckpoint.match_id)
+        .where(
+            RatingCheckpoint.league_id == league_id,
+            or_(
+                RatingCheckpoint.played_at < played_at,
+                and_(
+                    RatingCheckpoint.played_at == played_at,
+                    RatingCheckpoint.match_id < match_id,
+                ),
+            ),
+        )
+        .order_by(RatingCheckpoint.played_at.desc(), RatingCheckpoint.match_id.desc())
+        .limit(1)
+    ).first()
+
+
+def _write_checkpoint(
+    session: Session, league_id: int, played_at: datetime, match_id: int, rating_map: dict[int, float]
+):
+    for pid, rating in rating_map.items():
+        session.add(
+            RatingCheckpoint(
+                match_id=match_id,
+                player_id=pid,
+                league_id=league_id,
+                played_at=played_at,
+                rating=int(rating),
             )
-            stats.append(ps)
+        )
 
-        if not stats:
-            continue
 
-        elo_result = apply_match(
-            match_format=m.format,
-            scoreA=m.scoreA,
-            scoreB=m.scoreB,
-            players=stats,
+@traced("recompute_all_ratings")
+def recompute_all_ratings(
+    session: Session,
+    league_id: int = DEFAULT_LEAGUE_ID,
+    from_position: tuple[datetime, int] | None = None,
+    chemistry_added: list[dict] | None = None,
+    chemistry_removed: list[dict] | None = None,
+):
+    """
+    Replay Elo over a league's match history and sync its MatchPlayer /
+    Player ratings. Other leagues' rows are not read or written, so the cost
+    follows the size of this league.
+
+    from_position is the (played_at, match_id) of the earliest match touched
+    by an edit. When given, the replay restores ratings from the newest
+    checkpoint before that position and only replays the suffix after it.
+    Without it (or with no usable checkpoint) every player starts again
+    from BASE_RATING. The caller's match writes are flushed, not committed:
+    they commit together with the new ratings.
+
+    chemistry_added / chemistry_removed are the doubles rows the edit added
+    or removed (see chemistry_service.update_chemistry). When neither is
+    given, chemistry is refit from scratch.
+
+    Crowns and chemistry are queued on derived_jobs; returns the job id.
+    """
+    players = session.exec(select(Player).where(Player.league_id == league_id)).all()
+    base_rating = BASE_RATING
+    rating_map = {p.id: base_rating for p in players}
+
+    checkpoint = None
+    if from_position is not None:
+        played_at, match_id = from_position
+        # Anything at or after the edit depends on the old data
+        session.exec(
+            delete(RatingCheckpoint).where(
+                RatingCheckpoint.league_id == league_id,
+                or_(
+                    RatingCheckpoint.played_at > played_at,
+                    and_(
+                        RatingCheckpoint.played_at == played_at,
+                        RatingCheckpoint.match_id >= match_id,
+                    ),
+                ),
+            )
         )
+        checkpoint = _checkpoint_before(session, league_id, played_at, match_id)
+    else:
+        session.exec(delete(RatingCheckpoint).where(RatingCheckpoint.league_id == league_id))
+
+    after = None
+    if checkpoint is not None:
+        cp_played_at, cp_match_id = checkpoint
+        cp_rows = session.exec(
+            select(RatingCheckpoint).where(RatingCheckpoint.match_id == cp_match_id)
+        ).all()
+        for cp in cp_rows:
+            if cp.player_id in rating_map:
+                rating_map[cp.player_id] = cp.rating
+
+        # Only the suffix after the checkpoint needs replaying
+        after = (cp_played_at, cp_match_id)
+
+    # Re-run Elo in chronological order. Every caller has just changed the
+    # history in this (uncommitted) transaction, at or after from_position,
+    # so nothing up to the checkpoint moved: when the shared history is
+    # current, its head is reused and only the suffix is read. The result
+    # becomes the shared history once the new ratings commit.
+    cached = history_store.current(session, league_id) if after is not None else None
+    if cached is not None:
+        history = cached.head(cached.index_after(after))
+        history.extend(MatchHistory.load(session, league_id, after=after))
+    else:
+        history = MatchHistory.load(session, league_id)
+
+    rating_updates: list[dict] = []
+    since_checkpoint = 0
+    for i in range(history.index_after(after), len(history)):
+        stats = _replay_stats(history, i, rating_map)
+        if stats is not None:
+            elo_result = apply_match(
+                match_format=FORMATS[history.format[i]],
+                scoreA=history.score_a[i],
+                scoreB=history.score_b[i],
+                players=stats,
+            )
 
-        # Update MatchPlayer rows and rating_map
-        for mp in mp_rows:
-            res = elo_result[mp.player_id]
-            mp.rating_before = res["before"]
-            mp.rating_after = res["after"]
-            rating_map[mp.player_id] = res["after"]
+            # Update MatchPlayer ratings that moved, and rating_map
+            for k in history.participants(i):
+                res = elo_result[history.player_id[k]]
+                # Integral already; BASE_RATING just arrives as a float
+                new_before, new_after = int(res["before"]), int(res["after"])
+                if (history.rating_before[k], history.rating_after[k]) != (new_before, new_after):
+                    history.rating_before[k] = new_before
+                    history.rating_after[k] = new_after
+                    rating_updates.append(
+                        {"id": history.mp_id[k], "rating_before": new_before, "rating_after": new_after}
+                    )
+                rating_map[history.player_id[k]] = res["after"]
+
+        # Skipped entries count too, the same as create_match counts them
+        since_checkpoint += 1
+        if since_checkpoint >= CHECKPOINT_INTERVAL:
+            _write_checkpoint(session, league_id, *history.position(i), rating_map)
+            since_checkpoint = 0
+
+    if rating_updates:
+        session.execute(update(MatchPlayer), rating_updates)
 
     # Finally, sync Player.rating to latest values
     for p in players:
         p.rating = rating_map[p.id]
 
-    # Recompute crowns off the same history
-    recompute_crowns_and_king(session)
-
-    # Recompute chemistry based on updated matches
-    recompute_chemistry(session)
+    # Edits / deletes / imports can touch any of the league's totals
+    rebuild_player_stats(session, league_id)
 
+    bump_data_version(session, league_id, history_changed=True)
+    new_history_version = history_version(session, league_id)
     session.commit()
+    history_store.publish(league_id, history, new_history_version)
+
+    # Crowns are rebuilt off the new history in the background. Chemistry
+    # only depends on doubles teams and scores, not on ratings.
+    return derived_jobs.submit(
+        DerivedWork(
+            league_id=league_id,
+            crowns=True,
+            full_chemistry=chemistry_added is None and chemistry_removed is None,
+            chemistry_added=chemistry_added or [],
+            chemistry_removed=chemistry_removed or [],
+        )
+    )
 
 
 @app.patch("/matches/{match_id}")
-def update_match(match_id: int, upd: MatchUpdate):
+@app.patch("/leagues/{league_id}/matches/{match_id}")
+def update_match(match_id: int, upd: MatchUpdate, league_id: int = Depends(league_scope)):
     with Session(engine) as session:
         match = session.get(Match, match_id)
-        if not match:
+        if not match or match.league_id != league_id:
             raise HTTPException(status_code=404, detail="Match not found")
 
+        mp_rows = session.exec(
+            select(MatchPlayer).where(MatchPlayer.match_id == match_id)
+        ).all()
+        old_chem_row = doubles_row(match, mp_rows)
+
         match.scoreA = upd.scoreA
         match.scoreB = upd.scoreB
-        session.commit()
-
-        # Recompute Elo chain from scratch (crowns + chemistry)
-        recompute_all_ratings(session)
+        # Committed together with the replay, so history_version moves with it
+        session.flush()
+
+        new_chem_row = doubles_row(match, mp_rows)
+
+        # Replay Elo from this match onwards; swap the old doubles row for
+        # the new one in chemistry (crowns from scratch, in the background)
+        job_id = recompute_all_ratings(
+            session,
+            league_id,
+            from_position=(match.played_at, match.id),
+            chemistry_added=[new_chem_row] if new_chem_row else [],
+            chemistry_removed=[old_chem_row] if old_chem_row else [],
+        )
 
-        return {"status": "ok", "match_id": match_id}
+        return {"status": "ok", "match_id": match_id, "derived_job": job_id}
 
 
 @app.delete("/matches/{match_id}")
-def delete_match(match_id: int):
+@app.delete("/leagues/{league_id}/matches/{match_id}")
+def delete_match(match_id: int, league_id: int = Depends(league_scope)):
     with Session(engine) as session:
         match = session.get(Match, match_id)
-        if not match:
+        if not match or match.league_id != league_id:
             raise HTTPException(status_code=404, detail="Match not found")
 
+        position = (match.played_at, match.id)
+
         # Delete all MatchPlayer rows for this match
         mp_rows = session.exec(
             select(MatchPlayer).where(MatchPlayer.match_id == match_id)
         ).all()
+        chem_row = doubles_row(match, mp_rows)
         for mp in mp_rows:
             session.delete(mp)
 
         # Delete the match itself
         session.delete(match)
-        session.commit()
+        session.flush()
+
+        # Replay Elo from where the match used to be, downdate chemistry
+        # (and crowns)
+        job_id = recompute_all_ratings(
+            session,
+            league_id,
+            from_position=position,
+            chemistry_removed=[chem_row] if chem_row else [],
+        )
 
-        # Recompute Elo chain (and crowns + chemistry)
-        recompute_all_ratings(session)
+        return {"status": "ok", "deleted_match_id": match_id, "derived_job": job_id}
 
-        return {"status": "ok", "deleted_match_id": match_id}
 
+@app.get("/king", dependencies=[Depends(conditional_get)])
+@app.get("/leagues/{league_id}/king", dependencies=[Depends(conditional_get)])
+def get_king(league_id: int = Depends(league_scope), as_of: Optional[datetime] = None):
+    """
+    The league's current King/Queen plus its reign timeline, read straight
+    from the Reign table (kept up to date by match writes and the background
+    rebuild).
 
-@app.get("/king")
-def get_king():
+    With as_of, the answer for that moment instead: the King/Queen is the
+    top of the ratings then, from the MatchPlayer.rating_after history
+    rather than a replay, and the timeline stops at as_of.
+    """
     with Session(engine) as session:
-        current_king_id, king_since, rating_map, reigns = recompute_crowns_and_king(session)
-
-        # Persist crowns_collected updates
-        session.commit()
+        if as_of is not None:
+            return _king_as_of(session, league_id, to_naive_utc(as_of))
+
+        rows = session.exec(
+            select(Reign, Player.name)
+            .join(Player, Player.id == Reign.king_id)
+            .where(Reign.league_id == league_id)
+            .order_by(Reign.start, Reign.id)
+        ).all()
 
-        if current_king_id is None or king_since is None:
+        current = next((r for r, _ in rows if r.end is None), None)
+        if current is None:
             return {"king": None}
 
-        king_player = session.get(Player, current_king_id)
+        king_player = session.get(Player, current.king_id)
         if not king_player:
             return {"king": None}
 
-        now = datetime.now()
-        days_float = (now - king_since).total_seconds() / 86400.0
-        days = int(days_float)
-
-        rating = rating_map[current_king_id]
+        return _king_out(
+            king_player, king_player.rating, king_player.crowns_collected, current, rows, datetime.now()
+        )
 
-        # Apply Queen override if configured
-        title = "King"
-        if QUEEN_PLAYER_ID is not None and current_king_id == QUEEN_PLAYER_ID:
-            title = "Queen"
 
-        eligible = days >= 14  # has held crown for at least 14 days
+def _king_as_of(session: Session, league_id: int, as_of: datetime) -> dict:
+    board = _board_as_of(session.exec(_ratings_as_of_query(league_id, as_of)).all())
+    if board is None:
+        return {"king": None}
+    king_id = board.top()
+
+    rows = [
+        (_reign_as_of(r, as_of), name)
+        for r, name in session.exec(_reigns_as_of_query(league_id, as_of)).all()
+    ]
+    current = next((r for r, _ in rows if r.end is None), None)
+    if current is None or current.king_id != king_id:
+        # The timeline hasn't caught up with as_of yet (derived_jobs); the
+        # ratings decide
+        current = Reign(league_id=league_id, king_id=king_id, start=as_of)
+
+    closed_crowns = _crowns_as_of([r for r, _ in rows if r.end is not None], as_of)
+    return _king_out(
+        session.get(Player, king_id),
+        int(board.rating(king_id)),
+        closed_crowns.get(king_id, 0),
+        current,
+        rows,
+        as_of,
+    )
+
+
+def _king_out(
+    king_player: Player,
+    rating: int,
+    closed_crowns: int,
+    current: Reign,
+    rows: list[tuple[Reign, str]],
+    now: datetime,
+) -> dict:
+    """GET /king body for the open reign current, with the timeline up to now."""
+    days = int(_reign_days(current.start, now))
+
+    # Apply Queen override if configured
+    title = "King"
+    if QUEEN_PLAYER_ID is not None and current.king_id == QUEEN_PLAYER_ID:
+        title = "Queen"
+
+    eligible = days >= CROWN_MIN_DAYS  # has held crown for at least 14 days
+
+    # The open reign runs up to "now"
+    reigns = []
+    for r, name in rows:
+        end = r.end if r.end is not None else now
+        days_total = _reign_days(r.start, end)
+        reigns.append(
+            {
+                "king_id": r.king_id,
+                "king_name": name,
+                "start": r.start,
+                "end": end,
+                "days": int(days_total),
+                "earned_crown": days_total >= CROWN_MIN_DAYS,
+            }
+        )
 
-        # Serialize reigns: datetimes become ISO strings automatically via FastAPI/JSONResponse
-        return {
-            "id": king_player.id,
-            "name": king_player.name,
-            "rating": rating,
-            "since": king_since,
-            "days": days,
-            "eligible": eligible,
-            "title": title,
-            "crowns_collected": king_player.crowns_collected,
-            "reigns": reigns,
-        }
+    # Serialize reigns: datetimes become ISO strings automatically via FastAPI/JSONResponse
+    return {
+        "id": king_player.id,
+        "name": king_player.name,
+        "rating": rating,
+        "since": current.start,
+        "days": days,
+        "eligible": eligible,
+        "title": title,
+        "crowns_collected": closed_crowns + (1 if eligible else 0),
+        "reigns": reigns,
+    }
 
 
 # NEW: Chemistry network endpoint
-@app.get("/chemistry")
-def get_chemistry_network():
+@app.get("/chemistry", dependencies=[Depends(conditional_get)])
+@app.get("/leagues/{league_id}/chemistry", dependencies=[Depends(conditional_get)])
+async def get_chemistry_network(
+    league_id: int = Depends(league_scope),
+    session: AsyncSession = Depends(get_read_session),
+):
     """
-    Returns the full doubles chemistry network as:
+    Returns the league's doubles chemistry network as:
     {
       "nodes": [{ id, name, rating }, ...],
       "edges": [{
@@ -805,59 +1540,74 @@ def get_chemistry_network():
         "uplift_a": uplift_a_given_b,
         "uplift_b": uplift_b_given_a,
         "point_share": avg_point_share,
-        "expected_point_share": avg_point_share_base
+        "expected_point_share": avg_point_share_base,
+        "se": standard error of chemistry,
+        "t_stat": chemistry / se,
+        "ci_low" / "ci_high": 95% interval of chemistry,
+            (se and the interval are refreshed every few minutes, see
+            chemistry_service.refresh_pair_uncertainty; null for a pair
+            until its first refresh)
+        "boot_ci_low" / "boot_ci_high": bootstrap interval (null until
+            chemistry_service.py has been run to compute it)
       }, ...]
     }
     """
-    with Session(engine) as session:
-        pair_rows = session.exec(select(PairChemistry)).all()
+    pair_rows = (
+        await session.exec(select(PairChemistry).where(PairChemistry.league_id == league_id))
+    ).all()
 
-        # Collect all players that appear in chemistry
-        player_ids: set[int] = set()
-        for pc in pair_rows:
-            player_ids.add(pc.player_id_a)
-            player_ids.add(pc.player_id_b)
+    # Collect all players that appear in chemistry
+    player_ids: set[int] = set()
+    for pc in pair_rows:
+        player_ids.add(pc.player_id_a)
+        player_ids.add(pc.player_id_b)
 
-        players = []
-        if player_ids:
-            players = session.exec(
-                select(Player).where(Player.id.in_(player_ids))
-            ).all()
+    players = []
+    if player_ids:
+        players = (
+            await session.exec(select(Player).where(Player.id.in_(player_ids)))
+        ).all()
 
-        nodes = [
-            {
-                "id": p.id,
-                "name": p.name,
-                "rating": p.rating,
-            }
-            for p in players
-        ]
+    nodes = [
+        {
+            "id": p.id,
+            "name": p.name,
+            "rating": p.rating,
+        }
+        for p in players
+    ]
 
-        max_abs_beta = max((abs(pc.beta_chemistry) for pc in pair_rows), default=0.0)
-        if max_abs_beta == 0.0:
-            max_abs_beta = 1.0
+    max_abs_beta = max((abs(pc.beta_chemistry) for pc in pair_rows), default=0.0)
+    if max_abs_beta == 0.0:
+        max_abs_beta = 1.0
 
-        edges = []
-        for pc in pair_rows:
-            # Skip very low-sample edges if desired
-            if pc.games_together < 2:
-                continue
+    edges = []
+    for pc in pair_rows:
+        # Skip very low-sample edges if desired
+        if pc.games_together < 2:
+            continue
 
-            edges.append(
-                {
-                    "source": pc.player_id_a,
-                    "target": pc.player_id_b,
-                    "games": pc.games_together,
-                    "chemistry": pc.beta_chemistry,
-                    "chemistry_norm": abs(pc.beta_chemistry) / max_abs_beta,
-                    "uplift_a": pc.uplift_a_given_b,
-                    "uplift_b": pc.uplift_b_given_a,
-                    "point_share": pc.avg_point_share,
-                    "expected_point_share": pc.avg_point_share_base,
-                }
-            )
+        edges.append(
+            {
+                "source": pc.player_id_a,
+                "target": pc.player_id_b,
+                "games": pc.games_together,
+                "chemistry": pc.beta_chemistry,
+                "chemistry_norm": abs(pc.beta_chemistry) / max_abs_beta,
+                "uplift_a": pc.uplift_a_given_b,
+                "uplift_b": pc.uplift_b_given_a,
+                "point_share": pc.avg_point_share,
+                "expected_point_share": pc.avg_point_share_base,
+                "se": pc.beta_se,
+                "t_stat": pc.beta_t_stat,
+                "ci_low": pc.beta_ci_low,
+                "ci_high": pc.beta_ci_high,
+                "boot_ci_low": pc.beta_boot_ci_low,
+                "boot_ci_high": pc.beta_boot_ci_high,
+            }
+        )
 
-        return {
-            "nodes": nodes,
-            "edges": edges,
-        }
+    return {
+        "nodes": nodes,
+        "edges": edges,
+    }
@@ -0,0 +1,324 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from pydantic import BaseModel, ValidationError, field_validator
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from models import DEFAULT_LEAGUE_ID, Player, Match, MatchPlayer
+
+"""
+Match input rules shared by POST /matches and the bulk importer.
+
+Bulk files hold one match per CSV row / JSONL line, each with a played_at
+timestamp. Every match is checked with the same rules as POST /matches and
+nothing is written unless the whole file is valid. Valid files are inserted
+with batched executemany; main.import_matches() then replays Elo once.
+
+CSV columns (a2/b2 left blank for singles, winners/errors may be blank):
+    played_at,format,scoreA,scoreB,
+    a1,a1_winners,a1_errors,a2,a2_winners,a2_errors,
+    b1,b1_winners,b1_errors,b2,b2_winners,b2_errors
+
+JSONL lines use the POST /matches body plus played_at:
+    {"played_at": "2024-05-01T18:30:00", "format": "singles", "scoreA": 11,
+     "scoreB": 7, "players": [{"player_id": 1, "team_side": "A", ...}, ...]}
+
+Every match of a file goes into one league, and may only name that
+league's players.
+
+CLI (from backend/):
+    python match_import.py season.csv [--league 2]
+"""
+
+CSV_SLOTS = (("a1", "A"), ("a2", "A"), ("b1", "B"), ("b2", "B"))
+
+# Cap on row errors reported back for an invalid file
+MAX_REPORTED_ERRORS = 50
+
+
+def to_naive_utc(v: datetime) -> datetime:
+    """Match.played_at is stored as naive UTC."""
+    if v.tzinfo is not None:
+        v = v.astimezone(timezone.utc).replace(tzinfo=None)
+    return v
+
+
+class PlayerStatIn(BaseModel):
+    player_id: int
+    team_side: str  # "A" or "B"
+    winners: int    # points this player won directly
+    errors: int     # points this player lost directly
+
+
+class MatchIn(BaseModel):
+    format: str     # "singles" | "doubles"
+    scoreA: int
+    scoreB: int
+    players: List[PlayerStatIn]
+
+
+class MatchImportIn(MatchIn):
+    played_at: datetime
+
+    @field_validator("played_at")
+    @classmethod
+    def _to_naive_utc(cls, v: datetime) -> datetime:
+        return to_naive_utc(v)
+
+
+class MatchImportError(ValueError):
+    """Raised with one message per offending row; nothing was written."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__(f"{len(errors)} invalid match row(s)")
+        self.errors = errors[:MAX_REPORTED_ERRORS]
+
+
+# ---------- Shared rules ----------
+
+def match_shape_error(match_in: MatchIn) -> Optional[str]:
+    """Team-size / format check of create_match; returns the error message."""
+    teamA_in = [p for p in match_in.players if p.team_side == "A"]
+    teamB_in = [p for p in match_in.players if p.team_side == "B"]
+
+    if match_in.format == "singles":
+        if len(teamA_in) != 1 or len(teamB_in) != 1 or len(match_in.players) != 2:
+            return "Singles match must have exactly 2 players: 1 on team A and 1 on team B."
+    elif match_in.format == "doubles":
+        if len(teamA_in) != 2 or len(teamB_in) != 2 or len(match_in.players) != 4:
+            return "Doubles match must have exactly 4 players: 2 on team A and 2 on team B."
+    else:
+        return "Invalid format; must be 'singles' or 'doubles'."
+    return None
+
+
+def fill_missing_point_stats(match_in: MatchIn) -> None:
+    """If no winners/errors were tracked, auto-fill them from the score."""
+    no_stats_tracked = all(
+        (p.winners == 0 and p.errors == 0) for p in match_in.players
+    )
+    if not no_stats_tracked:
+        return
+
+    teamA = [p for p in match_in.players if p.team_side == "A"]
+    teamB = [p for p in match_in.players if p.team_side == "B"]
+
+    # Helper to split points roughly evenly across n players
+    def split_points(total: int, n: int) -> list[int]:
+        if n <= 0:
+            return []
+        base = total // n
+        rem = total % n
+        return [base + (1 if i < rem else 0) for i in range(n)]
+
+    if match_in.format == "singles":
+        # Expect exactly 1 per team (already validated)
+        a = teamA[0]
+        b = teamB[0]
+        # winners = points won, errors = points lost
+        a.winners = match_in.scoreA
+        a.errors = match_in.scoreB
+        b.winners = match_in.scoreB
+        b.errors = match_in.scoreA
+    elif match_in.format == "doubles":
+        # Split team points across teammates (already validated to be len 2 each)
+        a_winners_split = split_points(match_in.scoreA, len(teamA))
+        a_errors_split = split_points(match_in.scoreB, len(teamA))
+        for i, p in enumerate(teamA):
+            p.winners = a_winners_split[i]
+            p.errors = a_errors_split[i]
+
+        b_winners_split = split_points(match_in.scoreB, len(teamB))
+        b_errors_split = split_points(match_in.scoreA, len(teamB))
+        for i, p in enumerate(teamB):
+            p.winners = b_winners_split[i]
+            p.errors = b_errors_split[i]
+
+
+# ---------- Parsing ----------
+
+def _error_text(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def _csv_record(row: Dict[str, str]) -> dict:
+    players = []
+    for slot, side in CSV_SLOTS:
+        pid = (row.get(slot) or "").strip()
+        if not pid:
+            continue
+        players.append(
+            {
+                "player_id": pid,
+                "team_side": side,
+                "winners": (row.get(f"{slot}_winners") or "").strip() or 0,
+                "errors": (row.get(f"{slot}_errors") or "").strip() or 0,
+            }
+        )
+    return {
+        "played_at": (row.get("played_at") or "").strip(),
+        "format": (row.get("format") or "").strip().lower(),
+        "scoreA": (row.get("scoreA") or "").strip(),
+        "scoreB": (row.get("scoreB") or "").strip(),
+        "players": players,
+    }
+
+
+def parse_matches(text: str, file_format: str) -> List[MatchImportIn]:
+    """
+    Parse a CSV or JSONL document into validated matches.
+
+    Raises MatchImportError listing every bad row (by line number) if any
+    row fails parsing or the create_match shape rules.
+    """
+    if file_format == "csv":
+        # Header is line 1
+        rows = enumerate(csv.DictReader(io.StringIO(text)), start=2)
+    elif file_format == "jsonl":
+        rows = (
+            (line_no, line)
+            for line_no, line in enumerate(text.splitlines(), start=1)
+            if line.strip()
+        )
+    else:
+        raise MatchImportError([f"Unknown file format {file_format!r}; use 'csv' or 'jsonl'."])
+
+    matches: List[MatchImportIn] = []
+    errors: List[str] = []
+    for line_no, row in rows:
+        try:
+            record = _csv_record(row) if file_format == "csv" else json.loads(row)
+            match_in = MatchImportIn.model_validate(record)
+        except json.JSONDecodeError as exc:
+            errors.append(f"line {line_no}: invalid JSON ({exc.msg})")
+            continue
+        except ValidationError as exc:
+            errors.append(f"line {line_no}: {_error_text(exc)}")
+            continue
+
+        shape_error = match_shape_error(match_in)
+        if shape_error:
+            errors.append(f"line {line_no}: {shape_error}")
+            continue
+        matches.append(match_in)
+
+    if errors:
+        raise MatchImportError(errors)
+    return matches
+
+
+def file_format_for(filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return "jsonl" if ext in (".jsonl", ".ndjson") else "csv"
+
+
+# ---------- Insert ----------
+
+def insert_matches(
+    session: Session,
+    matches: List[MatchImportIn],
+    league_id: int = DEFAULT_LEAGUE_ID,
+) -> Optional[Tuple[datetime, int]]:
+    """
+    Insert parsed matches and their MatchPlayer rows into a league with
+    executemany, without committing. Ratings are left at 0 for the replay to
+    fill in.
+
+    Returns the (played_at, match_id) of the earliest inserted match, or
+    None if there was nothing to insert.
+    """
+    if not matches:
+        return None
+
+    referenced = {p.player_id for m in matches for p in m.players}
+    found = set(
+        session.exec(
+            select(Player.id).where(Player.id.in_(referenced), Player.league_id == league_id)
+        ).all()
+    )
+    missing = sorted(referenced - found)
+    if missing:
+        raise MatchImportError([f"Some player_ids not found in league {league_id}: {missing}"])
+
+    for match_in in matches:
+        fill_missing_point_stats(match_in)
+
+    match_ids = session.execute(
+        insert(Match).returning(Match.id, sort_by_parameter_order=True),
+        [
+            {
+                "league_id": league_id,
+                "format": m.format,
+                "scoreA": m.scoreA,
+                "scoreB": m.scoreB,
+                "played_at": m.played_at,
+            }
+            for m in matches
+        ],
+    ).scalars().all()
+
+    session.execute(
+        insert(MatchPlayer),
+        [
+            {
+                "match_id": match_id,
+                "player_id": p.player_id,
+                "team_side": p.team_side,
+                "winners": p.winners,
+                "errors": p.errors,
+                "rating_before": 0,
+                "rating_after": 0,
+                "played_at": m.played_at,
+            }
+            for match_id, m in zip(match_ids, matches)
+            for p in m.players
+        ],
+    )
+
+    return min((m.played_at, match_id) for match_id, m in zip(match_ids, matches))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Bulk-import matches from CSV or JSONL.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    parser.add_argument("--league", type=int, default=DEFAULT_LEAGUE_ID)
+    parser.add_argument(
+        "--wait",
+        type=float,
+        default=600.0,
+        help="seconds to wait for the crown/chemistry recompute to finish",
+    )
+    args = parser.parse_args()
+
+    import main  # noqa: E402  (connects to SUPABASE_DB_URL)
+
+    with open(args.path, encoding="utf-8") as f:
+        text = f.read()
+
+    t0 = time.perf_counter()
+    try:
+        matches = parse_matches(text, args.format or file_format_for(args.path))
+        with Session(main.engine) as session:
+            result = main.import_matches(session, matches, args.league)
+    except MatchImportError as exc:
+        for err in exc.errors:
+            print(err)
+        raise SystemExit(f"Import aborted: {exc}")
+    print(f"Imported {result['imported']} matches in {time.perf_counter() - t0:.2f}s")
+
+    # The worker thread dies with this process; let it finish first
+    if not main.derived_jobs.wait_until_caught_up(timeout=args.wait):
+        raise SystemExit("Crown/chemistry recompute did not finish; see GET /jobs/status")
+    print(f"Crowns and chemistry rebuilt ({time.perf_counter() - t0:.2f}s total)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,466 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from typing import Dict, List, Optional, Tuple
+import time
+import numpy as np
+from pydantic import BaseModel, Field
+from sqlmodel import Session, select
+import elo
+from models import DEFAULT_LEAGUE_ID, Player, PairChemistry
+
+"""
+Doubles matchmaking for the players who showed up (POST /matchmaking).
+
+A round seats the pool on `courts` courts, two teams of two per court; the
+rest sit out. Each court gets a penalty (lower is better):
+
+      balance_weight   * |2E - 1|         E = elo.expected of the team averages
+    + chemistry_weight * |β_A - β_B|      gap in pair chemistry (point share)
+    + variety_weight   * (v_A + v_B) / 2  v = games the partners have already
+                                          played together, relative to the
+                                          pool's most frequent pair
+    + repeat_partner_penalty per team that already partnered this rotation
+
+and a round's penalty is the sum over its courts, plus repeat_bye_penalty for
+every earlier round each sitting-out player already sat out.
+
+Ranking is done on whole batches of lineups with NumPy:
+
+- Exhaustive (up to MAX_EXHAUSTIVE_POOL players and MAX_EXHAUSTIVE_PREFIXES
+  prefixes, which covers 16 players on 4 courts, and only when its estimated
+  cost fits time_budget_ms, see _choose_method): every 4-player
+  group is scored once in its best team split, then seatings are enumerated
+  as prefix (who sits out + all but the last two courts) x tail (the last
+  two courts). The top-k tails of every leftover set are tabulated once, so
+  a 16-player pool ranks all 2.6M seatings with ~75k prefix sums.
+- Local search (larger pools): restarts from random seatings and takes the
+  best of all seat swaps, evaluated as one batch per step, until the time
+  budget runs out.
+
+A rotation of several rounds extends each of the best first rounds greedily,
+ranking every later round with the partners and byes so far.
+"""
+
+# --- Config knobs ---
+
+BALANCE_WEIGHT = 1.0
+CHEMISTRY_WEIGHT = 7.0         # ≈ swing in |2E - 1| per point-share unit in a game to 11
+VARIETY_WEIGHT = 0.2
+REPEAT_PARTNER_PENALTY = 1.0
+REPEAT_BYE_PENALTY = 2.0
+MAX_EXHAUSTIVE_PREFIXES = 500_000
+MAX_EXHAUSTIVE_POOL = 20       # group penalties are looked up in a 2**n table
+DEFAULT_TIME_BUDGET_MS = 250
+# Cost of exhaustive ranking per unit of work (see _exhaustive_cost_ms), with
+# the seating tables still to build: 16 players on 4 courts ~55 ms, 20
+# players on 2 courts ~1.1 s
+EXHAUSTIVE_NS_PER_UNIT = 250
+# Share of that cost left for each later round of a rotation, which ranks a
+# single lineup on the cached tables (16 players on 4 courts ~4 ms)
+EXHAUSTIVE_WARM_SHARE = 0.05
+
+# Team splits of a sorted 4-player group: (a1, a2, b1, b2) positions
+_SPLITS = np.array([[0, 1, 2, 3], [0, 2, 1, 3], [0, 3, 1, 2]])
+
+
+@dataclass(frozen=True)
+class MatchmakingConfig:
+    balance_weight: float = BALANCE_WEIGHT
+    chemistry_weight: float = CHEMISTRY_WEIGHT
+    variety_weight: float = VARIETY_WEIGHT
+    repeat_partner_penalty: float = REPEAT_PARTNER_PENALTY
+    repeat_bye_penalty: float = REPEAT_BYE_PENALTY
+
+DEFAULT_CONFIG = MatchmakingConfig()
+
+
+class MatchmakingIn(BaseModel):
+    player_ids: List[int]
+    courts: Optional[int] = Field(None, ge=1)  # default: as many as the pool fills
+    rounds: int = Field(1, ge=1, le=12)          # > 1 builds a rotation
+    suggestions: int = Field(5, ge=1, le=20)
+    time_budget_ms: int = Field(DEFAULT_TIME_BUDGET_MS, ge=10, le=5000)
+
+
+class MatchmakingError(ValueError):
+    pass
+
+
+# ---------- Pool ----------
+
+@dataclass
+class _Pool:
+    """Everything the penalty needs, indexed by position in player_ids."""
+    player_ids: List[int]
+    ratings: np.ndarray     # (n,)
+    chemistry: np.ndarray   # (n, n) beta_chemistry, 0 for pairs without a row
+    variety: np.ndarray     # (n, n) games_together / most games of any pool pair
+    config: MatchmakingConfig
+    partnered: np.ndarray = field(init=False)  # (n, n) times partnered this rotation
+    sat_out: np.ndarray = field(init=False)    # (n,) byes this rotation
+
+    def __post_init__(self):
+        n = len(self.player_ids)
+        self.partnered = np.zeros((n, n))
+        self.sat_out = np.zeros(n)
+
+    def expected(self, a1, a2, b1, b2) -> np.ndarray:
+        # Team ratings are player averages, as in elo.apply_doubles
+        r = self.ratings
+        return elo.expected((r[a1] + r[a2]) / 2.0, (r[b1] + r[b2]) / 2.0)
+
+    def court_penalty(self, a1, a2, b1, b2) -> np.ndarray:
+        cfg = self.config
+        return (
+            cfg.balance_weight * np.abs(2.0 * self.expected(a1, a2, b1, b2) - 1.0)
+            + cfg.chemistry_weight * np.abs(self.chemistry[a1, a2] - self.chemistry[b1, b2])
+            + cfg.variety_weight * (self.variety[a1, a2] + self.variety[b1, b2]) / 2.0
+            + cfg.repeat_partner_penalty * (self.partnered[a1, a2] + self.partnered[b1, b2])
+        )
+
+    def bye_penalty(self) -> np.ndarray:
+        return self.config.repeat_bye_penalty * self.sat_out
+
+    def record(self, courts, sitting_out) -> None:
+        for team_a, team_b in courts:
+            for i, j in (team_a, team_b):
+                self.partnered[i, j] += 1
+                self.partnered[j, i] += 1
+        self.sat_out[list(sitting_out)] += 1
+
+
+def load_pool(
+    session: Session,
+    player_ids: List[int],
+    config: MatchmakingConfig = DEFAULT_CONFIG,
+    league_id: int = DEFAULT_LEAGUE_ID,
+) -> _Pool:
+    players = {
+        p.id: p
+        for p in session.exec(
+            select(Player).where(Player.id.in_(player_ids), Player.league_id == league_id)
+        ).all()
+    }
+    missing = [pid for pid in player_ids if pid not in players]
+    if missing:
+        raise MatchmakingError(f"Some player_ids not found in league {league_id}: {missing}")
+
+    position = {pid: i for i, pid in enumerate(player_ids)}
+    n = len(player_ids)
+    chemistry = np.zeros((n, n))
+    games = np.zeros((n, n))
+    rows = session.exec(
+        select(PairChemistry).where(
+            PairChemistry.player_id_a.in_(player_ids),
+            PairChemistry.player_id_b.in_(player_ids),
+        )
+    ).all()
+    for pc in rows:
+        i, j = position[pc.player_id_a], position[pc.player_id_b]
+        chemistry[i, j] = chemistry[j, i] = pc.beta_chemistry
+        games[i, j] = games[j, i] = pc.games_together
+
+    return _Pool(
+        player_ids=list(player_ids),
+        ratings=np.array([players[pid].rating for pid in player_ids], dtype=float),
+        chemistry=chemistry,
+        variety=games / max(games.max(), 1.0),
+        config=config,
+    )
+
+
+# ---------- Exhaustive ranking ----------
+
+def _masks(positions: np.ndarray) -> np.ndarray:
+    """Bitmask of each row of positions (last axis)."""
+    return (np.int64(1) << positions).sum(axis=-1)
+
+
+def _bits(mask: int) -> List[int]:
+    return [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+def _groupings(m: int) -> np.ndarray:
+    """All ways to cut range(m) into m // 4 unordered groups of 4, (T, m // 4, 4)."""
+    def cut(rest):
+        if not rest:
+            yield []
+            return
+        for others in combinations(rest[1:], 3):
+            group = [rest[0], *others]
+            for tail in cut([p for p in rest if p not in group]):
+                yield [group] + tail
+    return np.array(list(cut(list(range(m)))), dtype=np.int64).reshape(-1, m // 4, 4)
+
+
+def _prefix_count(n: int, courts: int) -> int:
+    count, left = comb(n, n - 4 * courts), 4 * courts
+    for _ in range(courts - min(courts, 2)):
+        count *= comb(left - 1, 3)
+        left -= 4
+    return count
+
+
+@dataclass(frozen=True)
+class _Seatings:
+    """
+    Every seating of n positions on `courts` courts, as prefix x tail. Prefix
+    s sits out bye_sets[bye_index[s]] and fills the first courts with
+    prefix_groups[s]; the players it leaves over are tail set tail_index[s],
+    which can be grouped onto the last courts in tail_groups[tail_index[s]]
+    ways.
+    """
+    bye_sets: np.ndarray       # (B,)
+    bye_index: np.ndarray      # (S,)
+    prefix_groups: np.ndarray  # (S, courts - tail)
+    tail_index: np.ndarray     # (S,)
+    tail_groups: np.ndarray    # (U, T, tail)
+
+
+@lru_cache(maxsize=16)
+def _seatings(n: int, courts: int) -> _Seatings:
+    byes = n - 4 * courts
+    sitting = list(combinations(range(n), byes))
+    left = np.array(
+        [[p for p in range(n) if p not in row] for row in sitting], dtype=np.int64
+    )
+    bye_sets = _masks(np.array(sitting, dtype=np.int64).reshape(len(sitting), byes))
+    bye_index = np.arange(len(sitting))
+    groups = np.zeros((len(sitting), 0), dtype=np.int64)
+
+    # Prefix courts: the lowest seated-so-far player plus any 3 of the others
+    for _ in range(courts - min(courts, 2)):
+        S, r = left.shape
+        picks = np.array(list(combinations(range(1, r), 3)), dtype=np.int64)
+        rest = np.array(
+            [[i for i in range(1, r) if i not in pick] for pick in picks.tolist()], dtype=np.int64
+        ).reshape(len(picks), r - 4)
+        first = np.repeat(left[:, None, :1], len(picks), axis=1)
+        court = _masks(np.concatenate([first, left[:, picks]], axis=2)).reshape(-1, 1)
+        groups = np.concatenate([np.repeat(groups, len(picks), axis=0), court], axis=1)
+        bye_index = np.repeat(bye_index, len(picks))
+        left = left[:, rest].reshape(S * len(picks), r - 4)
+
+    _, first_row, tail_index = np.unique(_masks(left), return_index=True, return_inverse=True)
+    tail_groups = _masks(left[first_row][:, _groupings(left.shape[1])])
+    return _Seatings(bye_sets, bye_index, groups, tail_index.reshape(-1), tail_groups)
+
+
+def _group_table(pool: _Pool) -> Tuple[np.ndarray, Dict[int, Tuple[Tuple[int, int], Tuple[int, int]]]]:
+    """Penalty of every 4-player group in its best split, by bitmask, and that split."""
+    n = len(pool.player_ids)
+    members = np.array(list(combinations(range(n), 4)), dtype=np.int64)
+    seats = members[:, _SPLITS]  # (G, 3, 4)
+    penalty = pool.court_penalty(*(seats[..., k] for k in range(4)))
+    best = penalty.argmin(axis=1)
+
+    lut = np.full(1 << n, np.inf)
+    masks = _masks(members)
+    lut[masks] = penalty[np.arange(len(members)), best]
+    chosen = seats[np.arange(len(members)), best]
+    splits = {
+        int(mask): ((int(s[0]), int(s[1])), (int(s[2]), int(s[3])))
+        for mask, s in zip(masks, chosen)
+    }
+    return lut, splits
+
+
+def _rank_exhaustive(pool: _Pool, courts: int, k: int):
+    n = len(pool.player_ids)
+    seatings = _seatings(n, courts)
+    lut, splits = _group_table(pool)
+
+    # Best k ways to fill the last courts, per leftover set
+    tail_penalty = lut[seatings.tail_groups].sum(axis=2)  # (U, T)
+    kt = min(k, tail_penalty.shape[1])
+    top_tail = np.argsort(tail_penalty, axis=1)[:, :kt]
+    top_tail_penalty = np.take_along_axis(tail_penalty, top_tail, axis=1)
+
+    prefix_penalty = lut[seatings.prefix_groups].sum(axis=1)
+    if n > 4 * courts:
+        bits = (seatings.bye_sets[:, None] >> np.arange(n)) & 1
+        prefix_penalty = prefix_penalty + (bits @ pool.bye_penalty())[seatings.bye_index]
+
+    total = (prefix_penalty[:, None] + top_tail_penalty[seatings.tail_index]).ravel()
+    k = min(k, len(total))
+    best = np.argpartition(total, k - 1)[:k]
+    best = best[np.argsort(total[best], kind="stable")]
+
+    lineups = []
+    for flat in best:
+        s, t = divmod(int(flat), kt)
+        group_masks = [
+            *seatings.prefix_groups[s].tolist(),
+            *seatings.tail_groups[seatings.tail_index[s], top_tail[seatings.tail_index[s], t]].tolist(),
+        ]
+        lineups.append(
+            (
+                float(total[flat]),
+                [splits[g] for g in group_masks],
+                _bits(int(seatings.bye_sets[seatings.bye_index[s]])),
+            )
+        )
+    evaluated = len(seatings.bye_index) * seatings.tail_groups.shape[1]
+    return lineups, evaluated
+
+
+# ---------- Local search ----------
+
+def _rank_local_search(pool: _Pool, courts: int, k: int, budget_s: float, seed: int = 0):
+    """
+    Seats are a permutation of the pool: seats[4c:4c+4] is court c as
+    (a1, a2, b1, b2), the tail sits out. Each step scores every swap of two
+    seats in one batch and takes the best; local optima are collected until
+    the budget is spent.
+    """
+    n = len(pool.player_ids)
+    seated = 4 * courts
+    bye_penalty = pool.bye_penalty()
+
+    def penalty(batch: np.ndarray) -> np.ndarray:
+        t = batch[:, :seated].reshape(len(batch), courts, 4)
+        total = pool.court_penalty(t[..., 0], t[..., 1], t[..., 2], t[..., 3]).sum(axis=1)
+        return total + bye_penalty[batch[:, seated:]].sum(axis=1)
+
+    i, j = np.triu_indices(n, k=1)
+    useful = (j < seated) & (i // 2 != j // 2) | (i < seated) & (j >= seated)
+    i, j = i[useful], j[useful]
+    rows = np.arange(len(i))
+
+    rng = np.random.default_rng(seed)
+    deadline = time.perf_counter() + budget_s
+    found: Dict[tuple, tuple] = {}
+    evaluated = 0
+    while True:
+        seats = rng.permutation(n)
+        current = float(penalty(seats[None])[0])
+        while True:
+            candidates = np.tile(seats, (len(i), 1))
+            candidates[rows, i] = seats[j]
+            candidates[rows, j] = seats[i]
+            scores = penalty(candidates)
+            evaluated += len(candidates)
+            b = int(scores.argmin())
+            if scores[b] >= current - 1e-12:
+                break
+            seats, current = candidates[b], float(scores[b])
+
+        court_list = [
+            ((int(seats[c]), int(seats[c + 1])), (int(seats[c + 2]), int(seats[c + 3])))
+            for c in range(0, seated, 4)
+        ]
+        sitting_out = sorted(int(p) for p in seats[seated:])
+        key = (
+            tuple(sorted(tuple(sorted((tuple(sorted(a)), tuple(sorted(b))))) for a, b in court_list)),
+            tuple(sitting_out),
+        )
+        found[key] = (current, court_list, sitting_out)
+        if time.perf_counter() >= deadline:
+            break
+
+    return sorted(found.values(), key=lambda lineup: lineup[0])[:k], evaluated
+
+
+# ---------- Suggestions ----------
+
+def _exhaustive_cost_ms(n: int, courts: int) -> float:
+    """
+    Rough cost of a first _rank_exhaustive call: its work is about the
+    prefixes plus every grouping of every leftover set (at most C(n, 8) sets
+    of 35 groupings for two tail courts) plus the 4-player group table.
+    """
+    tail = min(courts, 2)
+    units = _prefix_count(n, courts) + comb(n, 4 * tail) * (comb(7, 3) if tail == 2 else 1) + comb(n, 4)
+    return units * EXHAUSTIVE_NS_PER_UNIT / 1e6
+
+
+def _choose_method(n: int, courts: int, searches: int, budget_ms: float) -> str:
+    """
+    Exhaustive when the pool is small enough and `searches` rankings of it
+    (the first cold, the rest on cached tables) fit the budget; local
+    search, which stops on its own deadline, otherwise.
+    """
+    if n > MAX_EXHAUSTIVE_POOL or _prefix_count(n, courts) > MAX_EXHAUSTIVE_PREFIXES:
+        return "local_search"
+    cost_ms = _exhaustive_cost_ms(n, courts) * (1.0 + EXHAUSTIVE_WARM_SHARE * (searches - 1))
+    return "exhaustive" if cost_ms <= budget_ms else "local_search"
+
+
+def _rank(pool: _Pool, courts: int, k: int, method: str, budget_s: float):
+    if method == "exhaustive":
+        return _rank_exhaustive(pool, courts, k)
+    return _rank_local_search(pool, courts, k, budget_s)
+
+
+def _describe_round(pool: _Pool, penalty: float, court_list, sitting_out) -> dict:
+    ids = pool.player_ids
+    courts = []
+    for (a1, a2), (b1, b2) in court_list:
+        courts.append(
+            {
+                "team_a": [ids[a1], ids[a2]],
+                "team_b": [ids[b1], ids[b2]],
+                "expected_a": float(pool.expected(a1, a2, b1, b2)),
+                "chemistry_a": float(pool.chemistry[a1, a2]),
+                "chemistry_b": float(pool.chemistry[b1, b2]),
+                "penalty": float(pool.court_penalty(a1, a2, b1, b2)),
+            }
+        )
+    return {
+        "penalty": penalty,
+        "courts": courts,
+        "sitting_out": [ids[p] for p in sitting_out],
+    }
+
+
+def suggest_lineups(
+    session: Session,
+    request: MatchmakingIn,
+    config: MatchmakingConfig = DEFAULT_CONFIG,
+    league_id: int = DEFAULT_LEAGUE_ID,
+) -> dict:
+    """
+    The `suggestions` best lineups for the pool (players of league_id),
+    best first. With rounds > 1 each is a rotation grown greedily from one
+    of the best first rounds. time_budget_ms bounds the whole request:
+    exhaustive ranking is only used when its estimated cost fits, and the
+    local search shares the budget across its runs.
+    """
+    started = time.perf_counter()
+    player_ids = request.player_ids
+    if len(set(player_ids)) != len(player_ids):
+        raise MatchmakingError("player_ids contains duplicates.")
+    if len(player_ids) < 4:
+        raise MatchmakingError("Need at least 4 players for a doubles match.")
+    courts = request.courts or len(player_ids) // 4
+    if 4 * courts > len(player_ids):
+        raise MatchmakingError(f"Not enough players for {courts} court(s).")
+
+    pool = load_pool(session, player_ids, config, league_id)
+    searches = 1 + request.suggestions * (request.rounds - 1)
+    budget_s = request.time_budget_ms / 1000.0 / searches
+    method = _choose_method(len(player_ids), courts, searches, request.time_budget_ms)
+
+    first_rounds, evaluated = _rank(pool, courts, request.suggestions, method, budget_s)
+
+    lineups = []
+    for penalty, court_list, sitting_out in first_rounds:
+        rotation = _Pool(pool.player_ids, pool.ratings, pool.chemistry, pool.variety, config)
+        rounds = [_describe_round(rotation, penalty, court_list, sitting_out)]
+        rotation.record(court_list, sitting_out)
+        for _ in range(request.rounds - 1):
+            (next_round,), more = _rank(rotation, courts, 1, method, budget_s)
+            evaluated += more
+            rounds.append(_describe_round(rotation, *next_round))
+            rotation.record(next_round[1], next_round[2])
+        lineups.append({"penalty": sum(r["penalty"] for r in rounds), "rounds": rounds})
+
+    lineups.sort(key=lambda lineup: lineup["penalty"])
+    return {
+        "method": method,
+        "evaluated": evaluated,
+        "elapsed_ms": (time.perf_counter() - started) * 1000.0,
+        "lineups": lineups,
+    }
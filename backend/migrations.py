@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+from typing import Callable, List, Sequence, Tuple
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import select, update
+from models import (
+    DEFAULT_LEAGUE_ID,
+    ChemistryState,
+    DataVersion,
+    League,
+    Match,
+    MatchPlayer,
+    PairChemistry,
+    Player,
+    RatingCheckpoint,
+    Reign,
+    SchemaVersion,
+)
+
+"""
+Versioned schema migrations.
+
+SQLModel.metadata.create_all only creates missing tables; it never adds a
+column or an index to a table that already exists. Changes to existing
+tables therefore go here, as numbered steps that migrate() applies in order
+at startup (main.init_db). SchemaVersion holds the last step applied, and
+each step commits together with its version bump.
+
+Steps are idempotent (IF NOT EXISTS, or checked against the live schema), so
+a database that create_all has just built passes through them harmlessly.
+
+To change the schema, append a Migration with the next version. Never edit,
+renumber or remove one that has shipped.
+"""
+
+SCHEMA = "pickle_elo"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def add_columns(table: str, columns: Sequence[Tuple[str, str]]) -> Callable[[Connection], None]:
+    """Step adding (name, SQL type) columns to table; existing ones are skipped."""
+    def apply(conn: Connection) -> None:
+        existing = {c["name"] for c in inspect(conn).get_columns(table, schema=SCHEMA)}
+        for name, sql_type in columns:
+            if name not in existing:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {SCHEMA}.{_quote(conn, table)} ADD COLUMN {_quote(conn, name)} {sql_type}"
+                )
+    return apply
+
+
+def create_index(name: str, table: str, columns: Sequence[str]) -> Callable[[Connection], None]:
+    """Step creating a (composite) index unless it already exists."""
+    def apply(conn: Connection) -> None:
+        column_list = ", ".join(_quote(conn, c) for c in columns)
+        if conn.dialect.name == "sqlite":
+            # SQLite qualifies the index name; the table must be in the same schema
+            target = f"{SCHEMA}.{name} ON {_quote(conn, table)}"
+        else:
+            target = f"{name} ON {SCHEMA}.{_quote(conn, table)}"
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {target} ({column_list})")
+    return apply
+
+
+def drop_index(name: str) -> Callable[[Connection], None]:
+    """Step dropping an index if it exists."""
+    def apply(conn: Connection) -> None:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {SCHEMA}.{name}")
+    return apply
+
+
+def _ensure_default_league(conn: Connection) -> None:
+    if conn.execute(select(League.id).where(League.id == DEFAULT_LEAGUE_ID)).first() is not None:
+        return
+    conn.execute(League.__table__.insert().values(id=DEFAULT_LEAGUE_ID, name="Main league"))
+    if conn.dialect.name == "postgresql":
+        # An explicit id doesn't advance the serial sequence
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{SCHEMA}.league', 'id'), "
+            f"(SELECT max(id) FROM {SCHEMA}.league))"
+        )
+
+
+def _copy_match_played_at(conn: Connection) -> None:
+    conn.execute(
+        update(MatchPlayer)
+        .where(MatchPlayer.played_at == None)  # noqa: E711
+        .values(
+            played_at=select(Match.played_at).where(Match.id == MatchPlayer.match_id).scalar_subquery()
+        )
+    )
+
+
+def _steps(*steps: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for step in steps:
+            step(conn)
+    return apply
+
+
+_MATCH = Match.__tablename__
+_MATCH_PLAYER = MatchPlayer.__tablename__
+_CHECKPOINT = RatingCheckpoint.__tablename__
+_LEAGUE_COLUMN = [("league_id", f"INTEGER NOT NULL DEFAULT {DEFAULT_LEAGUE_ID}")]
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "pair_chemistry standard errors and intervals",
+        add_columns(PairChemistry.__tablename__, [
+            ("beta_se", "FLOAT"),
+            ("beta_ci_low", "FLOAT"),
+            ("beta_ci_high", "FLOAT"),
+            ("beta_boot_ci_low", "FLOAT"),
+            ("beta_boot_ci_high", "FLOAT"),
+        ]),
+    ),
+    Migration(
+        2,
+        "indexes for the match / match_player / rating_checkpoint hot paths",
+        _steps(
+            # Chronological order everywhere: replays, GET /matches and its
+            # cursor, the exports, the latest-match check
+            create_index("ix_match_played_at_id", _MATCH, ["played_at", "id"]),
+            # GET /matches?format= and the doubles-only chemistry reads
+            create_index("ix_match_format_played_at_id", _MATCH, ["format", "played_at", "id"]),
+            # A match's lineup, in id order (history joins, page players, edits)
+            create_index("ix_matchplayer_match_id_id", _MATCH_PLAYER, ["match_id", "id"]),
+            # A player's matches; covers GET /matches?player_id='s subquery
+            create_index("ix_matchplayer_player_id_match_id", _MATCH_PLAYER, ["player_id", "match_id"]),
+            # Nearest checkpoint before an edit
+            create_index("ix_ratingcheckpoint_played_at_match_id", _CHECKPOINT, ["played_at", "match_id"]),
+        ),
+    ),
+    Migration(
+        3,
+        "leagues: league_id on players, matches and derived tables",
+        _steps(
+            # Existing rows all land in the default league
+            _ensure_default_league,
+            add_columns(Player.__tablename__, _LEAGUE_COLUMN),
+            add_columns(_MATCH, _LEAGUE_COLUMN),
+            add_columns(_CHECKPOINT, _LEAGUE_COLUMN),
+            add_columns(Reign.__tablename__, _LEAGUE_COLUMN),
+            add_columns(PairChemistry.__tablename__, _LEAGUE_COLUMN),
+            create_index("ix_player_league_id", Player.__tablename__, ["league_id"]),
+            create_index("ix_match_league_id_played_at_id", _MATCH, ["league_id", "played_at", "id"]),
+            create_index(
+                "ix_match_league_id_format_played_at_id", _MATCH, ["league_id", "format", "played_at", "id"]
+            ),
+            create_index(
+                "ix_ratingcheckpoint_league_id_played_at_match_id",
+                _CHECKPOINT,
+                ["league_id", "played_at", "match_id"],
+            ),
+            create_index("ix_reign_league_id_end", Reign.__tablename__, ["league_id", "end"]),
+            create_index("ix_pairchemistry_league_id", PairChemistry.__tablename__, ["league_id"]),
+            # Every match and checkpoint read is scoped to a league now
+            drop_index("ix_match_played_at_id"),
+            drop_index("ix_match_format_played_at_id"),
+            drop_index("ix_ratingcheckpoint_played_at_match_id"),
+        ),
+    ),
+    Migration(
+        4,
+        "match_player.played_at for point-in-time ratings",
+        _steps(
+            add_columns(_MATCH_PLAYER, [("played_at", "TIMESTAMP")]),
+            _copy_match_played_at,
+            # A player's last rating_after at or before as_of: one seek
+            create_index(
+                "ix_matchplayer_player_id_played_at_match_id",
+                _MATCH_PLAYER,
+                ["player_id", "played_at", "match_id"],
+            ),
+        ),
+    ),
+    Migration(
+        5,
+        "data_version.history_version for the shared match history",
+        add_columns(DataVersion.__tablename__, [("history_version", "INTEGER NOT NULL DEFAULT 0")]),
+    ),
+    Migration(
+        6,
+        "chemistry_state.se_updated for throttled standard-error refreshes",
+        add_columns(ChemistryState.__tablename__, [("se_updated", "TIMESTAMP")]),
+    ),
+]
+
+
+def migrate(engine: Engine) -> int:
+    """Apply the pending MIGRATIONS in order; returns the schema version."""
+    with engine.begin() as conn:
+        version = conn.execute(select(SchemaVersion.version).where(SchemaVersion.id == 1)).scalar()
+        if version is None:
+            conn.execute(SchemaVersion.__table__.insert().values(id=1, version=0))
+            version = 0
+
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(
+                update(SchemaVersion)
+                .where(SchemaVersion.id == 1)
+                .values(version=migration.version)
+            )
+        version = migration.version
+    return version
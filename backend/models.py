@@ -2,9 +2,20 @@ from typing import Optional
 from datetime import datetime
 from sqlmodel import SQLModel, Field
 
+# Holds everything recorded before leagues existed
+DEFAULT_LEAGUE_ID = 1
+
+# A group of players (weekday league, weekend drop-in, ...) with its own
+# ratings, King/Queen and chemistry. Matches never cross leagues.
+class League(SQLModel, table=True):
+    __table_args__ = {"schema": "pickle_elo"}
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+
 class Player(SQLModel, table=True):
     __table_args__ = {"schema": "pickle_elo"}
     id: Optional[int] = Field(default=None, primary_key=True)
+    league_id: int = Field(default=DEFAULT_LEAGUE_ID, foreign_key="pickle_elo.league.id")
     name: str
     rating: int = 1000  # starting Elo
     crowns_collected: int = Field(default=0)
@@ -12,6 +23,7 @@ class Player(SQLModel, table=True):
 class Match(SQLModel, table=True):
     __table_args__ = {"schema": "pickle_elo"}
     id: Optional[int] = Field(default=None, primary_key=True)
+    league_id: int = Field(default=DEFAULT_LEAGUE_ID, foreign_key="pickle_elo.league.id")
     format: str  # "singles" | "doubles"
     scoreA: int
     scoreB: int
@@ -30,17 +42,34 @@ class MatchPlayer(SQLModel, table=True):
     rating_before: int
     rating_after: int
 
+    # Copied from Match so a player's rating history can be searched by
+    # time (GET /players?as_of=). Never changes after insert.
+    played_at: datetime
+
 class PairChemistry(SQLModel, table=True):
     __table_args__ = {"schema": "pickle_elo"}
 
     # Composite primary key
     player_id_a: int = Field(primary_key=True)
     player_id_b: int = Field(primary_key=True)
+    # Both players' league
+    league_id: int = DEFAULT_LEAGUE_ID
 
     games_together: int
 
     beta_chemistry: float
     beta_t_stat: Optional[float] = None
+    # Standard error and CHEMISTRY_CI_LEVEL interval of beta_chemistry
+    # (chemistry_service.refresh_pair_uncertainty). Refreshed at most every
+    # CHEMISTRY_SE_REFRESH_SECONDS; refits in between recentre the interval
+    # on the new beta. NULL until the pair's first refresh
+    beta_se: Optional[float] = None
+    beta_ci_low: Optional[float] = None
+    beta_ci_high: Optional[float] = None
+    # Percentile bootstrap interval; only set once bootstrap_pair_intervals
+    # has run, and carried over between refits
+    beta_boot_ci_low: Optional[float] = None
+    beta_boot_ci_high: Optional[float] = None
 
     uplift_a_given_b: float
     uplift_b_given_a: float
@@ -50,4 +79,83 @@ class PairChemistry(SQLModel, table=True):
 
     # This matches TIMESTAMPTZ with DEFAULT now()
     # You can supply it yourself or let DB default handle it.
-    last_updated: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    last_updated: datetime = Field(default_factory=datetime.utcnow)
+
+# Every player's rating right after match_id was replayed. Written every
+# CHECKPOINT_INTERVAL matches so edits can resume the Elo replay from the
+# nearest snapshot instead of from BASE_RATING.
+class RatingCheckpoint(SQLModel, table=True):
+    __table_args__ = {"schema": "pickle_elo"}
+
+    match_id: int = Field(primary_key=True)
+    player_id: int = Field(primary_key=True)
+
+    # Copied from Match so a league's checkpoints can be ordered on
+    # (played_at, match_id)
+    league_id: int = DEFAULT_LEAGUE_ID
+    played_at: datetime
+    rating: int
+
+# Cached weighted normal-equation statistics of the chemistry regression
+# (see chemistry_service.NormalEquationStats), numpy-serialized. One row per
+# league, keyed by the league id.
+class ChemistryState(SQLModel, table=True):
+    __table_args__ = {"schema": "pickle_elo"}
+
+    id: int = Field(default=DEFAULT_LEAGUE_ID, primary_key=True)
+    n_rows: int  # doubles matches folded into the statistics
+    payload: bytes
+    last_updated: datetime = Field(default_factory=datetime.utcnow)
+    # Last chemistry_service.refresh_pair_uncertainty run; NULL if none yet
+    se_updated: Optional[datetime] = None
+
+# King/Queen reign timeline of each league, maintained by
+# main.recompute_crowns_and_king (full rebuild) and main._advance_reigns
+# (append-only). end is NULL for the reign in progress.
+class Reign(SQLModel, table=True):
+    __table_args__ = {"schema": "pickle_elo"}
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    league_id: int = Field(default=DEFAULT_LEAGUE_ID, foreign_key="pickle_elo.league.id")
+    king_id: int = Field(foreign_key="pickle_elo.player.id")
+    start: datetime = Field(index=True)
+    end: Optional[datetime] = Field(default=None, index=True)
+    # Closed reigns of CROWN_MIN_DAYS or more count towards crowns_collected
+    earned_crown: bool = False
+
+# Running per-player totals behind the profile stats (see
+# player_stats.PlayerCounters). Bumped by create_match, rebuilt by
+# main.recompute_all_ratings. No row means the player has no matches yet.
+class PlayerStats(SQLModel, table=True):
+    __table_args__ = {"schema": "pickle_elo"}
+
+    player_id: int = Field(primary_key=True, foreign_key="pickle_elo.player.id")
+    wins: int = 0
+    losses: int = 0
+    wins_singles: int = 0
+    losses_singles: int = 0
+    wins_doubles: int = 0
+    losses_doubles: int = 0
+    total_winners: int = 0
+    total_errors: int = 0
+    team_points_won: int = 0
+    team_points_lost: int = 0
+
+# Per-league data version behind the API's ETags (see data_version.py).
+# Bumped with every player / match write and every derived-data refresh of
+# the league. One row per league, keyed by the league id.
+class DataVersion(SQLModel, table=True):
+    __table_args__ = {"schema": "pickle_elo"}
+
+    id: int = Field(default=DEFAULT_LEAGUE_ID, primary_key=True)
+    version: int = 0
+    # Bumped only by writes to the league's match history; keys the
+    # in-memory history.MatchHistoryStore across workers
+    history_version: int = 0
+
+# Last migrations.MIGRATIONS step applied to this database. Single row.
+class SchemaVersion(SQLModel, table=True):
+    __table_args__ = {"schema": "pickle_elo"}
+
+    id: int = Field(default=1, primary_key=True)
+    version: int = 0
@@ -0,0 +1,340 @@
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional
+from sqlmodel import Session, select, delete, func, case, and_
+from models import Match, MatchPlayer, Player, PlayerStats
+
+
+# ---------- Running counters ----------
+
+def is_win(mp: MatchPlayer, m: Match) -> bool:
+    return (
+        (mp.team_side == "A" and m.scoreA > m.scoreB)
+        or (mp.team_side == "B" and m.scoreB > m.scoreA)
+    )
+
+
+@dataclass
+class PlayerCounters:
+    """
+    Additive per-player totals. Everything on the profile (win rates, CI, LI,
+    archetypes) is derived from these, so they can be summed in SQL or
+    accumulated one match at a time.
+
+    team_points_won / team_points_lost are the scoreboard points of the
+    player's side, used as the denominator for CI / LI.
+    """
+    wins: int = 0
+    losses: int = 0
+    wins_singles: int = 0
+    losses_singles: int = 0
+    wins_doubles: int = 0
+    losses_doubles: int = 0
+    total_winners: int = 0
+    total_errors: int = 0
+    team_points_won: int = 0
+    team_points_lost: int = 0
+
+    def add(self, mp: MatchPlayer, m: Match) -> bool:
+        """Fold one MatchPlayer ⋈ Match row in. Returns True if it was a win."""
+        won = is_win(mp, m)
+
+        # Overall W/L
+        if won:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+        # By format
+        if m.format == "singles":
+            if won:
+                self.wins_singles += 1
+            else:
+                self.losses_singles += 1
+        elif m.format == "doubles":
+            if won:
+                self.wins_doubles += 1
+            else:
+                self.losses_doubles += 1
+
+        # Player totals
+        self.total_winners += mp.winners
+        self.total_errors += mp.errors
+
+        # --- Team points for CI/LI ---
+        # winners = points won, errors = points lost, so the scoreboard
+        # works as team points.
+        if mp.team_side == "A":
+            self.team_points_won += m.scoreA
+            self.team_points_lost += m.scoreB
+        else:
+            self.team_points_won += m.scoreB
+            self.team_points_lost += m.scoreA
+
+        return won
+
+
+def load_all_player_counters(session: Session, league_id: Optional[int] = None) -> Dict[int, PlayerCounters]:
+    """
+    PlayerCounters for every player that has played (in league_id, if
+    given), from one grouped query.
+    """
+    is_win = case(
+        (and_(MatchPlayer.team_side == "A", Match.scoreA > Match.scoreB), 1),
+        (and_(MatchPlayer.team_side == "B", Match.scoreB > Match.scoreA), 1),
+        else_=0,
+    )
+    is_loss = 1 - is_win
+    is_singles = case((Match.format == "singles", 1), else_=0)
+    is_doubles = case((Match.format == "doubles", 1), else_=0)
+    side_a = MatchPlayer.team_side == "A"
+
+    stmt = (
+        select(
+            MatchPlayer.player_id,
+            func.sum(is_win),
+            func.sum(is_loss),
+            func.sum(is_win * is_singles),
+            func.sum(is_loss * is_singles),
+            func.sum(is_win * is_doubles),
+            func.sum(is_loss * is_doubles),
+            func.sum(MatchPlayer.winners),
+            func.sum(MatchPlayer.errors),
+            func.sum(case((side_a, Match.scoreA), else_=Match.scoreB)),
+            func.sum(case((side_a, Match.scoreB), else_=Match.scoreA)),
+        )
+        .join(Match, Match.id == MatchPlayer.match_id)
+        .group_by(MatchPlayer.player_id)
+    )
+    if league_id is not None:
+        stmt = stmt.where(Match.league_id == league_id)
+
+    counters: Dict[int, PlayerCounters] = {}
+    for player_id, *totals in session.exec(stmt).all():
+        counters[player_id] = PlayerCounters(*(int(t or 0) for t in totals))
+    return counters
+
+
+# ---------- Materialized PlayerStats ----------
+
+COUNTER_FIELDS = [f.name for f in fields(PlayerCounters)]
+
+
+def counters_from_row(row: Optional[PlayerStats]) -> PlayerCounters:
+    if row is None:
+        return PlayerCounters()
+    return PlayerCounters(**{name: getattr(row, name) for name in COUNTER_FIELDS})
+
+
+def load_stored_counters(session: Session, league_id: Optional[int] = None) -> Dict[int, PlayerCounters]:
+    """PlayerCounters for every player (of league_id, if given) with a PlayerStats row."""
+    stmt = select(PlayerStats)
+    if league_id is not None:
+        stmt = stmt.join(Player, Player.id == PlayerStats.player_id).where(Player.league_id == league_id)
+    return {row.player_id: counters_from_row(row) for row in session.exec(stmt).all()}
+
+
+def insert_for(session: Session):
+    """The dialect's insert(), which has on_conflict_do_update()."""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def add_match_to_stats(session: Session, m: Match, mp_rows: List[MatchPlayer]) -> None:
+    """
+    Fold a newly created match into PlayerStats, in the caller's transaction.
+    Each player's row is bumped with one atomic upsert (col = col + delta),
+    so concurrent match writes don't lose updates.
+    """
+    deltas: Dict[int, PlayerCounters] = {}
+    for mp in mp_rows:
+        deltas.setdefault(mp.player_id, PlayerCounters()).add(mp, m)
+    if not deltas:
+        return
+
+    insert = insert_for(session)
+    stmt = insert(PlayerStats).values(
+        [{"player_id": pid, **asdict(c)} for pid, c in deltas.items()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PlayerStats.player_id],
+        set_={
+            name: getattr(PlayerStats, name) + getattr(stmt.excluded, name)
+            for name in COUNTER_FIELDS
+        },
+    )
+    session.exec(stmt)
+
+
+def rebuild_player_stats(session: Session, league_id: Optional[int] = None) -> None:
+    """
+    Replace PlayerStats with totals aggregated from the full history (after
+    edits, deletes and imports), only for league_id's players if given.
+    Does not commit.
+    """
+    stale = delete(PlayerStats)
+    if league_id is not None:
+        stale = stale.where(
+            PlayerStats.player_id.in_(select(Player.id).where(Player.league_id == league_id))
+        )
+    session.exec(stale)
+    session.add_all(
+        PlayerStats(player_id=pid, **asdict(c))
+        for pid, c in load_all_player_counters(session, league_id).items()
+    )
+
+
+# ---------- Derived stats ----------
+
+def classify_archetypes(
+    total_matches: int,
+    avg_winners_per_match: float,
+    avg_errors_per_match: float,
+    net_winners_per_match: float,
+    win_rate: float,
+    ci: float,
+    li: float,
+    singles_games: int,
+    doubles_games: int,
+    singles_win_rate: float,
+    doubles_win_rate: float,
+) -> List[str]:
+    """
+    Fun archetype labels; players need at least 5 matches to get any.
+    """
+    archetypes: List[str] = []
+
+    if total_matches < 5:
+        return archetypes
+
+    # OFFENSE
+    if 2.0 < net_winners_per_match >= 5.0 and ci >= 0.55:
+        archetypes.append("Playmaker")
+    if avg_winners_per_match >= 5.0 and ci >= 0.6:
+        archetypes.append("Savage Attacker")
+    if ci >= 0.65 and win_rate >= 0.55:
+        archetypes.append("Team Carry")
+
+    # DEFENSE
+    if 0.7 < avg_errors_per_match <= 1.0 and li <= 0.35 and win_rate >= 0.5:
+        archetypes.append("Reliable Defender")
+    if avg_errors_per_match <= 0.7 and li <= 0.25 and win_rate >= 0.65:
+        archetypes.append("The Wall")
+
+    # RISK / VARIANCE
+    if avg_winners_per_match >= 4.0 and avg_errors_per_match >= 3.0:
+        archetypes.append("Reckless Attacker")
+    if ci >= 0.55 and li >= 0.35:
+        archetypes.append("Wildcard")
+    if li >= 0.5 and win_rate <= 0.5:
+        archetypes.append("Team Liability")
+
+    # MENTALITY
+    if win_rate >= 0.65 and net_winners_per_match >= 1.5:
+        archetypes.append("Closer")
+    if -0.5 <= net_winners_per_match <= 0.5 and 0.45 <= win_rate <= 0.6:
+        archetypes.append("Team Player")
+
+    # FORMAT SPECIALIZATION (performance-based)
+    if singles_games >= 3 and singles_win_rate >= 0.6 and \
+       singles_win_rate >= doubles_win_rate + 0.10:
+        archetypes.append("Singles Specialist")
+
+    if doubles_games >= 3 and doubles_win_rate >= 0.6 and \
+       doubles_win_rate >= singles_win_rate + 0.10:
+        archetypes.append("Doubles Specialist")
+
+    if singles_games >= 3 and doubles_games >= 3 and \
+       singles_win_rate >= 0.55 and doubles_win_rate >= 0.55 and \
+       abs(singles_win_rate - doubles_win_rate) <= 0.10:
+        archetypes.append("Versatile")
+
+    return archetypes
+
+
+def derive_player_stats(c: PlayerCounters) -> dict:
+    """
+    Build the "stats" block served on the player profile from raw counters:
+    W/L, per-match averages, win rates, CI, LI and archetypes.
+    """
+    total_matches = c.wins + c.losses
+    net_winners = c.total_winners - c.total_errors
+
+    avg_winners_per_match = (
+        c.total_winners / total_matches if total_matches > 0 else 0.0
+    )
+    avg_errors_per_match = (
+        c.total_errors / total_matches if total_matches > 0 else 0.0
+    )
+
+    win_rate = c.wins / total_matches if total_matches > 0 else 0.0
+    net_winners_per_match = (
+        net_winners / total_matches if total_matches > 0 else 0.0
+    )
+
+    singles_games = c.wins_singles + c.losses_singles
+    doubles_games = c.wins_doubles + c.losses_doubles
+
+    singles_win_rate = (
+        c.wins_singles / singles_games if singles_games > 0 else 0.0
+    )
+    doubles_win_rate = (
+        c.wins_doubles / doubles_games if doubles_games > 0 else 0.0
+    )
+
+    # --- CI & LI ---
+    # Share of team winners / errors (using team points as proxy)
+    winner_share = (
+        c.total_winners / c.team_points_won
+        if c.team_points_won > 0 else 0.0
+    )
+    error_share = (
+        c.total_errors / c.team_points_lost
+        if c.team_points_lost > 0 else 0.0
+    )
+
+    # Normalize net_winners_per_match to roughly [0,1]
+    # Assume typical range is about -4 to +4 net winners per match.
+    raw_norm = (net_winners_per_match + 4.0) / 8.0
+    norm_net_winners = max(0.0, min(1.0, raw_norm))
+
+    ci = 0.6 * winner_share + 0.4 * norm_net_winners
+    li = error_share
+
+    archetypes = classify_archetypes(
+        total_matches=total_matches,
+        avg_winners_per_match=avg_winners_per_match,
+        avg_errors_per_match=avg_errors_per_match,
+        net_winners_per_match=net_winners_per_match,
+        win_rate=win_rate,
+        ci=ci,
+        li=li,
+        singles_games=singles_games,
+        doubles_games=doubles_games,
+        singles_win_rate=singles_win_rate,
+        doubles_win_rate=doubles_win_rate,
+    )
+
+    return {
+        "wins": c.wins,
+        "losses": c.losses,
+        "total_matches": total_matches,
+        "wins_singles": c.wins_singles,
+        "losses_singles": c.losses_singles,
+        "wins_doubles": c.wins_doubles,
+        "losses_doubles": c.losses_doubles,
+        "total_winners": c.total_winners,
+        "total_errors": c.total_errors,
+        "net_winners": net_winners,
+        "avg_winners_per_match": avg_winners_per_match,
+        "avg_errors_per_match": avg_errors_per_match,
+        "win_rate": win_rate,
+        "net_winners_per_match": net_winners_per_match,
+        "singles_win_rate": singles_win_rate,
+        "doubles_win_rate": doubles_win_rate,
+        "ci": ci,
+        "li": li,
+        "archetypes": archetypes,
+    }
@@ -20,6 +20,12 @@ type ChemistryEdge = {
   uplift_b: number;
   point_share: number;
   expected_point_share: number;
+  se: number | null;
+  t_stat: number | null;
+  ci_low: number | null;
+  ci_high: number | null;
+  boot_ci_low: number | null;
+  boot_ci_high: number | null;
 };
 
 type ChemistryResponse = {
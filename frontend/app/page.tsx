@@ -4,10 +4,10 @@ import CrownedComponent from '@/app/components/CrownedComponent';
 import RecentMatchComponent from '@/app/components/RecentMatchComponent';
 
 export default async function LandingPage() {
-  const [kingData, players, matches] = await Promise.all([
+  const [kingData, players, matchPage] = await Promise.all([
     fetchKing(),
     fetchPlayers(),
-    fetchMatches(),
+    fetchMatches({ limit: 5, count: true }),
   ]);
 
   // Sort all players by rating (highest first)
@@ -24,10 +24,10 @@ export default async function LandingPage() {
   // Take the next two players in the ladder (true #2 and #3)
   const topTwo = nonKingPlayers.slice(0, 2);
 
-  const recentMatches = matches.slice(0, 5);
+  const recentMatches = matchPage.matches;
 
   const totalPlayers = players.length;
-  const totalMatches = matches.length;
+  const totalMatches = matchPage.total;
 
   return (
     <main className="min-h-screen" style={{ background: "transparent" }}>
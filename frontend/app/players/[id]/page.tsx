@@ -24,6 +24,11 @@ type Player = {
   crowns_collected?: number; // NEW: crowns collected from backend
 };
 
+type Standing = {
+  rank: number | null;
+  percentile: number | null;
+};
+
 type PlayerStats = {
   wins: number;
   losses: number;
@@ -205,6 +210,7 @@ export default function PlayerDetail({
 
   const [player, setPlayer] = useState<Player | null>(null);
   const [stats, setStats] = useState<PlayerStats | null>(null);
+  const [standing, setStanding] = useState<Standing | null>(null);
   const [matches, setMatches] = useState<MatchSummary[]>([]);
   const [ratingHistory, setRatingHistory] = useState<RatingPoint[]>([]);
   const [loading, setLoading] = useState(true);
@@ -216,6 +222,7 @@ export default function PlayerDetail({
       .then((data) => {
         setPlayer(data.player);
         setStats(data.stats);
+        setStanding({ rank: data.rank, percentile: data.percentile });
         setMatches(data.matches);
         setRatingHistory(data.rating_history);
       })
@@ -250,6 +257,13 @@ export default function PlayerDetail({
           Rating: <strong>{player.rating}</strong> ({title})
         </p>
 
+        {standing?.rank != null && standing.percentile != null && (
+          <p style={{ marginTop: "0.25rem", fontSize: "0.95rem" }}>
+            Rank <strong>#{standing.rank}</strong> · ahead of{" "}
+            {Math.round(standing.percentile)}% of players
+          </p>
+        )}
+
         {/* Crowns collected */}
         <p style={{ marginTop: "0.25rem", fontSize: "0.95rem" }}>
           👑 Crowns collected: <strong>{crowns}</strong>
@@ -22,6 +22,20 @@ type Player = {
   avg_errors_per_match?: number;
 };
 
+// Row of GET /players/summary (only the stats fields used here)
+type PlayerSummaryRow = {
+  player: Player;
+  stats: {
+    wins: number;
+    losses: number;
+    win_rate: number;
+    total_matches: number;
+    archetypes: string[];
+    avg_winners_per_match: number;
+    avg_errors_per_match: number;
+  };
+};
+
 type Reign = {
   king_id: number;
   king_name: string;
@@ -140,34 +154,20 @@ export default function PlayersPage() {
   async function fetchPlayers() {
     setLoading(true);
     try {
-      const res = await fetch(`${API_BASE}/players`);
-      const baseData: Player[] = await res.json();
-      baseData.sort((a, b) => b.rating - a.rating);
-
-      const enriched: Player[] = await Promise.all(
-        baseData.map(async (p) => {
-          try {
-            const detailRes = await fetch(`${API_BASE}/players/${p.id}`);
-            if (!detailRes.ok) return p;
-
-            const detail = await detailRes.json();
-            const stats = detail.stats || {};
-            return {
-              ...p,
-              crowns_collected: detail.player.crowns_collected,
-              wins: stats.wins,
-              losses: stats.losses,
-              win_rate: stats.win_rate,
-              games_played: stats.total_matches,
-              archetypes: stats.archetypes,
-              avg_winners_per_match: stats.avg_winners_per_match,
-              avg_errors_per_match: stats.avg_errors_per_match,
-            };
-          } catch {
-            return p;
-          }
-        })
-      );
+      const res = await fetch(`${API_BASE}/players/summary`);
+      const summaries: PlayerSummaryRow[] = await res.json();
+
+      const enriched: Player[] = summaries.map(({ player, stats }) => ({
+        ...player,
+        wins: stats.wins,
+        losses: stats.losses,
+        win_rate: stats.win_rate,
+        games_played: stats.total_matches,
+        archetypes: stats.archetypes,
+        avg_winners_per_match: stats.avg_winners_per_match,
+        avg_errors_per_match: stats.avg_errors_per_match,
+      }));
+      enriched.sort((a, b) => b.rating - a.rating);
 
       setPlayers(enriched);
     } finally {
@@ -37,23 +37,81 @@ export type MatchSummary = {
   players: MatchPlayer[];
 };
 
+type CachedResponse = { etag: string; body: unknown; headers: Headers };
+
+// Last response per URL. GETs revalidate it with If-None-Match, and the
+// backend answers 304 (no body) while its data version is unchanged.
+const responseCache = new Map<string, CachedResponse>();
+
+export async function fetchConditional<T>(
+  url: string,
+  errorMessage: string
+): Promise<{ data: T; headers: Headers }> {
+  const cached = responseCache.get(url);
+  const res = await fetch(url, {
+    cache: "no-store",
+    headers: cached ? { "If-None-Match": cached.etag } : undefined,
+  });
+
+  if (res.status === 304 && cached) {
+    return { data: cached.body as T, headers: cached.headers };
+  }
+  if (!res.ok) throw new Error(errorMessage);
+
+  const data: T = await res.json();
+  const etag = res.headers.get("ETag");
+  if (etag) responseCache.set(url, { etag, body: data, headers: res.headers });
+  return { data, headers: res.headers };
+}
+
 export async function fetchKing(): Promise<KingResponse> {
-  const res = await fetch(`${API_BASE}/king`, { cache: "no-store" });
-  if (!res.ok) throw new Error("Failed to load king");
-  const data = await res.json();
+  const { data } = await fetchConditional<{ king?: null } | null>(
+    `${API_BASE}/king`,
+    "Failed to load king"
+  );
   // backend returns { king: None } in one path, but currently it’s just { ... } or { "king": None }
   if (!data || data.king === null) return null;
   return data as KingResponse;
 }
 
 export async function fetchPlayers(): Promise<PlayerSummary[]> {
-  const res = await fetch(`${API_BASE}/players`, { cache: "no-store" });
-  if (!res.ok) throw new Error("Failed to load players");
-  return res.json();
+  const { data } = await fetchConditional<PlayerSummary[]>(
+    `${API_BASE}/players`,
+    "Failed to load players"
+  );
+  return data;
 }
 
-export async function fetchMatches(): Promise<MatchSummary[]> {
-  const res = await fetch(`${API_BASE}/matches`, { cache: "no-store" });
-  if (!res.ok) throw new Error("Failed to load matches");
-  return res.json();
+export type MatchQuery = {
+  limit?: number;
+  cursor?: string;
+  from?: string; // ISO date/datetime, inclusive
+  to?: string; // ISO date/datetime, exclusive
+  player_id?: number;
+  format?: "singles" | "doubles";
+  count?: boolean; // also return the total (first page only; it counts every match)
+};
+
+export type MatchPage = {
+  matches: MatchSummary[];
+  nextCursor: string | null; // pass back as `cursor` for the next page
+  total: number | null; // matches matching the filters, across all pages; only with `count`
+};
+
+export async function fetchMatches(query: MatchQuery = {}): Promise<MatchPage> {
+  const params = new URLSearchParams();
+  for (const [key, value] of Object.entries(query)) {
+    if (value !== undefined) params.set(key, String(value));
+  }
+  const qs = params.toString();
+
+  const { data: matches, headers } = await fetchConditional<MatchSummary[]>(
+    `${API_BASE}/matches${qs ? `?${qs}` : ""}`,
+    "Failed to load matches"
+  );
+  return {
+    matches,
+    nextCursor: headers.get("X-Next-Cursor"),
+    total: headers.has("X-Total-Count") ? Number(headers.get("X-Total-Count")) : null,
+  };
 }